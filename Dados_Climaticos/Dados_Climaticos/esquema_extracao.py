@@ -0,0 +1,142 @@
+"""
+Esquema Declarativo de Extração
+
+Este módulo descreve os campos extraídos das páginas de previsão do INMET como um esquema: cada campo aponta
+para uma expressão XPath, a posição desejada no resultado e uma transformação opcional.
+
+Os itens produzidos são tipados: as temperaturas e as umidades são convertidas em inteiros pelo próprio esquema
+('23°C' -> 23, '70%' -> 70). Um valor que não pode ser convertido fica None e o item é recusado por 'item_valido'.
+A página do INMET não traz a precipitação, portanto não há campo para ela.
+
+As expressões são compiladas uma única vez com o lxml e cada expressão distinta é avaliada apenas uma vez por
+página (ou por linha), mesmo quando vários campos leem posições diferentes do mesmo resultado.
+
+Classes:
+    - Campo: Um campo do esquema (expressão XPath, posição e transformação).
+    - EsquemaExtracao: Conjunto de itens descritos por campos, avaliado de uma só vez sobre um elemento.
+
+Funções:
+    - sem_dois_pontos(texto): Remove os dois-pontos do texto da condição meteorológica.
+    - inteiro(texto): Converte textos como '23°C' e '70%' em inteiros.
+    - extrair_pagina(raiz): Extrai todos os dias da previsão de uma página renderizada.
+
+Constantes:
+    - ESQUEMA_PAGINA: Os dois primeiros dias da previsão, no topo da página.
+    - ESQUEMA_LINHA: Um dia da previsão em cada linha 'row-*' da página.
+    - XPATH_LINHAS: Expressão que seleciona as linhas avaliadas com ESQUEMA_LINHA.
+"""
+from collections import namedtuple
+from lxml import etree
+from Dados_Climaticos.esquema_previsao import numero
+
+Campo = namedtuple('Campo', ['xpath', 'indice', 'transformacao'], defaults=[0, None])
+
+
+def sem_dois_pontos(texto):
+    """ Remove os dois-pontos do texto da condição meteorológica. """
+    return texto.replace(':','')
+
+
+def inteiro(texto):
+    """ Converte textos como '23°C', '-2 °C' e '70%' em inteiros, retornando None se o texto não for numérico. """
+    try:
+        return numero(texto)
+    except ValueError:
+        return None
+
+
+class EsquemaExtracao:
+    """
+    Conjunto de itens descritos por campos, avaliado de uma só vez sobre um elemento lxml.
+
+    Atributos:
+        itens (list): Uma lista de dicionários {nome_do_campo: Campo}, um para cada item produzido.
+        consultas (dict): As expressões XPath distintas do esquema, já compiladas.
+
+    Métodos:
+        extrair(self, elemento): Avalia o esquema e retorna um dicionário por item.
+    """
+
+    def __init__(self, *itens):
+        """
+        Compila as expressões XPath distintas usadas pelos itens.
+
+        Parâmetros:
+            *itens (dict): Dicionários {nome_do_campo: Campo}, um para cada item produzido.
+        """
+        self.itens = itens
+        self.consultas = {
+            campo.xpath: etree.XPath(campo.xpath, smart_strings=False)
+            for item in itens for campo in item.values()
+        }
+
+    def extrair(self, elemento):
+        """
+        Avalia cada expressão uma única vez e monta os itens a partir das posições de cada campo.
+
+        Parâmetros:
+            elemento (lxml.etree._Element): A raiz da página ou a linha a ser avaliada.
+
+        Retorna:
+            list: Um dicionário por item. Campos cuja posição não existe na página ficam com o valor None, assim
+            como os campos cuja transformação retorna None.
+        """
+        resultados = {xpath: consulta(elemento) for xpath, consulta in self.consultas.items()}
+        itens = []
+        for item in self.itens:
+            dados = {}
+            for nome, campo in item.items():
+                valores = resultados[campo.xpath]
+                valor = valores[campo.indice] if len(valores) > campo.indice else None
+                if valor is not None and campo.transformacao:
+                    valor = campo.transformacao(valor)
+                dados[nome] = valor
+            itens.append(dados)
+        return itens
+
+
+_CIDADE_DATA = "//div//section[@class='grid grid-template-columns-2 no-border align-left'][{}]/div/font/b/text()"
+_CONDICAO = "//section[@id='row-{}']//div[@class='grid grid-template-columns-2-minmax no-border']//font/text()"
+_TEMPERATURA_UMIDADE = "//section[@class='grid grid-template-columns-4']/div/font/text()"
+_VENTO = "//div[@class='item']//section[@class='grid grid-template-columns-2 no-border']/div[@class='item']/font/text()"
+
+ESQUEMA_PAGINA = EsquemaExtracao(*[
+    {
+        'cidade data': Campo(_CIDADE_DATA.format(dia + 1)),
+        'codicao meteorologica': Campo(_CONDICAO.format(dia + 1), 1, sem_dois_pontos),
+        'temperatura minima': Campo(_TEMPERATURA_UMIDADE, 6 * dia, inteiro),
+        'temperatura maxima': Campo(_TEMPERATURA_UMIDADE, 6 * dia + 2, inteiro),
+        'umidade minima': Campo(_TEMPERATURA_UMIDADE, 6 * dia + 5, inteiro),
+        'umidade maxima': Campo(_TEMPERATURA_UMIDADE, 6 * dia + 4, inteiro),
+        'vento': Campo(_VENTO, 6 * dia + 3)
+    }
+    for dia in range(2)
+])
+
+XPATH_LINHAS = etree.XPath("//div[starts-with(@class,'row-')]")
+
+ESQUEMA_LINHA = EsquemaExtracao({
+    'cidade data': Campo(".//section[@class='grid grid-template-columns-1 no-border align-left']/div/font/b/text()"),
+    'codicao meteorologica': Campo(".//section[@class='grid grid-template-columns-2-minmax no-border align-left']/div/font/text()", 0, sem_dois_pontos),
+    'temperatura minima': Campo(".//section[@class='grid grid-template-columns-4']/div/font/text()", 0, inteiro),
+    'temperatura maxima': Campo(".//section[@class='grid grid-template-columns-4']/div/font/text()", 2, inteiro),
+    'umidade minima': Campo(".//section[@class='grid grid-template-columns-4']/div/font/text()", 5, inteiro),
+    'umidade maxima': Campo(".//section[@class='grid grid-template-columns-4']/div/font/text()", 4, inteiro),
+    'vento': Campo(".//section[@class='grid grid-template-columns-2']/div/font/text()", 1)
+})
+
+
+def extrair_pagina(raiz):
+    """
+    Extrai todos os dias da previsão de uma página renderizada.
+
+    Parâmetros:
+        raiz (lxml.etree._Element): A raiz do documento HTML (por exemplo, response.selector.root).
+
+    Retorna:
+        list: Os dois dias do topo da página seguidos de um dia por linha 'row-*'.
+    """
+    itens = ESQUEMA_PAGINA.extrair(raiz)
+    for linha in XPATH_LINHAS(raiz):
+        itens.extend(ESQUEMA_LINHA.extrair(linha))
+    return itens
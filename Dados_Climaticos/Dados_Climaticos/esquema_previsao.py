@@ -0,0 +1,188 @@
+"""
+Esquema dos Documentos de Previsão do Tempo
+
+Os documentos da coleção 'Previsao_do_tempo' são tipados e usam nomes de campos curtos. Os valores numéricos
+permitem consultas por faixa e índices, e a data é um datetime de verdade, em vez de um texto montado à mão.
+A formatação para o cliente (°C, %, data por extenso) é feita apenas na resposta da API, por 'formatar_previsao',
+que reproduz o formato original das respostas: o dia da semana e os textos da condição e do vento são os coletados,
+sem alterações, e a temperatura e a umidade são a média inteira (arredondada para baixo) do mínimo e do máximo.
+
+Campos:
+    c (str): Nome da cidade.
+    uf (str): Sigla do estado.
+    d (datetime): Data da previsão, à meia-noite.
+    ds (str): Dia da semana, como coletado (por exemplo 'Sábado').
+    cm (str): Condição meteorológica, como coletada.
+    tmin / tmax (int): Temperaturas mínima e máxima, em °C.
+    tmed (float): Média entre a temperatura mínima e a máxima.
+    umin / umax (int): Umidades relativas mínima e máxima, em %.
+    umed (float): Média entre a umidade mínima e a máxima.
+    v (str): Descrição do vento, como coletada.
+
+Histórico:
+    A coleção 'Historico_previsao' guarda um documento por cidade e por dia previsto, com as previsões feitas para
+    aquele dia a cada coleta horária: {'c', 'uf', 'd', 'expira_em', 's': [{'h', 'cm', 'tmin', 'tmax', 'umin', 'umax', 'v'}]},
+    em que 'h' é a hora cheia da coleta e 'expira_em' é usado pelo índice TTL.
+
+Funções:
+    - numero(texto): Converte textos como '23°C' e '70%' em inteiros.
+    - documento_da_previsao(dados): Monta o documento tipado a partir de um item da spider.
+    - formatar_previsao(documento): Monta a resposta da API, no formato original, a partir do documento tipado.
+    - documento_legado(documento): Indica se o documento ainda está no formato antigo, com textos formatados.
+    - converter_documento_legado(documento): Converte um documento no formato antigo para o formato tipado.
+    - registro_historico(documento, hora): Monta a previsão guardada no histórico para uma coleta.
+    - formatar_historico(bucket): Monta a resposta da rota de histórico a partir de um documento do histórico.
+"""
+from datetime import datetime
+import math
+import re
+
+DIAS_DA_SEMANA = ('Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo')
+PADRAO_DATA = re.compile(r'\d{2}/\d{2}/\d{4}')
+
+def numero(texto):
+    """
+    Converte um texto com unidade em inteiro.
+
+    Parâmetros:
+        texto (str): O valor, por exemplo '23°C', '-2 °C' ou '70%'.
+
+    Retorna:
+        int: O valor numérico.
+    """
+    return int(texto.replace('°C', '').replace('%', '').strip())
+
+def _data(texto):
+    return datetime.strptime(PADRAO_DATA.search(texto).group(), '%d/%m/%Y')
+
+def _dia_da_semana(texto):
+    return texto.partition(' - ')[2].strip()
+
+def documento_da_previsao(dados):
+    """
+    Monta o documento tipado a partir de um item da spider.
+
+    Parâmetros:
+        dados (dict): O item, com 'cidade data' no formato 'Cidade-UF, dd/mm/aaaa - Dia' e as temperaturas e
+            umidades em inteiros (ver esquema_extracao.py).
+
+    Retorna:
+        dict: O documento a ser gravado no MongoDB.
+    """
+    local, _, data = dados['cidade data'].partition(',')
+    cidade, separador, uf = local.rpartition('-')
+    if not separador:
+        cidade, uf = uf, ''
+    temperatura_minima, temperatura_maxima = dados['temperatura minima'], dados['temperatura maxima']
+    umidade_minima, umidade_maxima = dados['umidade minima'], dados['umidade maxima']
+    return {
+        'c': cidade.strip(),
+        'uf': uf.strip(),
+        'd': _data(data),
+        'ds': _dia_da_semana(data),
+        'cm': dados['codicao meteorologica'],
+        'tmin': temperatura_minima,
+        'tmax': temperatura_maxima,
+        'tmed': (temperatura_minima + temperatura_maxima) / 2,
+        'umin': umidade_minima,
+        'umax': umidade_maxima,
+        'umed': (umidade_minima + umidade_maxima) / 2,
+        'v': dados['vento']
+    }
+
+def formatar_previsao(documento):
+    """
+    Monta a resposta da API a partir do documento tipado, no mesmo formato das respostas originais.
+
+    Documentos gravados sem o campo 'ds' usam o dia da semana calculado a partir da data. A UF não faz parte da
+    resposta, como no formato original; ela é usada apenas para escolher a cidade.
+
+    Parâmetros:
+        documento (dict): O documento da coleção 'Previsao_do_tempo'.
+
+    Retorna:
+        dict: A previsão com os campos 'cidade', 'data', 'codicao meteorologica', 'temperatura', 'umidade' e 'vento'.
+    """
+    return {
+        'cidade': documento['c'],
+        'data': f" {documento['d']:%d/%m/%Y} - {documento.get('ds') or DIAS_DA_SEMANA[documento['d'].weekday()]}",
+        'codicao meteorologica': documento['cm'],
+        'temperatura': f"{math.floor(documento['tmed'])}°C",
+        'umidade': f"{math.floor(documento['umed'])}%",
+        'vento': documento['v']
+    }
+
+def documento_legado(documento):
+    """ Retorna True se o documento ainda está no formato antigo, com o campo 'cidade' e textos formatados. """
+    return 'cidade' in documento and 'c' not in documento
+
+def converter_documento_legado(documento):
+    """
+    Converte um documento no formato antigo para o formato tipado.
+
+    O formato antigo guardava apenas a média da temperatura e da umidade; ela é usada também como mínimo e máximo.
+
+    Parâmetros:
+        documento (dict): O documento antigo, com 'cidade', 'data', 'temperatura', 'umidade' etc.
+
+    Retorna:
+        dict: O documento tipado.
+    """
+    temperatura = numero(documento['temperatura'])
+    umidade = numero(documento['umidade'])
+    return {
+        'c': documento['cidade'].strip(),
+        'uf': documento.get('uf', '').strip(),
+        'd': _data(documento['data']),
+        'ds': _dia_da_semana(documento['data']),
+        'cm': documento['codicao meteorologica'],
+        'tmin': temperatura,
+        'tmax': temperatura,
+        'tmed': float(temperatura),
+        'umin': umidade,
+        'umax': umidade,
+        'umed': float(umidade),
+        'v': documento['vento']
+    }
+
+CAMPOS_HISTORICO = ('cm', 'tmin', 'tmax', 'umin', 'umax', 'v')
+
+def registro_historico(documento, hora):
+    """
+    Monta a previsão guardada no histórico para uma coleta. As médias não são guardadas, pois derivam dos extremos.
+
+    Parâmetros:
+        documento (dict): O documento tipado da coleção 'Previsao_do_tempo'.
+        hora (datetime): A hora cheia da coleta.
+
+    Retorna:
+        dict: {'h': hora, 'cm': ..., 'tmin': ..., 'tmax': ..., 'umin': ..., 'umax': ..., 'v': ...}.
+    """
+    return dict({'h': hora}, **{campo: documento[campo] for campo in CAMPOS_HISTORICO})
+
+def formatar_historico(bucket):
+    """
+    Monta a resposta da rota de histórico a partir de um documento da coleção 'Historico_previsao'.
+
+    Parâmetros:
+        bucket (dict): O documento do histórico de uma cidade em um dia previsto.
+
+    Retorna:
+        dict: A cidade, a UF, a data prevista e a lista de coletas, da mais antiga para a mais recente.
+    """
+    return {
+        'cidade': bucket['c'],
+        'uf': bucket['uf'],
+        'data': f"{bucket['d']:%d/%m/%Y}",
+        'coletas': [
+            {
+                'coletada_em': f"{registro['h']:%d/%m/%Y %H:%M}",
+                'condicao': registro['cm'],
+                'tmin': registro['tmin'],
+                'tmax': registro['tmax'],
+                'umin': registro['umin'],
+                'umax': registro['umax'],
+                'vento': registro['v']
+            }
+            for registro in sorted(bucket['s'], key=lambda registro: registro['h'])]
+    }
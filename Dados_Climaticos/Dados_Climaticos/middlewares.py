@@ -4,6 +4,13 @@
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
 from scrapy import signals
+from scrapy.http import HtmlResponse
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from Dados_Climaticos.pool_drivers import PoolDeDrivers, iniciar_driver
+from Dados_Climaticos.telemetria import MEDIDOR_INATIVO, medidor_da_coleta, codigo_da_url
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -101,3 +108,99 @@ class DadosClimaticosDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class RenderizacaoSeleniumMiddleware:
+    """
+    Um downloader middleware que renderiza as páginas com o Selenium fora da thread do reactor.
+
+    As requisições marcadas com meta={'renderizar': True} são carregadas por um driver do 'PoolDeDrivers'
+    em uma thread de um ThreadPool dedicado. O reactor continua livre para processar outras requisições,
+    de modo que até 'SELENIUM_POOL_TAMANHO' páginas são renderizadas em paralelo.
+
+    Em vez de uma pausa fixa, a renderização aguarda até que os dados da previsão estejam presentes na página
+    (ver 'xpath_pronto'), com o limite de 'SELENIUM_TEMPO_ESPERA' segundos.
+
+    A inicialização dos navegadores, o carregamento e a espera de cada página são medidos pela telemetria da coleta
+    (ver telemetria.py), assim como as falhas de renderização e os reinícios de navegador do pool.
+
+    Configuração:
+        DOWNLOADER_MIDDLEWARES = {
+            'Dados_Climaticos.middlewares.RenderizacaoSeleniumMiddleware': 543,
+        }
+        SELENIUM_POOL_TAMANHO, SELENIUM_PAGINAS_POR_DRIVER e SELENIUM_TEMPO_ESPERA no settings.py.
+        A renderização não passa pelo slot do downloader, portanto CONCURRENT_REQUESTS_PER_DOMAIN não a limita:
+        o número de páginas renderizadas ao mesmo tempo é o tamanho do ThreadPool, igual a SELENIUM_POOL_TAMANHO.
+        As demais requisições ficam na fila do ThreadPool.
+
+    Um tempo de espera esgotado em 'xpath_pronto' é registrado como falha da cidade, mas não recicla o navegador;
+    apenas erros do WebDriver ou da sessão fazem o pool substituí-lo (ver PoolDeDrivers.usar).
+    """
+    xpath_pronto = "//section[@class='grid grid-template-columns-4']/div/font[normalize-space(text())]"
+
+    def __init__(self, pool_drivers, tempo_espera=15, medidor=MEDIDOR_INATIVO):
+        """
+        Inicializa o middleware.
+
+        Parâmetros:
+            pool_drivers (PoolDeDrivers): O pool de drivers usado na renderização.
+            tempo_espera (float): Tempo máximo, em segundos, de espera pelos dados da página.
+            medidor (MedidorEtapas): O medidor da telemetria da coleta.
+        """
+        self.pool_drivers = pool_drivers
+        self.tempo_espera = tempo_espera
+        self.medidor = medidor
+        medidor.registrar_contadores(
+            'navegadores', lambda: {'criados': pool_drivers.criados, 'reinicios': pool_drivers.reinicios})
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=pool_drivers.tamanho, name='renderizacao_selenium')
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        medidor = medidor_da_coleta(crawler)
+        pool_drivers = PoolDeDrivers(
+            medidor.cronometrado('inicio_navegador', iniciar_driver),
+            tamanho=crawler.settings.getint('SELENIUM_POOL_TAMANHO', 2),
+            paginas_por_driver=crawler.settings.getint('SELENIUM_PAGINAS_POR_DRIVER', 200))
+        s = cls(pool_drivers, tempo_espera=crawler.settings.getfloat('SELENIUM_TEMPO_ESPERA', 15), medidor=medidor)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request, spider):
+        if not request.meta.get('renderizar'):
+            return None
+        from twisted.internet import reactor
+        resultado = deferToThreadPool(reactor, self.threadpool, self.renderizar, request.url)
+        resultado.addCallback(
+            lambda html: HtmlResponse(url=request.url, body=html, encoding='utf-8', request=request))
+        return resultado
+
+    def renderizar(self, url):
+        """
+        Carrega a página em um driver do pool e aguarda os dados da previsão. Executado em uma thread do ThreadPool.
+
+        Parâmetros:
+            url (str): O endereço da página.
+
+        Retorna:
+            str: O HTML renderizado.
+        """
+        with self.pool_drivers.usar() as driver:
+            with self.medidor.medir('carregamento_pagina'):
+                driver.get(url)
+            with self.medidor.medir('espera_dados'):
+                WebDriverWait(driver, self.tempo_espera).until(
+                    lambda driver_: driver_.find_elements(By.XPATH, self.xpath_pronto))
+            return driver.page_source
+
+    def process_exception(self, request, exception, spider):
+        if request.meta.get('renderizar'):
+            self.medidor.falha(codigo_da_url(request.url), 'renderizacao', exception)
+        return None
+
+    def spider_opened(self, spider):
+        self.threadpool.start()
+
+    def spider_closed(self, spider):
+        self.pool_drivers.encerrar()
+        self.threadpool.stop()
@@ -1,5 +1,12 @@
+from datetime import datetime
+from time import monotonic
 from itemadapter import ItemAdapter
 from pymongo import MongoClient
+from scrapy import signals
+from Dados_Climaticos.publicacao import (COLECAO_PREVISAO, COLECAO_STAGING, COLECAO_CONTROLE, HISTORICO_RETENCAO_DIAS,
+                                         PROPORCAO_MINIMA_PUBLICACAO, descartar_coleta, publicar_coleta, volume_suficiente)
+from Dados_Climaticos.esquema_previsao import documento_da_previsao
+from Dados_Climaticos.telemetria import MEDIDOR_INATIVO, medidor_da_coleta
 
 class DadosClimaticosMongoPipeline:
     """
@@ -9,18 +16,36 @@ class DadosClimaticosMongoPipeline:
 
     Atributos:
         collection_name (str): O nome da coleção no banco de dados onde os dados serão armazenados.
+        controle_collection_name (str): O nome da coleção que guarda o marcador de geração de cada coleta.
+        staging_collection_name (str): O nome da coleção temporária onde a nova coleta é carregada antes de ser publicada.
 
     Métodos:
-        __init__(self, mongo_uri, mongo_db): Inicializa a pipeline com as configurações do MongoDB.
+        __init__(self, mongo_uri, mongo_db, tamanho_lote, streaming, intervalo_flush, publicar_ao_final, proporcao_minima, retencao_dias, medidor): Inicializa a pipeline com as configurações do MongoDB.
         from_crawler(cls, crawler): Cria uma instância da classe a partir das configurações do Scrapy.
         open_spider(self, spider): Inicializa a conexão com o MongoDB antes de começar a coleta de dados.
-        close_spider(self, spider): Fecha a conexão com o MongoDB após a coleta de dados e insere os dados processados.
+        close_spider(self, spider): Grava na coleção temporária os itens restantes.
+        spider_closed(self, spider, reason): Publica ou descarta a coleta, conforme o motivo do encerramento, e fecha a conexão com o MongoDB.
+        descarregar(self): Grava na coleção temporária os itens acumulados em memória.
+        registrar_progresso(self, motivo=None): Registra na coleção de controle quantos itens o fragmento atual já gravou.
+        publicar(self, spider, motivo): Publica a coleção temporária com publicacao.publicar_coleta se a coleta terminou por completo.
         process_item(self, item, spider): Processa e transforma os itens da spider antes de inseri-los no MongoDB.
 
     Configuração:
         Certifique-se de ter a biblioteca Scrapy instalada e configurada corretamente.
         Certifique-se de ter a biblioteca pymongo instalada e configurada corretamente.
         Configure as configurações do MongoDB no arquivo de configuração do Scrapy (settings.py) definindo as constantes "MONGO_URI" e "MONGO_DATABASE".
+        O tamanho de cada lote de inserção pode ser ajustado com a constante "MONGO_TAMANHO_LOTE".
+        Com "MONGO_STREAMING" ativado, os lotes são gravados na coleção temporária à medida que os itens chegam,
+        sempre que atingem "MONGO_TAMANHO_LOTE" itens ou quando "MONGO_INTERVALO_FLUSH" segundos se passam
+        desde a última gravação. Assim o uso de memória fica limitado ao tamanho de um lote.
+        A coleta só é publicada se a spider terminou normalmente (motivo 'finished') e gravou ao menos
+        "MONGO_PROPORCAO_MINIMA" dos itens da coleta publicada. Se a spider for interrompida (erro, 'shutdown',
+        tempo máximo...), a coleção temporária é descartada e a coleta publicada é mantida.
+        Por quantos dias o histórico das previsões é mantido é definido pela constante "HISTORICO_RETENCAO_DIAS".
+        Na coleta fragmentada (ver executando_spider.py), cada processo roda com "MONGO_PUBLICAR" desativado:
+        a coleção temporária é compartilhada entre os fragmentos e só é publicada pelo coordenador, depois
+        que todos terminam. Cada fragmento registra o motivo do seu encerramento na coleção de controle.
+        A conversão de cada item, cada lote gravado e a publicação são medidos pela telemetria da coleta (ver telemetria.py).
 
     Exemplo de uso:
         Configure esta classe como uma pipeline no arquivo de configuração do Scrapy:
@@ -29,23 +54,43 @@ class DadosClimaticosMongoPipeline:
         }
 
     """
-    collection_name = "Previsao_do_tempo"
+    collection_name = COLECAO_PREVISAO
+    controle_collection_name = COLECAO_CONTROLE
+    staging_collection_name = COLECAO_STAGING
 
-    def __init__(self, mongo_uri, mongo_db):
+    def __init__(self, mongo_uri, mongo_db, tamanho_lote=1000, streaming=True, intervalo_flush=30, publicar_ao_final=True,
+                 proporcao_minima=PROPORCAO_MINIMA_PUBLICACAO, retencao_dias=HISTORICO_RETENCAO_DIAS, medidor=MEDIDOR_INATIVO):
         """
         Inicializa a pipeline com as configurações do MongoDB.
 
         Parâmetros:
             mongo_uri (str): A URI de conexão do MongoDB.
             mongo_db (str): O nome do banco de dados MongoDB.
+            tamanho_lote (int): Quantidade de documentos enviados em cada chamada de insert_many.
+            streaming (bool): Se True, grava os lotes na coleção temporária durante a coleta.
+            intervalo_flush (float): Tempo máximo, em segundos, que um lote incompleto fica em memória no modo streaming.
+            publicar_ao_final (bool): Se True, limpa a coleção temporária no início e a publica ao final da coleta.
+                Se False, apenas acrescenta os itens a ela, deixando a publicação para o coordenador dos fragmentos.
+            proporcao_minima (float): Fração mínima da quantidade de itens da coleta publicada para que a nova coleta
+                seja publicada.
+            retencao_dias (int): Por quantos dias, depois da data prevista, cada dia do histórico é mantido.
+            medidor (MedidorEtapas): O medidor da telemetria da coleta.
         """
         self.mongo_uri = mongo_uri
         self.mongo_db = mongo_db
+        self.tamanho_lote = tamanho_lote
+        self.streaming = streaming
+        self.intervalo_flush = intervalo_flush
+        self.publicar_ao_final = publicar_ao_final
+        self.proporcao_minima = proporcao_minima
+        self.retencao_dias = retencao_dias
+        self.medidor = medidor
 
     @classmethod
     def from_crawler(cls, crawler):
         """
-        Cria uma instância da classe a partir das configurações do Scrapy.
+        Cria uma instância da classe a partir das configurações do Scrapy e a conecta ao sinal spider_closed,
+        o único que informa o motivo do encerramento da spider.
 
         Parâmetros:
             crawler (scrapy.crawler.Crawler): Uma instância do Crawler do Scrapy.
@@ -54,10 +99,19 @@ class DadosClimaticosMongoPipeline:
             DadosClimaticosMongoPipeline: Uma instância da classe.
 
         """
-        return cls(
+        pipeline = cls(
             mongo_uri=crawler.settings.get("MONGO_URI"),
             mongo_db=crawler.settings.get("MONGO_DATABASE", "items"),
+            tamanho_lote=crawler.settings.getint("MONGO_TAMANHO_LOTE", 1000),
+            streaming=crawler.settings.getbool("MONGO_STREAMING", True),
+            intervalo_flush=crawler.settings.getfloat("MONGO_INTERVALO_FLUSH", 30),
+            publicar_ao_final=crawler.settings.getbool("MONGO_PUBLICAR", True),
+            proporcao_minima=crawler.settings.getfloat("MONGO_PROPORCAO_MINIMA", PROPORCAO_MINIMA_PUBLICACAO),
+            retencao_dias=crawler.settings.getint("HISTORICO_RETENCAO_DIAS", HISTORICO_RETENCAO_DIAS),
+            medidor=medidor_da_coleta(crawler),
         )
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
 
     def open_spider(self, spider):
         """
@@ -69,25 +123,106 @@ class DadosClimaticosMongoPipeline:
         """
         self.client = MongoClient(self.mongo_uri)
         self.db = self.client[self.mongo_db]
+        self.staging = self.db[self.staging_collection_name]
+        if self.publicar_ao_final:
+            self.staging.drop()
+        self.fragmento = getattr(spider, 'fragmento', None)
         self.novos_dados = []
+        self.total_gravados = 0
+        self.ultimo_flush = monotonic()
 
     def close_spider(self, spider):
         """
-        Fecha a conexão com o MongoDB após a coleta de dados e insere os dados processados.
+        Grava na coleção temporária os itens restantes.
+
+        O Scrapy chama este método antes de informar o motivo do encerramento; a publicação é feita em spider_closed.
 
         Parâmetros:
             spider (scrapy.spiders.Spider): A instância da spider atual.
 
         """
-        self.db[self.collection_name].delete_many({})
-        for dado in self.novos_dados:
-            self.db[self.collection_name].insert_one(dado)
-        self.client.close()
+        self.descarregar()
+
+    def spider_closed(self, spider, reason):
+        """
+        Publica ou descarta a coleta, conforme o motivo do encerramento, e fecha a conexão com o MongoDB.
+
+        Parâmetros:
+            spider (scrapy.spiders.Spider): A instância da spider atual.
+            reason (str): O motivo do encerramento informado pelo Scrapy ('finished', 'shutdown', 'closespider_timeout'...).
+
+        """
+        try:
+            if self.publicar_ao_final:
+                self.publicar(spider, reason)
+            else:
+                self.registrar_progresso(reason)
+        finally:
+            self.client.close()
+
+    def descarregar(self):
+        """
+        Grava na coleção temporária, em lotes ordenados de 'tamanho_lote' itens, os dados acumulados em memória.
+        """
+        for inicio in range(0, len(self.novos_dados), self.tamanho_lote):
+            lote = self.novos_dados[inicio:inicio + self.tamanho_lote]
+            with self.medidor.medir('gravacao_mongo'):
+                self.staging.insert_many(lote, ordered=True)
+            self.total_gravados += len(lote)
+        self.novos_dados = []
+        self.ultimo_flush = monotonic()
+        if not self.publicar_ao_final:
+            self.registrar_progresso()
+
+    def registrar_progresso(self, motivo=None):
+        """
+        Registra na coleção de controle quantos itens o fragmento atual já gravou na coleção temporária.
+
+        O coordenador da coleta fragmentada lê esses registros para informar o progresso de cada fragmento e,
+        pelo motivo do encerramento, só publica a coleta se todos os fragmentos terminaram normalmente.
+
+        Parâmetros:
+            motivo (str): O motivo do encerramento do fragmento; None enquanto ele está em execução.
+        """
+        self.db[self.controle_collection_name].update_one(
+            {'_id': f'{self.collection_name}_fragmento_{self.fragmento}'},
+            {'$set': {'itens': self.total_gravados, 'motivo': motivo, 'atualizado_em': datetime.now()}},
+            upsert=True)
+
+    def publicar(self, spider, motivo):
+        """
+        Publica a coleção temporária de forma atômica, se a coleta terminou por completo.
+
+        Os índices e as respostas pré-renderizadas da API são criados a partir da coleção temporária e, por fim,
+        ela é renomeada sobre a coleção publicada (ver publicacao.py). Dessa forma a API nunca lê uma coleção
+        vazia ou parcialmente preenchida. Se a spider não terminou normalmente, se nenhum dado foi coletado ou
+        se a coleta tem menos itens que 'proporcao_minima' da coleta publicada, a coleção temporária é descartada
+        e a coleção publicada é mantida como está.
+
+        Parâmetros:
+            spider (scrapy.spiders.Spider): A instância da spider atual.
+            motivo (str): O motivo do encerramento informado pelo Scrapy.
+        """
+        if motivo != 'finished':
+            spider.logger.warning('Coleta interrompida (%s); a coleção %s não foi alterada.', motivo, self.collection_name)
+        elif not self.total_gravados:
+            spider.logger.warning('Nenhum dado coletado; a coleção %s não foi alterada.', self.collection_name)
+        elif not volume_suficiente(self.db, self.proporcao_minima):
+            spider.logger.warning('Coleta com %d itens, abaixo de %.0f%% da coleta publicada; a coleção %s não foi alterada.',
+                                  self.total_gravados, self.proporcao_minima * 100, self.collection_name)
+        else:
+            with self.medidor.medir('publicacao'):
+                publicar_coleta(self.db, retencao_dias=self.retencao_dias)
+            return
+        descartar_coleta(self.db)
 
     def process_item(self, item, spider):
         """
         Processa e transforma os itens da spider antes de inseri-los no MongoDB.
 
+        Os itens são convertidos para o documento tipado de esquema_previsao.py (números, data e nomes de campos curtos);
+        a formatação dos valores para o cliente é feita pela API.
+
         Parâmetros:
             item (scrapy.Item): O item a ser processado.
             spider (scrapy.spiders.Spider): A instância da spider atual.
@@ -96,15 +231,9 @@ class DadosClimaticosMongoPipeline:
             scrapy.Item: O item processado.
 
         """
-        dados = ItemAdapter(item).asdict()
-        cidade_data_ = dados['cidade data'].replace(',','-').split('-') 
-        dados_processados = {
-            'cidade':cidade_data_[0],
-            'data':cidade_data_[2] + '-' + cidade_data_[3],
-            'codicao meteorologica':dados['codicao meteorologica'],
-            'temperatura':str((int(dados['temperatura minima'].replace('°C',''))+int(dados['temperatura maxima'].replace('°C','')))//2)+'°C',
-            'umidade':str((int(dados['umidade minima'].replace('%',''))+int(dados['umidade maxima'].replace('%','')))//2)+'%',
-            'vento':dados['vento']
-        }
-        self.novos_dados.append(dados_processados)
+        with self.medidor.medir('processamento_item'):
+            self.novos_dados.append(documento_da_previsao(ItemAdapter(item).asdict()))
+        if self.streaming and (len(self.novos_dados) >= self.tamanho_lote
+                               or monotonic() - self.ultimo_flush >= self.intervalo_flush):
+            self.descarregar()
         return item
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Pool de WebDrivers Reutilizáveis
+
+Este módulo mantém um conjunto limitado de instâncias do Chrome em modo headless, reutilizadas entre as
+páginas da coleta em vez de abrir um navegador novo para cada cidade.
+
+Funções:
+    - iniciar_driver(): Inicializa e retorna uma instância do driver do Google Chrome configurado com opções personalizadas.
+
+Classes:
+    - PoolDeDrivers: Pool com retirada/devolução de drivers, reciclagem após N páginas ou após falha do navegador e encerramento garantido.
+
+Uso:
+    pool = PoolDeDrivers(iniciar_driver, tamanho=2, paginas_por_driver=200)
+    with pool.usar() as driver:
+        driver.get(url)
+    pool.encerrar()
+"""
+from contextlib import contextmanager
+from threading import Condition
+from selenium.webdriver.remote.remote_connection import LOGGER
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+import logging
+
+def iniciar_driver():
+    """ Inicializa e retorna uma instância do driver do Google Chrome configurado com opções personalizadas.
+
+    Retorna:
+        selenium.webdriver.Chrome: Uma instância do driver do Google Chrome.
+
+    Configurações Personalizadas:
+        - Idioma: Português do Brasil
+        - Tamanho da janela: 1000x1000 pixels
+        - Modo headless (sem interface gráfica)
+        - Exclui logs do Chrome
+        - Desabilita a solicitação de download
+        - Desativa notificações do navegador
+        - Permite downloads automáticos
+
+    Nota:
+        Certifique-se de ter o Chrome WebDriver instalado e no PATH do sistema.
+        Certifique_se de ter a biblioteca Selenium instalada e configurada corretamenta. """
+
+    chromeOptions = Options()
+    LOGGER.setLevel(logging.WARNING)
+    arguments = ['--lang=pt-BR', 'window-size=1000,1000', '--headless']
+    for argument in arguments:
+        chromeOptions.add_argument(argument)
+
+    chromeOptions.add_experimental_option(
+        'excludeSwitches', ['enable-logging'])
+
+    chromeOptions.add_experimental_option('prefs', {
+        'download.prompt_for_download': False,
+        'profile.default_content_setting_values.notifications': 2,
+        'profile.default_content_setting_values.automatic_downloads': 1,
+    })
+
+    driver = webdriver.Chrome(options=chromeOptions)
+
+    return driver
+
+
+class PoolDeDrivers:
+    """
+    Pool limitado de WebDrivers do Selenium.
+
+    Os drivers são criados sob demanda até o limite 'tamanho'. Um driver é encerrado e substituído quando
+    atinge 'paginas_por_driver' páginas ou quando é devolvido após uma falha do navegador ou da sessão.
+    Um tempo de espera esgotado (página lenta) não é uma falha do navegador, e o driver volta ao pool.
+
+    Atributos:
+        tamanho (int): Número máximo de drivers abertos ao mesmo tempo.
+        paginas_por_driver (int): Número de páginas após o qual um driver é reciclado.
+        criados (int): Total de drivers iniciados pelo pool.
+        reinicios (int): Total de drivers reciclados por limite de páginas ou falha.
+
+    Métodos:
+        retirar(self): Retorna um driver livre, aguardando se todos estiverem em uso.
+        devolver(self, driver, falhou=False): Devolve o driver ao pool, reciclando-o se necessário.
+        usar(self): Gerenciador de contexto que retira e devolve um driver.
+        encerrar(self): Encerra todos os drivers abertos.
+    """
+
+    def __init__(self, iniciar_driver, tamanho=2, paginas_por_driver=200):
+        """
+        Inicializa o pool.
+
+        Parâmetros:
+            iniciar_driver (callable): Função sem parâmetros que cria um novo driver.
+            tamanho (int): Número máximo de drivers abertos ao mesmo tempo.
+            paginas_por_driver (int): Número de páginas após o qual um driver é reciclado.
+        """
+        self.iniciar_driver = iniciar_driver
+        self.tamanho = tamanho
+        self.paginas_por_driver = paginas_por_driver
+        self.criados = 0
+        self.reinicios = 0
+        self._livres = []
+        self._paginas = {}
+        self._abertos = 0
+        self._encerrado = False
+        self._condicao = Condition()
+
+    def retirar(self):
+        """
+        Retorna um driver livre, criando um novo se o limite ainda não foi atingido.
+
+        Retorna:
+            selenium.webdriver.Chrome: Um driver pronto para uso.
+        """
+        with self._condicao:
+            while not self._livres and self._abertos >= self.tamanho:
+                if self._encerrado:
+                    raise RuntimeError('O pool de drivers foi encerrado.')
+                self._condicao.wait()
+            if self._encerrado:
+                raise RuntimeError('O pool de drivers foi encerrado.')
+            if self._livres:
+                return self._livres.pop()
+            self._abertos += 1
+        try:
+            driver = self.iniciar_driver()
+        except Exception:
+            with self._condicao:
+                self._abertos -= 1
+                self._condicao.notify()
+            raise
+        with self._condicao:
+            self.criados += 1
+            self._paginas[id(driver)] = 0
+        return driver
+
+    def devolver(self, driver, falhou=False):
+        """
+        Devolve o driver ao pool, encerrando-o se falhou ou se atingiu o limite de páginas.
+
+        Parâmetros:
+            driver (selenium.webdriver.Chrome): O driver retirado anteriormente.
+            falhou (bool): Indica se o driver falhou durante o uso.
+        """
+        with self._condicao:
+            paginas = self._paginas.get(id(driver), 0) + 1
+            reciclar = falhou or self._encerrado or paginas >= self.paginas_por_driver
+            if reciclar:
+                self._paginas.pop(id(driver), None)
+                self._abertos -= 1
+                if not self._encerrado:
+                    self.reinicios += 1
+            else:
+                self._paginas[id(driver)] = paginas
+                self._livres.append(driver)
+            self._condicao.notify()
+        if reciclar:
+            self._fechar(driver)
+
+    @contextmanager
+    def usar(self):
+        """
+        Gerenciador de contexto que retira um driver e o devolve ao final.
+
+        O driver é marcado como falho apenas em erros do WebDriver ou da sessão; um TimeoutException ou uma
+        exceção que não vem do navegador o devolvem ao pool para a próxima página.
+        """
+        driver = self.retirar()
+        try:
+            yield driver
+        except TimeoutException:
+            self.devolver(driver)
+            raise
+        except WebDriverException:
+            self.devolver(driver, falhou=True)
+            raise
+        except Exception:
+            self.devolver(driver)
+            raise
+        self.devolver(driver)
+
+    def encerrar(self):
+        """ Encerra todos os drivers livres e impede novas retiradas. Drivers em uso são encerrados ao serem devolvidos. """
+        with self._condicao:
+            self._encerrado = True
+            livres, self._livres = self._livres, []
+            for driver in livres:
+                self._paginas.pop(id(driver), None)
+            self._abertos -= len(livres)
+            self._condicao.notify_all()
+        for driver in livres:
+            self._fechar(driver)
+
+    @staticmethod
+    def _fechar(driver):
+        """ Encerra o processo do Chrome, ignorando erros de um driver que já caiu. """
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,306 @@
+"""
+Publicação da Coleta de Dados Climáticos
+
+Este módulo concentra as etapas executadas depois que todos os itens de uma coleta foram gravados na coleção
+temporária. Ele é usado tanto pela 'DadosClimaticosMongoPipeline' (coleta em um único processo) quanto pelo
+coordenador da coleta fragmentada em executando_spider.py.
+
+Etapas da publicação:
+    1. Cria os índices na coleção temporária: (c, d), para a consulta por cidade em ordem de data, e (d).
+    2. Materializa as respostas da API: para cada cidade (nome e UF), o JSON final da rota do dia e da rota da
+       semana, formatado por esquema_previsao.formatar_previsao, já serializado e também comprimido com gzip e, se a biblioteca brotli estiver instalada, com brotli.
+       Cidades de mesmo nome em estados diferentes ("Bom Jesus" no PI, RS, SC...) têm documentos separados.
+       Cada resposta guarda, no campo 'g', a geração da coleta a que pertence.
+    3. Renomeia as coleções temporárias sobre as coleções publicadas: primeiro a das respostas, depois a das previsões.
+    4. Grava o novo marcador de geração, usado pela API para invalidar os seus caches.
+    5. Acrescenta a coleta ao histórico (coleção 'Historico_previsao'): um documento por cidade e por dia previsto,
+       com uma entrada por hora de coleta. A coleção publicada é substituída a cada coleta; o histórico não.
+
+Troca de geração:
+    As duas renomeações da etapa 3 são operações separadas. A API só usa uma resposta pré-renderizada cujo campo 'g'
+    é igual à geração registrada ('resposta_da_geracao'); até lá, ela monta as respostas a partir das previsões.
+    Assim a gravação do marcador (etapa 4) é o único ponto de troca: entre as renomeações, ou se a segunda falhar,
+    as respostas novas não são servidas junto das previsões antigas.
+
+Histórico:
+    - Os documentos são atualizados com upsert e um pipeline de atualização que substitui a entrada da mesma hora,
+      portanto publicar duas vezes na mesma hora não duplica entradas.
+    - O índice único (c, d, uf) atende à consulta por cidade e intervalo de datas, já ordenada por data: os filtros
+      por cidade, data e UF são resolvidos no índice e apenas os documentos do intervalo são lidos, por inteiro.
+    - O índice TTL em 'expira_em' (data prevista + HISTORICO_RETENCAO_DIAS) remove os dias antigos. Com a coleta
+      horária das 7h às 20h e 7 dias de previsão, cada documento tem no máximo 14 x 7 entradas, e a coleção tem no
+      máximo (municípios x (HISTORICO_RETENCAO_DIAS + 7)) documentos. A retenção é definida pela configuração
+      HISTORICO_RETENCAO_DIAS do projeto Scrapy (settings.py) e repassada a 'publicar_coleta'.
+
+Funções:
+    - serializar_json(dados): Serializa os dados exatamente como o jsonify do Flask.
+    - variantes_comprimidas(corpo): Retorna o corpo sem compressão, com gzip e com brotli.
+    - chave_resposta(visao, cidade, uf): Retorna o _id da resposta pré-renderizada de uma cidade.
+    - materializar_respostas(db, geracao): Grava na coleção temporária de respostas o JSON pronto de cada cidade.
+    - resposta_da_geracao(resposta, estado_coleta): Indica se uma resposta pré-renderizada pertence à geração publicada.
+    - proxima_geracao(db): Retorna o número da geração que a próxima publicação vai registrar.
+    - registrar_geracao(db, geracao): Grava o marcador de geração da coleta.
+    - criar_indices_historico(db): Cria os índices da coleção de histórico.
+    - valores_literais(registro): Protege os textos de um registro que seriam lidos como caminhos de campos.
+    - arquivar_historico(db, coletada_em=None, retencao_dias=HISTORICO_RETENCAO_DIAS): Acrescenta a coleta publicada ao histórico.
+    - volume_suficiente(db, proporcao_minima=PROPORCAO_MINIMA_PUBLICACAO): Compara o tamanho da coleção temporária com o da publicada.
+    - descartar_coleta(db): Remove as coleções temporárias de uma coleta que não será publicada.
+    - publicar_coleta(db, arquivar=True, retencao_dias=HISTORICO_RETENCAO_DIAS): Executa todas as etapas da publicação.
+
+Coletas incompletas:
+    A pipeline e o coordenador da coleta fragmentada só publicam uma coleta que terminou normalmente e que tem ao
+    menos PROPORCAO_MINIMA_PUBLICACAO dos documentos da coleta publicada ('volume_suficiente'). Caso contrário, a
+    coleção temporária é descartada com 'descartar_coleta' e a API continua servindo a coleta anterior, completa.
+"""
+from datetime import datetime, timedelta, timezone
+import gzip
+import json
+from bson import Binary
+from pymongo import ASCENDING, UpdateOne
+from Dados_Climaticos.esquema_previsao import formatar_previsao, registro_historico
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLECAO_PREVISAO = 'Previsao_do_tempo'
+COLECAO_STAGING = 'Previsao_do_tempo_staging'
+COLECAO_CONTROLE = 'Controle_de_coleta'
+COLECAO_RESPOSTAS = 'Previsao_renderizada'
+COLECAO_RESPOSTAS_STAGING = 'Previsao_renderizada_staging'
+COLECAO_HISTORICO = 'Historico_previsao'
+INDICE_HISTORICO = 'c_1_d_1_uf_1'
+TAMANHO_LOTE_RESPOSTAS = 500
+TAMANHO_LOTE_HISTORICO = 1000
+PROPORCAO_MINIMA_PUBLICACAO = 0.9
+HISTORICO_RETENCAO_DIAS = 30
+
+def serializar_json(dados):
+    """
+    Serializa os dados com as mesmas opções do jsonify do Flask (chaves ordenadas, ASCII e formato compacto).
+
+    Parâmetros:
+        dados (dict ou list): Os dados a serem serializados.
+
+    Retorna:
+        bytes: O corpo JSON da resposta.
+    """
+    return (json.dumps(dados, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+def variantes_comprimidas(corpo):
+    """
+    Retorna o corpo da resposta em cada codificação suportada.
+
+    Parâmetros:
+        corpo (bytes): O corpo JSON sem compressão.
+
+    Retorna:
+        dict: {'identity': bytes, 'gzip': bytes, 'br': bytes}, sem a chave 'br' se o brotli não estiver instalado.
+    """
+    variantes = {'identity': Binary(corpo), 'gzip': Binary(gzip.compress(corpo, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variantes['br'] = Binary(brotli.compress(corpo, quality=11))
+    return variantes
+
+def chave_resposta(visao, cidade, uf):
+    """
+    Retorna o _id da resposta pré-renderizada de uma cidade.
+
+    Parâmetros:
+        visao (str): 'dia' ou 'semana'.
+        cidade (str): O nome da cidade, como gravado na coleta.
+        uf (str): A sigla do estado.
+
+    Retorna:
+        str: '<visao>:<cidade>:<uf>', por exemplo 'dia:Bom Jesus:PI'.
+    """
+    return f'{visao}:{cidade}:{uf}'
+
+def materializar_respostas(db, geracao):
+    """
+    Grava na coleção temporária de respostas o JSON pronto das rotas do dia e da semana de cada cidade.
+
+    As previsões são agrupadas por cidade e UF. Cada documento tem o _id retornado por 'chave_resposta'
+    ('dia:<cidade>:<uf>' ou 'semana:<cidade>:<uf>'), a geração 'g' e um campo por codificação.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+        geracao (int): A geração que a publicação desta coleta vai registrar.
+    """
+    semanas = {}
+    for previsao in db[COLECAO_STAGING].find({}, {'_id': 0}).sort([('c', ASCENDING), ('d', ASCENDING)]):
+        semanas.setdefault((previsao['c'], previsao['uf']), []).append(formatar_previsao(previsao))
+
+    respostas = db[COLECAO_RESPOSTAS_STAGING]
+    respostas.drop()
+    lote = []
+    for (cidade, uf), semana in semanas.items():
+        lote.append({'_id': chave_resposta('dia', cidade, uf), 'g': geracao, **variantes_comprimidas(serializar_json(semana[0]))})
+        lote.append({'_id': chave_resposta('semana', cidade, uf), 'g': geracao, **variantes_comprimidas(serializar_json(semana))})
+        if len(lote) >= TAMANHO_LOTE_RESPOSTAS:
+            respostas.insert_many(lote, ordered=True)
+            lote = []
+    if lote:
+        respostas.insert_many(lote, ordered=True)
+
+def resposta_da_geracao(resposta, estado_coleta):
+    """
+    Indica se uma resposta pré-renderizada pertence à geração publicada e pode ser servida.
+
+    Parâmetros:
+        resposta (dict): O documento da coleção de respostas, ou None.
+        estado_coleta (tuple): (geracao, finalizada_em) lidos do marcador de geração, ou None.
+
+    Retorna:
+        bool: True se a resposta existe e foi materializada para a geração registrada.
+    """
+    return resposta is not None and estado_coleta is not None and resposta.get('g') == estado_coleta[0]
+
+def proxima_geracao(db):
+    """
+    Retorna o número da geração que a próxima publicação vai registrar.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+
+    Retorna:
+        int: A geração registrada mais um, ou 1 se nenhuma coleta foi publicada.
+    """
+    controle = db[COLECAO_CONTROLE].find_one({'_id': COLECAO_PREVISAO}, {'geracao': 1})
+    return (controle or {}).get('geracao', 0) + 1
+
+def registrar_geracao(db, geracao):
+    """
+    Grava o marcador de geração da coleta na coleção de controle.
+
+    A API compara esse marcador com o valor conhecido pelo seu cache em memória e descarta as
+    previsões armazenadas quando uma nova coleta é publicada. O horário de finalização, em UTC, é
+    enviado pela API no cabeçalho Last-Modified. A partir deste ponto as respostas pré-renderizadas
+    materializadas para 'geracao' passam a ser servidas.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+        geracao (int): A geração da coleta publicada, retornada por 'proxima_geracao'.
+    """
+    db[COLECAO_CONTROLE].update_one(
+        {'_id': COLECAO_PREVISAO},
+        {'$set': {'geracao': geracao, 'finalizada_em': datetime.now(timezone.utc)}},
+        upsert=True)
+
+def criar_indices_historico(db):
+    """
+    Cria os índices da coleção de histórico: o índice único (c, d, uf) das consultas e o índice TTL de 'expira_em'.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+    """
+    historico = db[COLECAO_HISTORICO]
+    historico.create_index([('c', ASCENDING), ('d', ASCENDING), ('uf', ASCENDING)], name=INDICE_HISTORICO, unique=True)
+    historico.create_index('expira_em', expireAfterSeconds=0)
+
+def valores_literais(registro):
+    """
+    Prepara um registro para ser usado como valor em um pipeline de atualização, onde textos iniciados por '$' seriam
+    lidos como caminhos de campos. Apenas esses textos são protegidos com $literal; os demais valores são constantes.
+
+    Parâmetros:
+        registro (dict): O registro do histórico de uma coleta.
+
+    Retorna:
+        dict: O registro com os textos iniciados por '$' envolvidos em $literal.
+    """
+    return {campo: {'$literal': valor} if isinstance(valor, str) and valor.startswith('$') else valor
+            for campo, valor in registro.items()}
+
+def arquivar_historico(db, coletada_em=None, retencao_dias=HISTORICO_RETENCAO_DIAS):
+    """
+    Acrescenta a coleta publicada ao histórico.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+        coletada_em (datetime): O horário da coleta, no horário local; por padrão, o horário atual.
+        retencao_dias (int): Por quantos dias, depois da data prevista, cada documento é mantido.
+
+    Retorna:
+        int: Quantidade de previsões arquivadas.
+    """
+    criar_indices_historico(db)
+    hora = (coletada_em or datetime.now()).replace(minute=0, second=0, microsecond=0)
+    historico = db[COLECAO_HISTORICO]
+    arquivadas = 0
+    lote = []
+    for previsao in db[COLECAO_PREVISAO].find({}, {'_id': 0}):
+        registro = registro_historico(previsao, hora)
+        lote.append(UpdateOne(
+            {'c': previsao['c'], 'd': previsao['d'], 'uf': previsao['uf']},
+            [{'$set': {
+                'expira_em': previsao['d'] + timedelta(days=retencao_dias),
+                's': {'$concatArrays': [
+                    {'$filter': {'input': {'$ifNull': ['$s', []]}, 'cond': {'$ne': ['$$this.h', hora]}}},
+                    [valores_literais(registro)]]}
+            }}],
+            upsert=True))
+        if len(lote) >= TAMANHO_LOTE_HISTORICO:
+            historico.bulk_write(lote, ordered=False)
+            arquivadas += len(lote)
+            lote = []
+    if lote:
+        historico.bulk_write(lote, ordered=False)
+        arquivadas += len(lote)
+    return arquivadas
+
+def volume_suficiente(db, proporcao_minima=PROPORCAO_MINIMA_PUBLICACAO):
+    """
+    Verifica se a coleção temporária tem documentos suficientes para substituir a coleção publicada.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+        proporcao_minima (float): Fração mínima da quantidade de documentos da coleção publicada.
+
+    Retorna:
+        bool: True se a coleção temporária tem ao menos 'proporcao_minima' dos documentos publicados, ou se ainda
+        não há coleção publicada.
+    """
+    return db[COLECAO_STAGING].count_documents({}) >= proporcao_minima * db[COLECAO_PREVISAO].estimated_document_count()
+
+def descartar_coleta(db):
+    """
+    Remove as coleções temporárias de uma coleta que não será publicada. As coleções publicadas não são alteradas.
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+    """
+    db[COLECAO_STAGING].drop()
+    db[COLECAO_RESPOSTAS_STAGING].drop()
+
+def publicar_coleta(db, arquivar=True, retencao_dias=HISTORICO_RETENCAO_DIAS):
+    """
+    Publica a coleção temporária de forma atômica.
+
+    Os índices e as respostas pré-renderizadas são criados a partir da coleção temporária e, por fim, as
+    coleções temporárias são renomeadas sobre as publicadas. Dessa forma a API nunca lê uma coleção vazia
+    ou parcialmente preenchida. O registro da nova geração é o ponto de troca das respostas pré-renderizadas
+    (ver 'Troca de geração' acima).
+
+    Parâmetros:
+        db (pymongo.database.Database): O banco de dados da coleta.
+        arquivar (bool): Se True, a coleta publicada também é acrescentada ao histórico.
+        retencao_dias (int): Por quantos dias, depois da data prevista, cada documento do histórico é mantido.
+
+    Retorna:
+        bool: True se a coleta foi publicada, False se a coleção temporária estava vazia.
+    """
+    staging = db[COLECAO_STAGING]
+    if not staging.estimated_document_count():
+        return False
+    staging.create_index([('c', ASCENDING), ('d', ASCENDING)])
+    staging.create_index([('d', ASCENDING)])
+    geracao = proxima_geracao(db)
+    materializar_respostas(db, geracao)
+    db[COLECAO_RESPOSTAS_STAGING].rename(COLECAO_RESPOSTAS, dropTarget=True)
+    staging.rename(COLECAO_PREVISAO, dropTarget=True)
+    registrar_geracao(db, geracao)
+    if arquivar:
+        arquivar_historico(db, retencao_dias=retencao_dias)
+    return True
@@ -19,6 +19,9 @@ NEWSPIDER_MODULE = "Dados_Climaticos.spiders"
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = True
 
+# Modo de extração da previsão: 'automatico' (API do INMET com Selenium como alternativa), 'http' ou 'selenium'
+MODO_EXTRACAO = 'automatico'
+
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
 #CONCURRENT_REQUESTS = 32
 
@@ -27,7 +30,9 @@ ROBOTSTXT_OBEY = True
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+# Limita as requisições HTTP à API do INMET. As páginas renderizadas pelo RenderizacaoSeleniumMiddleware não passam
+# pelo slot do downloader; a concorrência da renderização é definida apenas por SELENIUM_POOL_TAMANHO
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -50,15 +55,25 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "Dados_Climaticos.middlewares.DadosClimaticosDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    "Dados_Climaticos.middlewares.RenderizacaoSeleniumMiddleware": 543,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    "Dados_Climaticos.telemetria.TelemetriaColeta": 500,
+}
+
+# Mede o tempo de cada etapa da coleta e grava um relatório JSON ao final (ver telemetria.py)
+TELEMETRIA_ATIVA = True
+
+# Arquivo do relatório da execução, relativo ao diretório da spider. O agendador (executando_spider.py) define um
+# arquivo por fragmento e acrescenta os relatórios ao histórico de execuções
+TELEMETRIA_ARQUIVO = 'relatorio_coleta.json'
+
+# Intervalo, em segundos, entre os registros de progresso da telemetria no log (0 desativa)
+TELEMETRIA_INTERVALO = 60
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -72,6 +87,36 @@ MONGO_URI = 'mongodb://localhost:27017/'
 # Configuração do nome do banco de dados MongoDB (opcional)
 MONGO_DATABASE = 'Dados_Climaticos'
 
+# Quantidade de documentos enviados ao MongoDB em cada insert_many ao publicar a coleta
+MONGO_TAMANHO_LOTE = 1000
+
+# Grava os lotes na coleção temporária durante a coleta, limitando o uso de memória a um lote
+MONGO_STREAMING = True
+
+# Tempo máximo, em segundos, que um lote incompleto permanece em memória no modo streaming
+MONGO_INTERVALO_FLUSH = 30
+
+# Limpa a coleção temporária no início e a publica ao final da coleta. Desativado nos processos da coleta
+# fragmentada, em que o coordenador (executando_spider.py) publica depois que todos os fragmentos terminam
+MONGO_PUBLICAR = True
+
+# A coleta só é publicada se a spider terminar normalmente e gravar ao menos esta fração dos documentos da coleta
+# publicada; caso contrário, a coleção temporária é descartada e a coleta anterior continua publicada
+MONGO_PROPORCAO_MINIMA = 0.9
+
+# Por quantos dias, depois da data prevista, cada dia do histórico das previsões é mantido (índice TTL)
+HISTORICO_RETENCAO_DIAS = 30
+
+# Número máximo de navegadores Chrome abertos ao mesmo tempo, que é também o tamanho do ThreadPool da renderização
+# (páginas renderizadas em paralelo)
+SELENIUM_POOL_TAMANHO = 4
+
+# Quantidade de páginas carregadas por um navegador antes de ele ser encerrado e substituído
+SELENIUM_PAGINAS_POR_DRIVER = 200
+
+# Tempo máximo, em segundos, de espera pelos dados da previsão em cada página renderizada
+SELENIUM_TEMPO_ESPERA = 15
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
@@ -1,48 +1,66 @@
+import json
+import re
 import scrapy
-import logging
-from selenium.webdriver.remote.remote_connection import LOGGER
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options 
-from scrapy.selector import Selector
-from time import sleep
+from Dados_Climaticos.esquema_extracao import extrair_pagina
+from Dados_Climaticos.telemetria import medidor_da_coleta, codigo_da_url
 
-def iniciar_driver():
-    """ Inicializa e retorna uma instância do driver do Google Chrome configurado com opções personalizadas.
+CAMPOS_TEXTO = ('cidade data', 'codicao meteorologica', 'vento')
+CAMPOS_NUMERICOS = ('temperatura minima', 'temperatura maxima', 'umidade minima', 'umidade maxima')
+CAMPOS_ITEM = ('cidade data', 'codicao meteorologica', 'temperatura minima', 'temperatura maxima',
+               'umidade minima', 'umidade maxima', 'vento')
 
-    Retorna:
-        selenium.webdriver.Chrome: Uma instância do driver do Google Chrome.
-
-    Configurações Personalizadas:
-        - Idioma: Português do Brasil
-        - Tamanho da janela: 1000x1000 pixels
-        - Modo headless (sem interface gráfica)
-        - Exclui logs do Chrome
-        - Desabilita a solicitação de download
-        - Desativa notificações do navegador
-        - Permite downloads automáticos
+def extrair_previsao_api(dados):
+    """
+    Converte o JSON da API de previsão do INMET nos mesmos itens produzidos pela extração via navegador.
 
-    Nota:
-        Certifique-se de ter o Chrome WebDriver instalado e no PATH do sistema.
-        Certifique_se de ter a biblioteca Selenium instalada e configurada corretamenta. """
+    Os primeiros dias da previsão vêm divididos em períodos (manhã, tarde e noite). Nesses casos a
+    temperatura e a umidade mínimas/máximas consideram todos os períodos, e a condição e o vento são os da tarde.
 
-    chromeOptions = Options()
-    LOGGER.setLevel(logging.WARNING)
-    arguments = ['--lang=pt-BR', 'window-size=1000,1000', '--headless']
-    for argument in arguments:
-        chromeOptions.add_argument(argument)
+    Parâmetros:
+        dados (dict): O JSON retornado pela API, no formato {codigo: {data: previsao_do_dia}}.
 
-    chromeOptions.add_experimental_option(
-        'excludeSwitches', ['enable-logging'])
+    Retorna:
+        list: Uma lista de dicionários com os campos de CAMPOS_ITEM, um por dia, com as temperaturas e as umidades
+        em inteiros, como os itens de esquema_extracao.extrair_pagina.
+    """
+    itens = []
+    for previsao_cidade in dados.values():
+        for data, previsao_dia in previsao_cidade.items():
+            periodos = [previsao_dia[periodo] for periodo in ('manha', 'tarde', 'noite') if periodo in previsao_dia]
+            if not periodos:
+                periodos = [previsao_dia]
+            referencia = previsao_dia.get('tarde', periodos[0])
+            itens.append({
+                'cidade data': f"{referencia['entidade']}-{referencia['uf']}, {data} - {referencia['dia_semana']}",
+                'codicao meteorologica': f" {referencia['resumo']} ",
+                'temperatura minima': min(int(periodo['temp_min']) for periodo in periodos),
+                'temperatura maxima': max(int(periodo['temp_max']) for periodo in periodos),
+                'umidade minima': min(int(periodo['umidade_min']) for periodo in periodos),
+                'umidade maxima': max(int(periodo['umidade_max']) for periodo in periodos),
+                'vento': referencia['int_vento']
+            })
+    return itens
+
+def item_valido(item):
+    """
+    Verifica se um item extraído tem todos os campos preenchidos e no formato esperado pela pipeline.
 
-    chromeOptions.add_experimental_option('prefs', {
-        'download.prompt_for_download': False,
-        'profile.default_content_setting_values.notifications': 2,
-        'profile.default_content_setting_values.automatic_downloads': 1,
-    })
+    Os campos de texto devem estar preenchidos, e as temperaturas e umidades devem ser inteiros, com as
+    umidades entre 0 e 100.
 
-    driver = webdriver.Chrome(options=chromeOptions)
+    Parâmetros:
+        item (dict): O item extraído.
 
-    return driver
+    Retorna:
+        bool: True se o item puder ser processado pela pipeline, False caso contrário.
+    """
+    if not all(isinstance(item.get(campo), str) and item[campo].strip() for campo in CAMPOS_TEXTO):
+        return False
+    if not all(type(item.get(campo)) is int for campo in CAMPOS_NUMERICOS):
+        return False
+    if not re.search(r'-.*,\s*\d{2}/\d{2}/\d{4}\s*-', item['cidade data']):
+        return False
+    return 0 <= item['umidade minima'] <= 100 and 0 <= item['umidade maxima'] <= 100
 
 class DadosClimaticosSpider(scrapy.Spider):
     """ Uma spider Scrapy para coletar dados climáticos de várias cidades a partir do site do INMET (Instituto Nacional de Meteorologia).
@@ -51,17 +69,54 @@ class DadosClimaticosSpider(scrapy.Spider):
 
     Parâmetros:
         name (str): Nome da spider.
+        fragmento (int): O índice do fragmento de cidades coletado por este processo (argumento '-a fragmento=N').
+        fragmentos (int): O número total de fragmentos em que as cidades são divididas (argumento '-a fragmentos=K').
 
     Métodos:
+        codigos(self, file='codigo_IBGE.txt'): Lê os códigos IBGE das cidades do arquivo de entrada.
         urls(self, file='codigo_IBGE.txt'): Gera uma lista de URLs individuais com base em códigos de cidades em um arquivo de entrada.
-        start_requests(self): Inicializa as solicitações para as URLs especificadas.
-        parse(self, response): Analisa as páginas de previsão do tempo e extrai informações climáticas.
+        start_requests(self): Inicializa as solicitações de acordo com o modo de extração configurado.
+        parse_api(self, response): Extrai a previsão do JSON da API do INMET, sem navegador.
+        renderizar_pagina(self, failure_ou_response): Recorre à renderização com o Selenium quando a extração via API falha.
+        parse(self, response): Analisa as páginas de previsão do tempo e extrai informações climáticas com o esquema de esquema_extracao.py.
 
     Configuração:
         Certifique-se de ter a biblioteca Scrapy instalada e configurada corretamente.
+        As páginas são renderizadas pelo 'RenderizacaoSeleniumMiddleware' (ver middlewares.py), fora da thread do reactor,
+        para as requisições marcadas com meta={'renderizar': True}.
+        A constante "MODO_EXTRACAO" no settings.py escolhe como a previsão é obtida:
+            - 'automatico': consulta a API do INMET com requisições HTTP simples e, se a resposta não passar
+              na validação, renderiza a página com o Selenium.
+            - 'http': usa apenas a API do INMET, sem navegador.
+            - 'selenium': renderiza todas as páginas com o Selenium.
+        A extração e as cidades que falharam são registradas na telemetria da coleta (ver telemetria.py). No modo
+        'automatico', uma falha da API só é registrada se a renderização com o Selenium também falhar; as cidades
+        que recorreram ao Selenium são contadas em 'extracao.alternativa_selenium'.
 
     """
     name = 'botdadosclimaticos'
+    url_pagina = 'https://previsao.inmet.gov.br/'
+    url_api = 'https://apiprevmet3.inmet.gov.br/previsao/'
+
+    def __init__(self, fragmento=0, fragmentos=1, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragmento = int(fragmento)
+        self.fragmentos = int(fragmentos)
+        self.alternativas_selenium = 0
+
+    def codigos(self,file='codigo_IBGE.txt'):
+        """
+        Lê os códigos IBGE das cidades do arquivo de entrada, mantendo apenas os do fragmento desta spider.
+
+        Parâmetros:
+            file (str): O nome do arquivo de entrada que contém os códigos de cidade separados por ';'.
+
+        Retorna:
+            list: Uma lista com os códigos de cidade do fragmento (os 5570 quando há um único fragmento).
+        """
+        with open(file,'r',encoding='UTF-8') as arquivo:
+            codigos = [codigo.strip() for codigo in arquivo.read().split(';') if codigo.strip()]
+        return codigos[self.fragmento::self.fragmentos]
 
     def urls(self,file='codigo_IBGE.txt'):
         """
@@ -74,52 +129,75 @@ class DadosClimaticosSpider(scrapy.Spider):
             list: Uma lista com 5570 URLs geradas com base nos códigos de cidade.
 
         """
-        with open(file,'r',encoding='UTF-8') as arquivo:
-            codigos = arquivo.read().split(';')
-            return ['https://previsao.inmet.gov.br/' + codigo for codigo in codigos]
+        return [self.url_pagina + codigo for codigo in self.codigos(file)]
 
     def start_requests(self):
-        """ Inicializa as solicitações para as URLs especificadas. """
-        urls_ = self.urls()
-        for url in urls_:
-            yield scrapy.Request(url=url,callback=self.parse, meta={'next_url':url})
+        """ Inicializa as solicitações de acordo com o modo de extração configurado. """
+        modo = self.settings.get('MODO_EXTRACAO', 'automatico')
+        medidor_da_coleta(self.crawler).registrar_contadores(
+            'extracao', lambda: {'alternativa_selenium': self.alternativas_selenium})
+        for codigo in self.codigos():
+            if modo == 'selenium':
+                yield scrapy.Request(url=self.url_pagina + codigo, callback=self.parse, meta={'renderizar':True})
+            else:
+                yield scrapy.Request(url=self.url_api + codigo, callback=self.parse_api,
+                                     errback=self.renderizar_pagina, meta={'codigo':codigo, 'modo':modo})
+
+    def parse_api(self, response):
+        """
+        Extrai a previsão do JSON da API do INMET, sem navegador.
+
+        Se o JSON não puder ser lido ou algum item não passar na validação, a página da cidade é
+        renderizada com o Selenium (modo 'automatico') ou a cidade é descartada (modo 'http').
+
+        Parâmetros:
+            response (scrapy.http.Response): A resposta da API do INMET.
+        """
+        with medidor_da_coleta(self.crawler).medir('extracao_api'):
+            try:
+                itens = extrair_previsao_api(json.loads(response.text))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                itens = []
+        if itens and all(item_valido(item) for item in itens):
+            yield from itens
+        else:
+            yield from self.renderizar_pagina(response)
+
+    def renderizar_pagina(self, failure_ou_response):
+        """
+        Recorre à renderização com o Selenium quando a extração via API falha.
+
+        No modo 'http' a falha da API é registrada na telemetria. No modo 'automatico' a cidade é apenas contada
+        como alternativa; se a renderização ou a extração da página também falharem, o middleware ou o 'parse'
+        registram a falha.
+
+        Parâmetros:
+            failure_ou_response: A falha da requisição (quando usado como errback) ou a resposta inválida da API.
+        """
+        request = failure_ou_response.request
+        codigo = request.meta['codigo']
+        erro = getattr(failure_ou_response, 'value', 'resposta inválida da API')
+        if request.meta.get('modo') == 'http':
+            medidor_da_coleta(self.crawler).falha(codigo, 'api', erro)
+            self.logger.warning('Previsão da cidade %s não obtida pela API do INMET.', codigo)
+            return
+        self.alternativas_selenium += 1
+        self.logger.info('Extração via API falhou para a cidade %s (%s); renderizando com o Selenium.', codigo, erro)
+        yield scrapy.Request(url=self.url_pagina + codigo, callback=self.parse, meta={'renderizar':True})
     
     def parse(self,response):
         """
         Analisa as páginas de previsão do tempo e extrai informações climáticas.
 
         Parâmetros:
-            response (scrapy.http.Response): A resposta HTTP da página da web.
+            response (scrapy.http.Response): A resposta com o HTML já renderizado pelo navegador.
         """
-        driver = iniciar_driver()
-        driver.get(response.meta['next_url'])
-        sleep(2)
-        response_webdriver = Selector(text=driver.page_source)
-        yield {
-            'cidade data':response_webdriver.xpath("//div//section[@class='grid grid-template-columns-2 no-border align-left'][1]/div/font/b/text()").get(),
-            'codicao meteorologica':response_webdriver.xpath("//section[@id='row-1']//div[@class='grid grid-template-columns-2-minmax no-border']//font/text()").getall()[1].replace(':',''),
-            'temperatura minima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[0],
-            'temperatura maxima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[2],
-            'umidade minima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[5],
-            'umidade maxima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[4],
-            'vento':response_webdriver.xpath("//div[@class='item']//section[@class='grid grid-template-columns-2 no-border']/div[@class='item']/font/text()").getall()[3]
-        }
-        yield {
-            'cidade data':response_webdriver.xpath("//div//section[@class='grid grid-template-columns-2 no-border align-left'][2]/div/font/b/text()").get(),
-            'codicao meteorologica':response_webdriver.xpath("//section[@id='row-2']//div[@class='grid grid-template-columns-2-minmax no-border']//font/text()").getall()[1].replace(':',''),
-            'temperatura minima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[6],
-            'temperatura maxima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[8],
-            'umidade minima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[11],
-            'umidade maxima':response_webdriver.xpath("//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[10],
-            'vento':response_webdriver.xpath("//div[@class='item']//section[@class='grid grid-template-columns-2 no-border']/div[@class='item']/font/text()").getall()[9]
-        }
-        for element in response_webdriver.xpath("//div[starts-with(@class,'row-')]"):
-            yield {
-                'cidade data':element.xpath(".//section[@class='grid grid-template-columns-1 no-border align-left']/div/font/b/text()").get(),
-                'codicao meteorologica':element.xpath(".//section[@class='grid grid-template-columns-2-minmax no-border align-left']/div/font/text()").get().replace(':',''),
-                'temperatura minima':element.xpath(".//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[0],
-                'temperatura maxima':element.xpath(".//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[2],
-                'umidade minima':element.xpath(".//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[5],
-                'umidade maxima':element.xpath(".//section[@class='grid grid-template-columns-4']/div/font/text()").getall()[4],
-                'vento':element.xpath(".//section[@class='grid grid-template-columns-2']/div/font/text()").getall()[1]
-            }
\ No newline at end of file
+        medidor = medidor_da_coleta(self.crawler)
+        with medidor.medir('extracao_pagina'):
+            itens = extrair_pagina(response.selector.root)
+        for item in itens:
+            if item_valido(item):
+                yield item
+            else:
+                medidor.falha(codigo_da_url(response.url), 'extracao', 'item incompleto descartado')
+                self.logger.warning('Item incompleto descartado em %s: %s', response.url, item)
@@ -0,0 +1,323 @@
+"""
+Telemetria de Desempenho da Coleta
+
+Este módulo mede o tempo gasto em cada etapa da coleta, página a página, e grava ao final um relatório JSON da
+execução, de modo que uma coleta lenta possa ser atribuída à etapa responsável.
+
+Etapas medidas:
+    - download_http: Download da resposta da API do INMET (latência medida pelo Scrapy).
+    - inicio_navegador: Inicialização de um Chrome pelo pool de drivers (ver pool_drivers.py).
+    - carregamento_pagina: driver.get da página da cidade.
+    - espera_dados: Espera até que os dados da previsão estejam presentes na página (substitui a antiga pausa fixa).
+    - extracao_api / extracao_pagina: Extração dos itens do JSON da API e do HTML renderizado.
+    - processamento_item: Conversão do item para o documento tipado em process_item.
+    - gravacao_mongo: Cada insert_many de um lote na coleção temporária.
+    - publicacao: Publicação da coleção temporária (índices, respostas pré-renderizadas e histórico).
+
+Classes:
+    - MedidorEtapas: Acumula as durações das etapas, as falhas por cidade e os contadores dos componentes.
+    - TelemetriaColeta: Extensão do Scrapy que mostra o progresso durante a coleta e grava o relatório ao final.
+
+Funções:
+    - medidor_da_coleta(crawler): Retorna o medidor da coleta, ou um medidor inativo se a extensão estiver desativada.
+    - codigo_da_url(url): Retorna o código IBGE da cidade a partir da URL da requisição.
+
+Configuração:
+    EXTENSIONS = {
+        'Dados_Climaticos.telemetria.TelemetriaColeta': 500,
+    }
+    TELEMETRIA_ATIVA, TELEMETRIA_ARQUIVO e TELEMETRIA_INTERVALO no settings.py.
+
+Nota:
+    - O relatório é lido pelo agendador (executando_spider.py), que o acrescenta ao histórico de execuções.
+    - Os contadores incluem os navegadores criados e reiniciados pelo pool e as cidades em que a spider recorreu ao
+      Selenium depois de uma falha da API ('extracao.alternativa_selenium'), que não contam como falha.
+    - A renderização acontece em threads do middleware; por isso o medidor protege os seus dados com uma trava.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from time import monotonic, perf_counter
+import json
+import os
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+def codigo_da_url(url):
+    """
+    Retorna o código IBGE da cidade a partir da URL da página ou da API do INMET.
+
+    Parâmetros:
+        url (str): A URL da requisição, terminada pelo código da cidade.
+
+    Retorna:
+        str: O código da cidade.
+    """
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+def _percentil(duracoes, fracao):
+    return duracoes[min(len(duracoes) - 1, int(fracao * len(duracoes)))]
+
+
+class MedidorEtapas:
+    """
+    Acumula as durações das etapas da coleta, as falhas por cidade e os contadores dos componentes.
+
+    Atributos:
+        ativo (bool): Se False, nenhuma medição é registrada.
+
+    Métodos:
+        medir(self, etapa): Gerenciador de contexto que mede o bloco como uma etapa.
+        registrar(self, etapa, segundos): Registra a duração de uma etapa medida em outro lugar.
+        cronometrado(self, etapa, funcao): Retorna a função com cada chamada medida como a etapa.
+        falha(self, cidade, etapa, erro): Registra uma falha na coleta de uma cidade.
+        registrar_contadores(self, nome, contadores): Registra uma função que retorna contadores de um componente.
+        resumo_etapas(self): Retorna a contagem, o total e os percentis de cada etapa.
+        resumo_falhas(self): Retorna as falhas por etapa e por cidade.
+        contadores(self): Retorna os contadores atuais dos componentes registrados.
+    """
+
+    def __init__(self, ativo=True):
+        self.ativo = ativo
+        self._duracoes = defaultdict(list)
+        self._falhas = defaultdict(list)
+        self._fontes = {}
+        self._trava = Lock()
+
+    @contextmanager
+    def medir(self, etapa):
+        if not self.ativo:
+            yield
+            return
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, perf_counter() - inicio)
+
+    def registrar(self, etapa, segundos):
+        if self.ativo:
+            with self._trava:
+                self._duracoes[etapa].append(segundos)
+
+    def cronometrado(self, etapa, funcao):
+        def medida(*args, **kwargs):
+            with self.medir(etapa):
+                return funcao(*args, **kwargs)
+        return medida
+
+    def falha(self, cidade, etapa, erro):
+        """
+        Registra uma falha na coleta de uma cidade.
+
+        Parâmetros:
+            cidade (str): O código IBGE da cidade.
+            etapa (str): A etapa em que a falha ocorreu, por exemplo 'api', 'renderizacao' ou 'extracao'.
+            erro (str | Exception): A descrição ou a exceção da falha.
+        """
+        if not self.ativo:
+            return
+        if not isinstance(erro, str):
+            mensagem = str(erro).strip()
+            erro = f'{type(erro).__name__}: {mensagem}' if mensagem else type(erro).__name__
+        with self._trava:
+            self._falhas[cidade].append({'etapa': etapa, 'erro': erro[:200]})
+
+    def registrar_contadores(self, nome, contadores):
+        """
+        Registra uma fonte de contadores incluída no progresso e no relatório.
+
+        Parâmetros:
+            nome (str): O nome da fonte, por exemplo 'navegadores'.
+            contadores (callable): Função sem parâmetros que retorna um dicionário de números.
+        """
+        if self.ativo:
+            self._fontes[nome] = contadores
+
+    def resumo_etapas(self):
+        """
+        Retorna, para cada etapa, a contagem, o total em segundos e a média, a mediana, o p95 e o máximo em milissegundos.
+
+        Retorna:
+            dict: {etapa: {'contagem', 'total_segundos', 'media_ms', 'p50_ms', 'p95_ms', 'maximo_ms'}}.
+        """
+        with self._trava:
+            duracoes = {etapa: sorted(valores) for etapa, valores in self._duracoes.items()}
+        return {
+            etapa: {
+                'contagem': len(valores),
+                'total_segundos': round(sum(valores), 3),
+                'media_ms': round(sum(valores) / len(valores) * 1000, 2),
+                'p50_ms': round(_percentil(valores, 0.50) * 1000, 2),
+                'p95_ms': round(_percentil(valores, 0.95) * 1000, 2),
+                'maximo_ms': round(valores[-1] * 1000, 2)
+            }
+            for etapa, valores in sorted(duracoes.items()) if valores}
+
+    def resumo_falhas(self):
+        """
+        Retorna as falhas registradas.
+
+        Retorna:
+            dict: {'total', 'cidades', 'por_etapa': {etapa: quantidade}, 'por_cidade': {cidade: [falhas]}}.
+        """
+        with self._trava:
+            por_cidade = {cidade: list(falhas) for cidade, falhas in self._falhas.items()}
+        por_etapa = defaultdict(int)
+        for falhas in por_cidade.values():
+            for falha in falhas:
+                por_etapa[falha['etapa']] += 1
+        return {
+            'total': sum(por_etapa.values()),
+            'cidades': len(por_cidade),
+            'por_etapa': dict(sorted(por_etapa.items())),
+            'por_cidade': dict(sorted(por_cidade.items()))
+        }
+
+    def contadores(self):
+        return {nome: contadores() for nome, contadores in self._fontes.items()}
+
+MEDIDOR_INATIVO = MedidorEtapas(ativo=False)
+
+def medidor_da_coleta(crawler):
+    """
+    Retorna o medidor criado pela extensão TelemetriaColeta para o crawler.
+
+    Parâmetros:
+        crawler (scrapy.crawler.Crawler): O crawler da coleta.
+
+    Retorna:
+        MedidorEtapas: O medidor da coleta, ou MEDIDOR_INATIVO se a extensão não estiver ativa.
+    """
+    return getattr(crawler, 'medidor_etapas', MEDIDOR_INATIVO)
+
+
+class TelemetriaColeta:
+    """
+    Extensão do Scrapy que acompanha o desempenho da coleta.
+
+    Durante a coleta, a cada 'intervalo' segundos, registra no log as páginas e itens coletados, os itens por
+    segundo, as cidades com falha, os reinícios de navegador e o tempo médio de cada etapa. Ao final, grava em
+    'arquivo' o relatório JSON da execução.
+
+    Atributos:
+        medidor (MedidorEtapas): O medidor compartilhado com o middleware, a spider e a pipeline.
+        arquivo (str): O caminho do relatório JSON.
+        intervalo (float): Intervalo, em segundos, entre os registros de progresso no log.
+
+    Métodos:
+        from_crawler(cls, crawler): Cria a extensão e disponibiliza o medidor no crawler.
+        spider_opened(self, spider): Inicia a contagem e o registro periódico do progresso.
+        response_received(self, response, request, spider): Conta as páginas e mede o download das respostas HTTP.
+        item_scraped(self, item, response, spider): Conta os itens coletados.
+        spider_error(self, failure, response, spider): Registra como falha da cidade um erro na spider.
+        reportar_progresso(self, spider): Registra o progresso atual no log.
+        relatorio(self, spider, motivo): Monta o relatório da execução.
+        spider_closed(self, spider, reason): Encerra o registro do progresso e guarda o motivo do encerramento.
+        engine_stopped(self): Grava o relatório JSON da execução.
+
+    O relatório é gravado em engine_stopped, depois de todos os receptores de spider_closed, para que inclua a
+    publicação da coleta, feita pela pipeline ao receber esse sinal.
+    """
+
+    def __init__(self, arquivo='relatorio_coleta.json', intervalo=60):
+        self.medidor = MedidorEtapas()
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self.paginas = 0
+        self.itens = 0
+        self.tarefa_progresso = None
+        self.encerramento = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('TELEMETRIA_ATIVA', True):
+            raise NotConfigured
+        s = cls(arquivo=crawler.settings.get('TELEMETRIA_ARQUIVO', 'relatorio_coleta.json'),
+                intervalo=crawler.settings.getfloat('TELEMETRIA_INTERVALO', 60))
+        crawler.medidor_etapas = s.medidor
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(s.engine_stopped, signal=signals.engine_stopped)
+        crawler.signals.connect(s.response_received, signal=signals.response_received)
+        crawler.signals.connect(s.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(s.spider_error, signal=signals.spider_error)
+        return s
+
+    def spider_opened(self, spider):
+        self.iniciado_em = datetime.now()
+        self.inicio = monotonic()
+        if self.intervalo > 0:
+            self.tarefa_progresso = task.LoopingCall(self.reportar_progresso, spider)
+            self.tarefa_progresso.start(self.intervalo, now=False)
+
+    def response_received(self, response, request, spider):
+        self.paginas += 1
+        if 'download_latency' in request.meta:
+            self.medidor.registrar('download_http', request.meta['download_latency'])
+
+    def item_scraped(self, item, response, spider):
+        self.itens += 1
+
+    def spider_error(self, failure, response, spider):
+        self.medidor.falha(codigo_da_url(response.url), 'spider', failure.value)
+
+    def reportar_progresso(self, spider):
+        decorrido = monotonic() - self.inicio
+        etapas = ', '.join(
+            f"{etapa} {resumo['media_ms']:.0f}ms" for etapa, resumo in self.medidor.resumo_etapas().items())
+        spider.logger.info(
+            'Telemetria: %d páginas, %d itens (%.1f itens/s), %d cidades com falha, %d reinícios de navegador; '
+            'média por etapa: %s',
+            self.paginas, self.itens, self.itens / decorrido if decorrido else 0,
+            self.medidor.resumo_falhas()['cidades'],
+            self.medidor.contadores().get('navegadores', {}).get('reinicios', 0), etapas or '-')
+
+    def relatorio(self, spider, motivo):
+        """
+        Monta o relatório da execução.
+
+        Parâmetros:
+            spider (scrapy.spiders.Spider): A instância da spider.
+            motivo (str): O motivo do encerramento informado pelo Scrapy ('finished', 'shutdown'...).
+
+        Retorna:
+            dict: O relatório com a duração, as páginas, os itens por segundo, as etapas, as falhas e os contadores.
+        """
+        duracao = monotonic() - self.inicio
+        return {
+            'spider': spider.name,
+            'fragmento': getattr(spider, 'fragmento', 0),
+            'fragmentos': getattr(spider, 'fragmentos', 1),
+            'inicio': self.iniciado_em.isoformat(timespec='seconds'),
+            'fim': datetime.now().isoformat(timespec='seconds'),
+            'motivo': motivo,
+            'duracao_segundos': round(duracao, 1),
+            'paginas': self.paginas,
+            'itens': self.itens,
+            'itens_por_segundo': round(self.itens / duracao, 2) if duracao else 0,
+            'etapas': self.medidor.resumo_etapas(),
+            'falhas': self.medidor.resumo_falhas(),
+            'contadores': self.medidor.contadores()
+        }
+
+    def spider_closed(self, spider, reason):
+        if self.tarefa_progresso is not None and self.tarefa_progresso.running:
+            self.tarefa_progresso.stop()
+        self.encerramento = (spider, reason)
+
+    def engine_stopped(self):
+        if self.encerramento is None:
+            return
+        spider, reason = self.encerramento
+        relatorio = self.relatorio(spider, reason)
+        temporario = f'{self.arquivo}.tmp'
+        with open(temporario, 'w', encoding='UTF-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.arquivo)
+        spider.logger.info(
+            'Telemetria: %d itens em %.1fs (%.2f itens/s), %d cidades com falha; relatório gravado em %s',
+            relatorio['itens'], relatorio['duracao_segundos'], relatorio['itens_por_segundo'],
+            relatorio['falhas']['cidades'], self.arquivo)
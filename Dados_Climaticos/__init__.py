@@ -0,0 +1,11 @@
+"""
+Projeto Scrapy da coleta de dados climáticos.
+
+Dentro deste diretório (o do scrapy.cfg), 'Dados_Climaticos' é o pacote da spider. Este arquivo permite importar o
+mesmo pacote a partir da raiz do repositório: os submódulos de 'Dados_Climaticos' são procurados no diretório do
+pacote da spider, portanto 'from Dados_Climaticos.publicacao import publicar_coleta' funciona nas APIs, no
+agendador e nos scripts da raiz sem alterar o sys.path.
+"""
+import os
+
+__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dados_Climaticos')]
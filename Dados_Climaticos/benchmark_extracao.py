@@ -0,0 +1,94 @@
+"""
+Micro-benchmark da Extração das Páginas de Previsão
+
+Este script mede o tempo de extração por página sobre páginas do INMET salvas em disco (o HTML renderizado,
+por exemplo salvo a partir de driver.page_source). Sem argumentos, ele usa as páginas salvas em
+tests/fixtures (PAGINAS_FIXTURES), portanto roda offline. Ele compara duas estratégias sobre os mesmos campos:
+
+    - repetida: cada campo avalia a sua expressão XPath com o parsel, como a spider fazia originalmente.
+    - esquema: o ESQUEMA_PAGINA/ESQUEMA_LINHA de esquema_extracao.py, com expressões compiladas avaliadas uma vez.
+
+Uso:
+    python benchmark_extracao.py --repeticoes 200
+    python benchmark_extracao.py pagina_1.html pagina_2.html --repeticoes 200
+
+Nota:
+    - Execute o script a partir do diretório Dados_Climaticos, onde fica o scrapy.cfg.
+"""
+from argparse import ArgumentParser
+from glob import glob
+from time import perf_counter
+from parsel import Selector
+import os
+from Dados_Climaticos.esquema_extracao import ESQUEMA_PAGINA, ESQUEMA_LINHA, XPATH_LINHAS, extrair_pagina
+
+PAGINAS_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures', 'pagina_*.html')
+
+def extrair_repetida(seletor):
+    """
+    Extrai os campos avaliando a expressão XPath de cada campo separadamente.
+
+    Parâmetros:
+        seletor (parsel.Selector): O seletor da página.
+
+    Retorna:
+        list: Os itens extraídos, no mesmo formato de extrair_pagina.
+    """
+    def extrair(elemento, esquema):
+        itens = []
+        for item in esquema.itens:
+            dados = {}
+            for nome, campo in item.items():
+                valores = elemento.xpath(campo.xpath).getall()
+                valor = valores[campo.indice] if len(valores) > campo.indice else None
+                dados[nome] = campo.transformacao(valor) if valor is not None and campo.transformacao else valor
+            itens.append(dados)
+        return itens
+
+    itens = extrair(seletor, ESQUEMA_PAGINA)
+    for linha in seletor.xpath(XPATH_LINHAS.path):
+        itens.extend(extrair(linha, ESQUEMA_LINHA))
+    return itens
+
+def medir(funcao, paginas, repeticoes):
+    """
+    Mede o tempo médio de extração por página.
+
+    Parâmetros:
+        funcao (callable): Função que recebe um parsel.Selector e extrai os itens.
+        paginas (list): Os seletores das páginas.
+        repeticoes (int): Quantas vezes cada página é extraída.
+
+    Retorna:
+        float: O tempo médio por página, em milissegundos.
+    """
+    inicio = perf_counter()
+    for _ in range(repeticoes):
+        for pagina in paginas:
+            funcao(pagina)
+    return (perf_counter() - inicio) * 1000 / (repeticoes * len(paginas))
+
+def main():
+    parser = ArgumentParser(description='Mede o tempo de extração por página sobre páginas HTML salvas.')
+    parser.add_argument('paginas', nargs='*', default=sorted(glob(PAGINAS_FIXTURES)),
+                        help='Arquivos HTML das páginas renderizadas do INMET (padrão: as páginas de tests/fixtures).')
+    parser.add_argument('--repeticoes', type=int, default=100, help='Quantas vezes cada página é extraída.')
+    argumentos = parser.parse_args()
+
+    paginas = []
+    for caminho in argumentos.paginas:
+        with open(caminho, 'r', encoding='UTF-8') as arquivo:
+            paginas.append(Selector(text=arquivo.read()))
+
+    for pagina in paginas:
+        if extrair_repetida(pagina) != extrair_pagina(pagina.root):
+            raise SystemExit('As duas estratégias produziram itens diferentes; verifique o esquema.')
+
+    tempo_repetida = medir(extrair_repetida, paginas, argumentos.repeticoes)
+    tempo_esquema = medir(lambda pagina: extrair_pagina(pagina.root), paginas, argumentos.repeticoes)
+    print(f'Páginas: {len(paginas)} | Repetições: {argumentos.repeticoes}')
+    print(f'repetida: {tempo_repetida:.3f} ms/página')
+    print(f'esquema:  {tempo_esquema:.3f} ms/página ({tempo_repetida / tempo_esquema:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import json
+import os
+import sys
+import pytest
+
+CAMINHO_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMINHO_FIXTURES = os.path.join(CAMINHO_PROJETO, 'tests', 'fixtures')
+
+sys.path.insert(0, CAMINHO_PROJETO)
+
+def caminho_fixture(nome):
+    return os.path.join(CAMINHO_FIXTURES, nome)
+
+@pytest.fixture
+def ler_fixture():
+    def ler(nome):
+        with open(caminho_fixture(nome), 'r', encoding='UTF-8') as arquivo:
+            return json.load(arquivo) if nome.endswith('.json') else arquivo.read()
+    return ler
@@ -0,0 +1,132 @@
+"""
+Testes offline das duas formas de extração da spider, sobre respostas salvas da API e da página do INMET
+(tests/fixtures). O JSON da API e a página renderizada descrevem a mesma previsão de Florianópolis (4205407).
+"""
+import json
+import pytest
+from scrapy.http import HtmlResponse, Request, TextResponse
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+from Dados_Climaticos.esquema_extracao import extrair_pagina
+from Dados_Climaticos.spiders.bot_dados_climaticos import DadosClimaticosSpider, extrair_previsao_api, item_valido
+from Dados_Climaticos.telemetria import MedidorEtapas
+
+@pytest.fixture
+def spider():
+    crawler = get_crawler(DadosClimaticosSpider)
+    crawler.medidor_etapas = MedidorEtapas()
+    return DadosClimaticosSpider.from_crawler(crawler)
+
+def resposta_api(corpo, modo='automatico'):
+    request = Request(DadosClimaticosSpider.url_api + '4205407', meta={'codigo': '4205407', 'modo': modo})
+    return TextResponse(url=request.url, body=corpo.encode('utf-8'), encoding='utf-8', request=request)
+
+def resposta_pagina(html):
+    request = Request(DadosClimaticosSpider.url_pagina + '4205407', meta={'renderizar': True})
+    return HtmlResponse(url=request.url, body=html.encode('utf-8'), encoding='utf-8', request=request)
+
+def test_extrair_previsao_api_combina_os_periodos(ler_fixture):
+    itens = extrair_previsao_api(ler_fixture('api_4205407.json'))
+
+    assert len(itens) == 5
+    assert itens[0] == {
+        'cidade data': 'Florianópolis-SC, 17/10/2026 - Sábado',
+        'codicao meteorologica': ' Parcialmente nublado ',
+        'temperatura minima': 16,
+        'temperatura maxima': 24,
+        'umidade minima': 55,
+        'umidade maxima': 98,
+        'vento': 'Fraco a moderado'
+    }
+    assert itens[2]['temperatura minima'] == 15
+    assert itens[4]['temperatura minima'] == -1
+
+def test_extrair_pagina_le_o_topo_e_as_linhas(ler_fixture):
+    itens = extrair_pagina(resposta_pagina(ler_fixture('pagina_4205407.html')).selector.root)
+
+    assert [item['cidade data'] for item in itens] == [
+        'Florianópolis-SC, 17/10/2026 - Sábado', 'Florianópolis-SC, 18/10/2026 - Domingo',
+        'Florianópolis-SC, 19/10/2026 - Segunda', 'Florianópolis-SC, 20/10/2026 - Terça',
+        'Florianópolis-SC, 21/10/2026 - Quarta']
+    assert itens[1]['vento'] == 'Fraco'
+    assert itens[3]['codicao meteorologica'] == ' Chuva '
+
+def test_os_dois_modos_produzem_os_mesmos_itens(ler_fixture):
+    itens_api = extrair_previsao_api(ler_fixture('api_4205407.json'))
+    itens_pagina = extrair_pagina(resposta_pagina(ler_fixture('pagina_4205407.html')).selector.root)
+
+    assert itens_api == itens_pagina
+
+def test_item_valido(ler_fixture):
+    item = extrair_previsao_api(ler_fixture('api_4205407.json'))[0]
+
+    assert item_valido(item)
+    assert not item_valido(dict(item, vento=None))
+    assert not item_valido(dict(item, **{'cidade data': 'Florianópolis'}))
+    assert item_valido(dict(item, **{'temperatura minima': 0}))
+    assert not item_valido(dict(item, **{'temperatura minima': None}))
+    assert not item_valido(dict(item, **{'temperatura minima': '16°C'}))
+    assert not item_valido(dict(item, **{'umidade maxima': 120}))
+    assert not item_valido(dict(item, **{'cidade data': 'Florianópolis-SC, Sábado'}))
+
+def test_parse_api_usa_o_json_valido(spider, ler_fixture):
+    resposta = resposta_api(json.dumps(ler_fixture('api_4205407.json')))
+
+    resultados = list(spider.parse_api(resposta))
+
+    assert resultados == extrair_previsao_api(ler_fixture('api_4205407.json'))
+    assert spider.alternativas_selenium == 0
+
+@pytest.mark.parametrize('corpo', ['<html>manutenção</html>', '{}', json.dumps({'4205407': {'17/10/2026': {}}})])
+def test_parse_api_renderiza_a_pagina_quando_o_json_e_invalido(spider, corpo):
+    resultados = list(spider.parse_api(resposta_api(corpo)))
+
+    assert len(resultados) == 1
+    assert isinstance(resultados[0], Request)
+    assert resultados[0].url == DadosClimaticosSpider.url_pagina + '4205407'
+    assert resultados[0].meta['renderizar']
+    assert resultados[0].callback == spider.parse
+
+def test_parse_api_renderiza_a_pagina_quando_um_item_nao_passa_na_validacao(spider, ler_fixture):
+    resultados = list(spider.parse_api(resposta_api(json.dumps(ler_fixture('api_incompleta_4205407.json')))))
+
+    assert [resultado.meta['renderizar'] for resultado in resultados] == [True]
+
+def test_alternativa_selenium_nao_conta_como_falha(spider):
+    list(spider.parse_api(resposta_api('{}')))
+
+    medidor = spider.crawler.medidor_etapas
+    assert medidor.resumo_falhas()['total'] == 0
+    assert spider.alternativas_selenium == 1
+
+def test_modo_http_registra_a_falha_sem_renderizar(spider):
+    resultados = list(spider.parse_api(resposta_api('{}', modo='http')))
+
+    falhas = spider.crawler.medidor_etapas.resumo_falhas()
+    assert resultados == []
+    assert falhas['por_etapa'] == {'api': 1}
+    assert list(falhas['por_cidade']) == ['4205407']
+
+def test_renderizar_pagina_como_errback(spider):
+    falha = Failure(TimeoutError('tempo esgotado'))
+    falha.request = Request(DadosClimaticosSpider.url_api + '4205407', meta={'codigo': '4205407', 'modo': 'automatico'})
+
+    resultados = list(spider.renderizar_pagina(falha))
+
+    assert [resultado.url for resultado in resultados] == [DadosClimaticosSpider.url_pagina + '4205407']
+    assert spider.crawler.medidor_etapas.resumo_falhas()['total'] == 0
+
+def test_parse_extrai_a_pagina_renderizada(spider, ler_fixture):
+    itens = list(spider.parse(resposta_pagina(ler_fixture('pagina_4205407.html'))))
+
+    assert itens == extrair_previsao_api(ler_fixture('api_4205407.json'))
+    assert spider.crawler.medidor_etapas.resumo_falhas()['total'] == 0
+
+def test_parse_descarta_e_registra_item_incompleto(spider, ler_fixture):
+    html = ler_fixture('pagina_4205407.html').replace('<div><font>Moderado</font></div>', '')
+
+    itens = list(spider.parse(resposta_pagina(html)))
+
+    falhas = spider.crawler.medidor_etapas.resumo_falhas()
+    assert len(itens) == 4
+    assert falhas['por_etapa'] == {'extracao': 1}
@@ -0,0 +1,50 @@
+"""
+Testes do esquema de extração e do micro-benchmark sobre as páginas salvas em tests/fixtures.
+"""
+from glob import glob
+import pytest
+from parsel import Selector
+from benchmark_extracao import PAGINAS_FIXTURES, extrair_repetida
+from Dados_Climaticos.esquema_extracao import extrair_pagina, inteiro
+
+def seletor(html):
+    return Selector(text=html)
+
+@pytest.mark.parametrize('texto, esperado', [('23°C', 23), (' -2 °C ', -2), ('70%', 70), ('--', None), ('', None)])
+def test_inteiro(texto, esperado):
+    assert inteiro(texto) == esperado
+
+def test_itens_tipados(ler_fixture):
+    itens = extrair_pagina(seletor(ler_fixture('pagina_3550308.html')).root)
+
+    assert len(itens) == 7
+    assert itens[0] == {
+        'cidade data': 'São Paulo-SP, 17/10/2026 - Sábado',
+        'codicao meteorologica': ' Poucas nuvens ',
+        'temperatura minima': 21,
+        'temperatura maxima': 31,
+        'umidade minima': 38,
+        'umidade maxima': 88,
+        'vento': 'Fraco'
+    }
+    assert all(type(item[campo]) is int for item in itens
+               for campo in ('temperatura minima', 'temperatura maxima', 'umidade minima', 'umidade maxima'))
+
+def test_valor_nao_numerico_fica_none(ler_fixture):
+    html = ler_fixture('pagina_3550308.html').replace('<font>31°C</font>', '<font>--</font>')
+
+    assert extrair_pagina(seletor(html).root)[0]['temperatura maxima'] is None
+
+def test_campo_ausente_fica_none(ler_fixture):
+    html = ler_fixture('pagina_3550308.html').replace('<div><font> Nublado </font></div>', '')
+
+    assert extrair_pagina(seletor(html).root)[5]['codicao meteorologica'] is None
+
+def test_benchmark_usa_as_fixtures_e_as_estrategias_concordam():
+    paginas = sorted(glob(PAGINAS_FIXTURES))
+
+    assert len(paginas) == 2
+    for caminho in paginas:
+        with open(caminho, 'r', encoding='UTF-8') as arquivo:
+            pagina = seletor(arquivo.read())
+        assert extrair_repetida(pagina) == extrair_pagina(pagina.root)
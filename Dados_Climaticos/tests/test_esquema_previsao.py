@@ -0,0 +1,81 @@
+"""
+Testes do esquema tipado das previsões: a resposta da API deve ser igual, byte a byte, ao documento gravado pelo
+pipeline original, que a API enviava sem o _id.
+"""
+from datetime import datetime
+from Dados_Climaticos.esquema_previsao import (converter_documento_legado, documento_da_previsao, formatar_previsao,
+                                               numero)
+from Dados_Climaticos.publicacao import serializar_json
+
+def item(**campos):
+    return dict({
+        'cidade data': 'Florianópolis-SC, 17/10/2026 - Sábado',
+        'codicao meteorologica': ' Muitas nuvens com chuva ',
+        'temperatura minima': 17,
+        'temperatura maxima': 24,
+        'umidade minima': 55,
+        'umidade maxima': 98,
+        'vento': ' Fracos a moderados '}, **campos)
+
+def documento_original(dados):
+    """ Transformação do pipeline original, com os textos e as unidades coletados. """
+    cidade_data_ = dados['cidade data'].replace(',', '-').split('-')
+    return {
+        'cidade': cidade_data_[0],
+        'data': cidade_data_[2] + '-' + cidade_data_[3],
+        'codicao meteorologica': dados['codicao meteorologica'],
+        'temperatura': str((int(dados['temperatura minima'].replace('°C', '')) + int(dados['temperatura maxima'].replace('°C', ''))) // 2) + '°C',
+        'umidade': str((int(dados['umidade minima'].replace('%', '')) + int(dados['umidade maxima'].replace('%', ''))) // 2) + '%',
+        'vento': dados['vento']
+    }
+
+def item_em_texto(dados):
+    return dict(dados, **{
+        'temperatura minima': f"{dados['temperatura minima']}°C", 'temperatura maxima': f"{dados['temperatura maxima']}°C",
+        'umidade minima': f"{dados['umidade minima']}%", 'umidade maxima': f"{dados['umidade maxima']}%"})
+
+def test_resposta_igual_a_do_pipeline_original():
+    for dados in (item(), item(**{'temperatura minima': -3, 'temperatura maxima': 6, 'umidade maxima': 96}),
+                  item(**{'cidade data': 'Bom Jesus-PI, 20/10/2026 - Terça', 'vento': 'Calmo'})):
+        resposta = formatar_previsao(documento_da_previsao(dados))
+        assert resposta == documento_original(item_em_texto(dados))
+        assert serializar_json(resposta) == serializar_json(documento_original(item_em_texto(dados)))
+
+def test_resposta_nao_inclui_a_uf():
+    documento = documento_da_previsao(item())
+
+    assert documento['uf'] == 'SC'
+    assert 'uf' not in formatar_previsao(documento)
+
+def test_dia_da_semana_e_textos_sao_os_coletados():
+    documento = documento_da_previsao(item(**{'cidade data': 'Florianópolis-SC, 17/10/2026 - Sáb'}))
+
+    assert documento['ds'] == 'Sáb'
+    assert documento['cm'] == ' Muitas nuvens com chuva '
+    assert documento['v'] == ' Fracos a moderados '
+    resposta = formatar_previsao(documento)
+    assert resposta['data'] == ' 17/10/2026 - Sáb'
+    assert resposta['codicao meteorologica'] == ' Muitas nuvens com chuva '
+
+def test_documento_sem_dia_da_semana_usa_a_data():
+    documento = documento_da_previsao(item())
+    del documento['ds']
+
+    assert formatar_previsao(documento)['data'] == ' 17/10/2026 - Sábado'
+
+def test_documento_legado_mantem_a_resposta():
+    legado = documento_original(item_em_texto(item()))
+    documento = converter_documento_legado(legado)
+
+    assert documento['d'] == datetime(2026, 10, 17)
+    assert (documento['tmin'], documento['tmax'], documento['umed']) == (20, 20, 76.0)
+    assert formatar_previsao(documento) == legado
+
+    documento = converter_documento_legado(dict(legado, uf='SC'))
+    assert documento['uf'] == 'SC'
+    assert formatar_previsao(documento) == legado
+
+def test_numero():
+    assert numero('23°C') == 23
+    assert numero('-2 °C') == -2
+    assert numero('70%') == 70
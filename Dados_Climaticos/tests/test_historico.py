@@ -0,0 +1,84 @@
+"""
+Testes do histórico das previsões: upsert por cidade e dia previsto, substituição da entrada da mesma hora e
+expiração pelo índice TTL, sobre um MongoDB em memória (mongomock).
+"""
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from scrapy.utils.test import get_crawler
+from Dados_Climaticos.esquema_previsao import formatar_historico
+from Dados_Climaticos.pipelines import DadosClimaticosMongoPipeline
+from Dados_Climaticos.publicacao import (COLECAO_HISTORICO, COLECAO_PREVISAO, COLECAO_STAGING, HISTORICO_RETENCAO_DIAS,
+                                         INDICE_HISTORICO, arquivar_historico, publicar_coleta,
+                                         valores_literais)
+from Dados_Climaticos.spiders.bot_dados_climaticos import DadosClimaticosSpider
+
+def documento(cidade, uf, dia, tmin):
+    return {'c': cidade, 'uf': uf, 'd': datetime(2026, 10, dia), 'cm': ' Chuva ', 'tmin': tmin, 'tmax': tmin + 8,
+            'tmed': tmin + 4.0, 'umin': 50, 'umax': 90, 'umed': 70.0, 'v': 'Fraco'}
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()['Dados_Climaticos']
+
+def publicar(db, *documentos, **opcoes):
+    db[COLECAO_PREVISAO].drop()
+    db[COLECAO_PREVISAO].insert_many([dict(documento_) for documento_ in documentos])
+    return arquivar_historico(db, **opcoes)
+
+def bucket(db, cidade, uf, dia):
+    return db[COLECAO_HISTORICO].find_one({'c': cidade, 'uf': uf, 'd': datetime(2026, 10, dia)})
+
+def test_cada_coleta_acrescenta_uma_entrada_por_dia_previsto(db):
+    assert publicar(db, documento('Florianópolis', 'SC', 17, 16), documento('Florianópolis', 'SC', 18, 17),
+                    coletada_em=datetime(2026, 10, 17, 7, 5)) == 2
+    assert publicar(db, documento('Florianópolis', 'SC', 17, 18), documento('Florianópolis', 'SC', 18, 19),
+                    coletada_em=datetime(2026, 10, 17, 8, 2)) == 2
+
+    assert db[COLECAO_HISTORICO].count_documents({}) == 2
+    resposta = formatar_historico(bucket(db, 'Florianópolis', 'SC', 17))
+    assert resposta['data'] == '17/10/2026'
+    assert [(coleta['coletada_em'], coleta['tmin']) for coleta in resposta['coletas']] == [
+        ('17/10/2026 07:00', 16), ('17/10/2026 08:00', 18)]
+
+def test_publicar_de_novo_na_mesma_hora_substitui_a_entrada(db):
+    publicar(db, documento('Florianópolis', 'SC', 17, 16), coletada_em=datetime(2026, 10, 17, 7, 5))
+    publicar(db, documento('Florianópolis', 'SC', 17, 20), coletada_em=datetime(2026, 10, 17, 7, 40))
+
+    entradas = bucket(db, 'Florianópolis', 'SC', 17)['s']
+    assert [(entrada['h'], entrada['tmin']) for entrada in entradas] == [(datetime(2026, 10, 17, 7), 20)]
+
+def test_cidades_de_mesmo_nome_tem_historicos_separados(db):
+    publicar(db, documento('Bom Jesus', 'PI', 17, 24), documento('Bom Jesus', 'RS', 17, 6),
+             coletada_em=datetime(2026, 10, 17, 7))
+
+    assert bucket(db, 'Bom Jesus', 'PI', 17)['s'][0]['tmin'] == 24
+    assert bucket(db, 'Bom Jesus', 'RS', 17)['s'][0]['tmin'] == 6
+
+def test_textos_iniciados_por_cifrao_nao_sao_caminhos_de_campos():
+    registro = {'h': datetime(2026, 10, 17, 7), 'cm': '$s', 'tmin': 16, 'v': 'Fraco'}
+
+    assert valores_literais(registro) == {'h': datetime(2026, 10, 17, 7), 'cm': {'$literal': '$s'}, 'tmin': 16, 'v': 'Fraco'}
+
+def test_expiracao_pela_data_prevista_e_retencao(db):
+    publicar(db, documento('Florianópolis', 'SC', 17, 16), coletada_em=datetime(2026, 10, 17, 7), retencao_dias=10)
+    publicar(db, documento('Florianópolis', 'SC', 17, 16), coletada_em=datetime(2026, 10, 17, 8), retencao_dias=45)
+
+    assert bucket(db, 'Florianópolis', 'SC', 17)['expira_em'] == datetime(2026, 10, 17) + timedelta(days=45)
+    indices = db[COLECAO_HISTORICO].index_information()
+    assert indices[INDICE_HISTORICO]['unique']
+    assert [indice['expireAfterSeconds'] for indice in indices.values() if indice['key'] == [('expira_em', 1)]] == [0]
+
+def test_publicar_coleta_arquiva_com_a_retencao_informada(db):
+    db[COLECAO_STAGING].insert_many([documento('Florianópolis', 'SC', 17, 16)])
+
+    assert publicar_coleta(db, retencao_dias=7)
+    assert bucket(db, 'Florianópolis', 'SC', 17)['expira_em'] == datetime(2026, 10, 24)
+
+def test_pipeline_le_a_retencao_das_configuracoes():
+    padrao = DadosClimaticosMongoPipeline.from_crawler(get_crawler(DadosClimaticosSpider))
+    configurada = DadosClimaticosMongoPipeline.from_crawler(
+        get_crawler(DadosClimaticosSpider, {'HISTORICO_RETENCAO_DIAS': '60'}))
+
+    assert padrao.retencao_dias == HISTORICO_RETENCAO_DIAS
+    assert configurada.retencao_dias == 60
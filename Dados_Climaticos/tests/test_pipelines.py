@@ -0,0 +1,75 @@
+"""
+Testes da publicação feita pela pipeline ao final da coleta, sobre um MongoDB em memória (mongomock).
+"""
+import mongomock
+import pytest
+from scrapy.utils.test import get_crawler
+from Dados_Climaticos import pipelines
+from Dados_Climaticos.pipelines import DadosClimaticosMongoPipeline
+from Dados_Climaticos.publicacao import COLECAO_CONTROLE, COLECAO_PREVISAO, COLECAO_STAGING
+from Dados_Climaticos.spiders.bot_dados_climaticos import DadosClimaticosSpider
+
+def item(cidade, dia):
+    return {
+        'cidade data': f'{cidade}-SC, {dia:02d}/10/2026 - Sábado', 'codicao meteorologica': 'Chuva',
+        'temperatura minima': 16, 'temperatura maxima': 24, 'umidade minima': 55, 'umidade maxima': 98, 'vento': 'Fraco'}
+
+@pytest.fixture
+def cliente(monkeypatch):
+    cliente_ = mongomock.MongoClient()
+    monkeypatch.setattr(pipelines, 'MongoClient', lambda uri: cliente_)
+    return cliente_
+
+@pytest.fixture
+def db(cliente):
+    return cliente['Dados_Climaticos']
+
+@pytest.fixture
+def spider():
+    return DadosClimaticosSpider.from_crawler(get_crawler(DadosClimaticosSpider))
+
+def coletar(spider, motivo, cidades, **opcoes):
+    pipeline = DadosClimaticosMongoPipeline('mongodb://localhost:27017/', 'Dados_Climaticos', **opcoes)
+    pipeline.open_spider(spider)
+    for cidade in cidades:
+        pipeline.process_item(item(cidade, 17), spider)
+    pipeline.close_spider(spider)
+    pipeline.spider_closed(spider, motivo)
+
+def cidades_publicadas(db):
+    return sorted(documento['c'] for documento in db[COLECAO_PREVISAO].find())
+
+def test_coleta_finalizada_e_publicada(db, spider):
+    coletar(spider, 'finished', ['Florianópolis', 'Joinville'])
+
+    assert cidades_publicadas(db) == ['Florianópolis', 'Joinville']
+    assert COLECAO_STAGING not in db.list_collection_names()
+
+@pytest.mark.parametrize('motivo', ['shutdown', 'closespider_timeout', 'cancelled'])
+def test_coleta_interrompida_mantem_a_publicada(db, spider, motivo):
+    coletar(spider, 'finished', ['Florianópolis', 'Joinville'])
+    geracao = db[COLECAO_CONTROLE].find_one({'_id': COLECAO_PREVISAO})['geracao']
+
+    coletar(spider, motivo, ['Blumenau'])
+
+    assert cidades_publicadas(db) == ['Florianópolis', 'Joinville']
+    assert COLECAO_STAGING not in db.list_collection_names()
+    assert db[COLECAO_CONTROLE].find_one({'_id': COLECAO_PREVISAO})['geracao'] == geracao
+
+def test_coleta_abaixo_da_proporcao_minima_nao_e_publicada(db, spider):
+    coletar(spider, 'finished', [f'Cidade {indice}' for indice in range(10)])
+
+    coletar(spider, 'finished', [f'Cidade {indice}' for indice in range(8)], proporcao_minima=0.9)
+    assert len(cidades_publicadas(db)) == 10
+
+    coletar(spider, 'finished', [f'Cidade {indice}' for indice in range(9)], proporcao_minima=0.9)
+    assert len(cidades_publicadas(db)) == 9
+
+def test_fragmento_registra_o_motivo_sem_publicar(db, spider):
+    spider.fragmento = 1
+    coletar(spider, 'shutdown', ['Florianópolis'], publicar_ao_final=False)
+
+    registro = db[COLECAO_CONTROLE].find_one({'_id': f'{COLECAO_PREVISAO}_fragmento_1'})
+    assert (registro['itens'], registro['motivo']) == (1, 'shutdown')
+    assert db[COLECAO_STAGING].count_documents({}) == 1
+    assert COLECAO_PREVISAO not in db.list_collection_names()
@@ -0,0 +1,124 @@
+"""
+Testes do pool de WebDrivers: retirada limitada ao tamanho do pool, reciclagem após N páginas ou após falha do
+navegador, devolução após tempo esgotado e encerramento, com drivers falsos no lugar do Chrome.
+"""
+from threading import Thread
+import pytest
+
+pytest.importorskip('selenium')
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from Dados_Climaticos.pool_drivers import PoolDeDrivers
+
+class Driver:
+    def __init__(self, numero):
+        self.numero = numero
+        self.encerrado = False
+
+    def quit(self):
+        self.encerrado = True
+
+class Fabrica:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = Driver(len(self.drivers) + 1)
+        self.drivers.append(driver)
+        return driver
+
+@pytest.fixture
+def fabrica():
+    return Fabrica()
+
+def test_drivers_sao_reutilizados(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=2)
+
+    for _ in range(5):
+        with pool.usar() as driver:
+            assert driver is fabrica.drivers[0]
+    assert pool.criados == 1
+    assert pool.reinicios == 0
+
+def test_retirada_aguarda_um_driver_livre(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=2)
+    primeiro, segundo = pool.retirar(), pool.retirar()
+    retirados = []
+
+    espera = Thread(target=lambda: retirados.append(pool.retirar()))
+    espera.start()
+    espera.join(0.2)
+    assert espera.is_alive()
+    assert pool.criados == 2
+
+    pool.devolver(segundo)
+    espera.join(1)
+    assert not espera.is_alive()
+    assert retirados == [segundo]
+    assert pool.criados == 2
+    pool.devolver(primeiro)
+
+def test_driver_e_reciclado_apos_n_paginas(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=1, paginas_por_driver=3)
+
+    usados = []
+    for _ in range(7):
+        with pool.usar() as driver:
+            usados.append(driver.numero)
+
+    assert usados == [1, 1, 1, 2, 2, 2, 3]
+    assert fabrica.drivers[0].encerrado and fabrica.drivers[1].encerrado
+    assert not fabrica.drivers[2].encerrado
+    assert pool.reinicios == 2
+
+def test_falha_do_navegador_recicla_o_driver(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=1)
+
+    with pytest.raises(WebDriverException):
+        with pool.usar():
+            raise WebDriverException('sessão perdida')
+    with pool.usar() as driver:
+        assert driver.numero == 2
+    assert fabrica.drivers[0].encerrado
+    assert pool.reinicios == 1
+
+def test_tempo_esgotado_e_outros_erros_devolvem_o_driver(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=1)
+
+    for erro in (TimeoutException('página lenta'), ValueError('página inesperada')):
+        with pytest.raises(type(erro)):
+            with pool.usar():
+                raise erro
+    with pool.usar() as driver:
+        assert driver.numero == 1
+    assert pool.reinicios == 0
+
+def test_falha_ao_iniciar_libera_a_vaga(fabrica):
+    tentativas = []
+
+    def iniciar():
+        tentativas.append(1)
+        if len(tentativas) == 1:
+            raise WebDriverException('chrome não iniciou')
+        return fabrica()
+
+    pool = PoolDeDrivers(iniciar, tamanho=1)
+    with pytest.raises(WebDriverException):
+        pool.retirar()
+    with pool.usar() as driver:
+        assert driver is fabrica.drivers[0]
+    assert pool.criados == 1
+
+def test_encerrar_fecha_os_livres_e_os_em_uso_na_devolucao(fabrica):
+    pool = PoolDeDrivers(fabrica, tamanho=2)
+    livre, em_uso = pool.retirar(), pool.retirar()
+    pool.devolver(livre)
+
+    pool.encerrar()
+    assert livre.encerrado and not em_uso.encerrado
+    with pytest.raises(RuntimeError):
+        pool.retirar()
+
+    pool.devolver(em_uso)
+    assert em_uso.encerrado
+    assert pool.reinicios == 0
@@ -0,0 +1,78 @@
+"""
+Testes da materialização das respostas pré-renderizadas, sobre um MongoDB em memória (mongomock).
+"""
+from datetime import datetime
+import gzip
+import json
+import mongomock
+import pytest
+from Dados_Climaticos.publicacao import (COLECAO_CONTROLE, COLECAO_PREVISAO, COLECAO_RESPOSTAS,
+                                         COLECAO_RESPOSTAS_STAGING, COLECAO_STAGING, chave_resposta,
+                                         materializar_respostas, publicar_coleta, resposta_da_geracao)
+
+def documento(cidade, uf, dia, tmin):
+    return {'c': cidade, 'uf': uf, 'd': datetime(2026, 10, dia), 'cm': ' Chuva ', 'tmin': tmin, 'tmax': tmin + 8,
+            'tmed': tmin + 4.0, 'umin': 50, 'umax': 90, 'umed': 70.0, 'v': 'Fraco'}
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()['Dados_Climaticos']
+
+def corpo(db, chave):
+    resposta = db[COLECAO_RESPOSTAS_STAGING].find_one({'_id': chave})
+    assert json.loads(gzip.decompress(resposta['gzip'])) == json.loads(resposta['identity'])
+    return json.loads(resposta['identity'])
+
+def test_cidades_de_mesmo_nome_tem_respostas_separadas(db):
+    db[COLECAO_STAGING].insert_many([
+        documento('Bom Jesus', 'RS', 18, 8), documento('Bom Jesus', 'PI', 17, 24),
+        documento('Bom Jesus', 'RS', 17, 6), documento('Bom Jesus', 'PI', 18, 25)])
+
+    materializar_respostas(db, 1)
+
+    semana_pi = corpo(db, chave_resposta('semana', 'Bom Jesus', 'PI'))
+    semana_rs = corpo(db, chave_resposta('semana', 'Bom Jesus', 'RS'))
+    assert [previsao['temperatura'] for previsao in semana_pi] == ['28°C', '29°C']
+    assert [previsao['temperatura'] for previsao in semana_rs] == ['10°C', '12°C']
+    assert corpo(db, chave_resposta('dia', 'Bom Jesus', 'PI'))['temperatura'] == '28°C'
+    assert corpo(db, chave_resposta('dia', 'Bom Jesus', 'RS'))['temperatura'] == '10°C'
+    assert db[COLECAO_RESPOSTAS_STAGING].count_documents({}) == 4
+
+def estado_coleta(db):
+    controle = db[COLECAO_CONTROLE].find_one({'_id': COLECAO_PREVISAO})
+    return controle['geracao'], controle['finalizada_em']
+
+def test_respostas_sao_servidas_apenas_na_sua_geracao(db):
+    db[COLECAO_STAGING].insert_many([documento('Florianópolis', 'SC', 17, 16)])
+    assert publicar_coleta(db, arquivar=False)
+    db[COLECAO_STAGING].insert_many([documento('Florianópolis', 'SC', 17, 18)])
+    assert publicar_coleta(db, arquivar=False)
+
+    resposta = db[COLECAO_RESPOSTAS].find_one({'_id': chave_resposta('dia', 'Florianópolis', 'SC')})
+    assert estado_coleta(db)[0] == 2
+    assert resposta['g'] == 2
+    assert resposta_da_geracao(resposta, estado_coleta(db))
+    assert not resposta_da_geracao(resposta, (1, estado_coleta(db)[1]))
+    assert not resposta_da_geracao(None, estado_coleta(db))
+    assert not resposta_da_geracao(resposta, None)
+
+def test_falha_na_segunda_renomeacao_nao_serve_respostas_novas(db, monkeypatch):
+    db[COLECAO_STAGING].insert_many([documento('Florianópolis', 'SC', 17, 16)])
+    publicar_coleta(db, arquivar=False)
+    db[COLECAO_STAGING].insert_many([documento('Florianópolis', 'SC', 17, 30)])
+    renomear = mongomock.Collection.rename
+
+    def renomear_previsoes_com_falha(colecao, novo_nome, **opcoes):
+        if colecao.name == COLECAO_STAGING:
+            raise RuntimeError('falha na renomeação')
+        return renomear(colecao, novo_nome, **opcoes)
+
+    monkeypatch.setattr(mongomock.Collection, 'rename', renomear_previsoes_com_falha)
+    with pytest.raises(RuntimeError):
+        publicar_coleta(db, arquivar=False)
+
+    resposta = db[COLECAO_RESPOSTAS].find_one({'_id': chave_resposta('dia', 'Florianópolis', 'SC')})
+    assert resposta['g'] == 2
+    assert estado_coleta(db)[0] == 1
+    assert not resposta_da_geracao(resposta, estado_coleta(db))
+    assert db[COLECAO_PREVISAO].find_one()['tmin'] == 16
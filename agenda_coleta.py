@@ -0,0 +1,44 @@
+"""
+Agenda da Coleta de Dados Climáticos
+
+Este módulo concentra os horários da coleta e o caminho do projeto Scrapy. Ele não importa nada além da biblioteca
+padrão e não altera nada ao ser importado, por isso pode ser usado tanto pelo agendador (executando_spider.py)
+quanto pelas APIs, que calculam o Cache-Control a partir da próxima execução agendada.
+
+O pacote da spider é importado diretamente da raiz do repositório ('from Dados_Climaticos.publicacao import ...');
+ver Dados_Climaticos/__init__.py.
+
+Constantes:
+    - HORA_INICIO e HORA_FIM: A janela de coleta. A spider é executada a cada hora cheia, de HORA_INICIO até
+      HORA_FIM, inclusive (14 execuções por dia com 7 e 20).
+    - CAMINHO_SPIDER: O diretório do projeto Scrapy, que contém o pacote 'Dados_Climaticos'.
+
+Funções:
+    - proxima_execucao(agora): Calcula o horário da próxima execução dentro da janela de coleta.
+"""
+from datetime import timedelta
+import os
+
+HORA_INICIO = 7
+HORA_FIM = 20
+CAMINHO_SPIDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dados_Climaticos')
+
+def proxima_execucao(agora):
+    """
+    Calcula o horário da próxima execução da spider.
+
+    Parâmetros:
+        agora (datetime): O horário atual.
+
+    Retorna:
+        datetime: A próxima hora cheia dentro da janela de coleta (o próprio 'agora' se ele for uma hora cheia
+        dentro da janela), ou HORA_INICIO do dia seguinte se a janela do dia já terminou.
+    """
+    proxima = agora.replace(minute=0, second=0, microsecond=0)
+    if proxima < agora:
+        proxima += timedelta(hours=1)
+    if proxima.hour < HORA_INICIO:
+        return proxima.replace(hour=HORA_INICIO)
+    if proxima.hour > HORA_FIM:
+        return (proxima + timedelta(days=1)).replace(hour=HORA_INICIO)
+    return proxima
@@ -8,10 +8,17 @@ Módulos Utilizados:
     - flask: Para criar a API web.
     - flask_limiter: Para limitar as requisições de acordo com a chave API.
     - conexao_db: Módulo para configurar as conexões com o banco de dados.
-    - assegurando_senha: Módulo para lidar com segurança de senhas usando o bcrypt.
+    - assegurando_senha: Módulo para lidar com segurança de senhas usando o bcrypt, executado em um pool de threads limitado.
     - sqlalchemy.exc: Para exceções relacionadas ao SQLAlchemy.
     - functools: Para decoradores.
     - uuid: Para gerar chaves API únicas.
+    - cache_previsao: Cache LRU em memória para as previsões, invalidado a cada nova coleta da spider.
+    - cache_autenticacao: Cache com TTL para a validação das chaves API.
+    - indice_cidades: Índice normalizado dos nomes das cidades, com árvore de prefixos para sugestões.
+    - instantaneo_previsoes: Cópia colunar (NumPy) da coleta atual, usada pelas rotas analíticas.
+    - armazenamento_limites: Armazenamentos compartilhados entre os workers para os contadores do limite de taxa.
+    - metricas: Histogramas de latência e de tempo de banco de dados expostos no formato do Prometheus.
+    - api_comum: Filtros, validação dos parâmetros, mensagens de erro e cabeçalhos condicionais, compartilhados com api_clima_async.py.
 
 Funções e Rotas:
     - /cadastro/formulario (GET): Retorna um formulário de registro.
@@ -20,16 +27,81 @@ Funções e Rotas:
     - /tempo (GET): Retorna a previsão do tempo para Florianópolis (requer autenticação).
     - /tempo/cidade/<cidade> (GET): Retorna a previsão do tempo para uma cidade específica (requer autenticação).
     - /tempo/cidade/<cidade>/semana (GET): Retorna a previsão do tempo para uma cidade ao longo da semana (requer autenticação).
+    - /tempo/cidades (GET, POST): Retorna a previsão do tempo de várias cidades em uma única requisição (requer autenticação).
+      As cidades são informadas na query string (?cidades=São Paulo,Florianópolis) ou no corpo JSON ({"cidades": [...]}).
+      A resposta é um mapa cidade -> previsão, com null para as cidades não encontradas.
+    - /cidades/sugestoes (GET): Retorna as cidades cujo nome começa com o prefixo informado (?prefixo=flo&limite=10),
+      respondidas a partir do índice em memória (requer autenticação).
+    - /tempo/cidade/<cidade>/historico (GET): Retorna, para cada dia do intervalo (?inicio=dd/mm/aaaa&fim=dd/mm/aaaa),
+      as previsões feitas para aquele dia em cada coleta horária (requer autenticação). Por padrão o intervalo vai de
+      7 dias atrás a 7 dias à frente, com no máximo HISTORICO_INTERVALO_MAXIMO_DIAS dias.
+    - /analise/ranking (GET): Retorna as N cidades com os maiores valores de um campo numérico
+      (?campo=tmax&n=10; ordem=asc para os menores; uf e data opcionais) (requer autenticação).
+    - /analise/cidades (GET): Retorna as cidades que atendem aos filtros informados: condicao (?condicao=chuva), vento,
+      uf e limites '<campo>_min' / '<campo>_max' (?tmax_min=30) (requer autenticação).
+    - /analise/estados (GET): Retorna a média, o mínimo e o máximo de um campo numérico em cada estado (?campo=umed)
+      (requer autenticação).
+      Os campos numéricos são tmin, tmax, tmed, umin, umax e umed; a data (dd/mm/aaaa) é por padrão a primeira da coleta.
+    - /metrics (GET): Métricas de desempenho no formato texto do Prometheus (sem autenticação e sem limite de taxa).
 
 Configurações Adicionais:
     - Limiter: Uma instância do Flask Limiter é configurada para limitar as requisições com base na chave API.
       - A chave API é extraída do cabeçalho 'x-api-key' da requisição.
       - As limitações de taxa estão configuradas para '200 por dia'.
+      - Os contadores ficam no armazenamento definido em LIMITE_STORAGE_URI, compartilhado por todos os workers e
+        preservado entre reinícios.
+      - O limite só é contabilizado para chaves válidas: requisições com chave ausente ou inexistente são
+        recusadas por 'verificar_chave' sem criar contadores.
+      - Na rota /tempo/cidades, cada grupo de LOTE_CIDADES_POR_UNIDADE cidades conta como uma requisição. Um lote
+        vazio ou com mais de LOTE_CIDADES_MAXIMO cidades, recusado com 400, conta como uma única requisição.
+    - Respostas pré-renderizadas: Ao publicar cada coleta, a pipeline grava na coleção 'Previsao_renderizada' o JSON
+      final das rotas do dia e da semana de cada cidade, com variantes gzip e brotli. As rotas /tempo,
+      /tempo/cidade/<cidade> e /tempo/cidade/<cidade>/semana enviam esses bytes diretamente, com o Content-Encoding
+      escolhido a partir do cabeçalho Accept-Encoding, sem serializar nem comprimir nada durante a requisição.
+      As respostas são gravadas por cidade e UF; quando o nome existe em mais de um estado e a UF não foi informada,
+      a resposta é montada a partir da coleção 'Previsao_do_tempo'.
+      Se a resposta pré-renderizada não existir, ou se ela não pertencer à geração registrada no marcador da coleta
+      (publicação em andamento ou interrompida), a resposta é montada como antes.
+    - Senhas: O hash e a verificação das senhas em /cadastro e /login rodam no executor de senhas, com no máximo
+      SENHAS_THREADS operações simultâneas e SENHAS_FILA_MAXIMA em espera; acima disso a resposta é 503 com Retry-After.
+      Se o hash de um usuário foi gerado com um custo diferente de BCRYPT_CUSTO, ele é recalculado no login.
+    - Requisições condicionais: As rotas /tempo enviam ETag (derivado da geração da coleta), Last-Modified (horário
+      de finalização da coleta) e Cache-Control com max-age até a próxima execução agendada (agenda_coleta.py).
+      O Cache-Control é 'private', pois as respostas dependem da chave API e não devem ser compartilhadas por caches
+      intermediários entre clientes diferentes.
+      Esses cabeçalhos só são enviados em respostas 2xx de recursos existentes: erros, previsões de cidades não
+      encontradas e listas vazias não os recebem. Da mesma forma, uma requisição GET com If-None-Match ou
+      If-Modified-Since correspondentes só recebe 304 se a resposta completa seria 2xx de um recurso existente; a
+      rota é executada (normalmente a partir do cache em memória) e a resposta é trocada pelo 304.
+      Uma resposta 304 não consome o limite de taxa: os limites usam deduct_when='consumir_limite', portanto o
+      Limiter apenas verifica a cota antes da rota e a desconta depois, conforme o status da resposta.
+    - Nomes das cidades: O nome informado nas rotas /tempo/cidade e /tempo/cidades é resolvido pelo índice de cidades,
+      sem diferenciar acentos e maiúsculas ("florianopolis" encontra "Florianópolis"). Quando o nome existe em mais de
+      um estado, a UF pode ser informada após o nome ("Bom Jesus-PI"). O índice é reconstruído a cada nova coleta.
+    - Formato das respostas: Os documentos do MongoDB são tipados (ver Dados_Climaticos/esquema_previsao.py); a
+      temperatura, a umidade e a data por extenso são formatadas por 'formatar_previsao' ao montar a resposta.
+    - Histórico: Cada coleta publicada é acrescentada à coleção 'Historico_previsao' (ver publicacao.py), com um
+      documento por cidade e por dia previsto e expiração por índice TTL. A rota de histórico usa o índice (c, d, uf)
+      para localizar os dias do intervalo, já em ordem de data, sem percorrer a coleção; cada documento encontrado é
+      lido por inteiro, pois a resposta inclui todas as suas coletas.
+    - Rotas analíticas: As rotas /analise consultam o instantâneo colunar da coleta, reconstruído uma vez a cada nova
+      geração, com operações vetorizadas do NumPy. Nenhuma consulta ao MongoDB é feita durante a requisição.
+    - Métricas: Com METRICAS_ATIVAS, cada requisição registra a sua latência por rota, e as etapas de autenticação
+      (verificar_chave), limite de taxa (do fim de verificar_chave ao início de resposta_condicional) e serialização
+      (jsonify) são medidas separadamente. Os tempos dos comandos do MongoDB, das consultas do SQLAlchemy e as
+      estatísticas dos caches e do executor de senhas também são expostos em /metrics (ver metricas.py).
+    - Cache: As rotas /tempo consultam primeiro o cache em memória. O MongoDB só é acessado em caso de falha
+      ou quando a geração da coleta, gravada pela pipeline na coleção 'Controle_de_coleta', muda.
+
+Banco de usuários:
+    - As tabelas e os índices são criados (ou completados) uma única vez, quando o módulo é carregado, por
+      'inicializar_banco'. Com o Gunicorn, isso acontece no processo mestre, antes do fork dos workers.
 
 Função 'verificar_chave':
     - Esta função é um decorador que verifica se a chave API fornecida na requisição é válida.
     - Ela extrai a chave API do cabeçalho 'x-api-key'.
     - Verifica se a chave API está associada a um usuário válido no banco de dados.
+    - O resultado da verificação fica em cache (inclusive para chaves inexistentes) e é invalidado quando '/login' emite uma chave.
     - Se a chave não for válida ou não for fornecida, a função retorna uma resposta JSON de erro e um código de status 401.
 
 Uso:
@@ -41,18 +113,192 @@ Nota:
     - Certifique-se de ajustar as configurações de autenticação, como o uso de chaves API, para atender às necessidades de segurança do seu projeto.
     - Personalize as rotas, as mensagens de erro e as configurações de limitação de taxa conforme necessário.
 """
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, make_response, g
 from flask_limiter import Limiter
-from conexao_db import app, db_mongo, db_alchemy, Usuario
-from assegurando_senha import BcryptUtil
+from conexao_db import app, db_mongo, db_alchemy, Usuario, opcoes_limite, inicializar_banco
+from assegurando_senha import BcryptUtil, ExecutorDeSenhas, FilaDeSenhasCheia
+from cache_previsao import CachePrevisao
+from cache_autenticacao import CacheAutenticacao
+from indice_cidades import IndiceCidades
+from instantaneo_previsoes import InstantaneoPrevisoes, CAMPOS_NUMERICOS, data_da_consulta, faixas_da_consulta
+from api_comum import (FORMULARIO_CADASTRO, MENSAGEM_CADASTRO, ERRO_CADASTRO_INCOMPLETO, ERRO_CADASTRO_DUPLICADO,
+                       ERRO_CHAVE_AUSENTE, ERRO_CHAVE_INVALIDA, ERRO_SERVIDOR_OCUPADO, ERRO_PARAMETROS, ERRO_PREFIXO,
+                       ERRO_CAMPO, ERRO_DATA, ERRO_FAIXAS, ERRO_METRICAS, estado_da_coleta, filtro_cidade,
+                       filtro_historico, registrar_previsao, normalizar_cidades, erro_do_lote, unidades_do_lote,
+                       inteiro_limitado, intervalo_do_historico, intervalo_valido, erro_intervalo,
+                       codificacao_da_resposta, nao_modificada, aceita_validadores, cabecalhos_condicionais,
+                       consumir_limite)
+from Dados_Climaticos.esquema_previsao import formatar_previsao, formatar_historico
+from Dados_Climaticos.publicacao import COLECAO_HISTORICO, INDICE_HISTORICO, chave_resposta, resposta_da_geracao
 from sqlalchemy.exc import IntegrityError
 from functools import wraps
+from threading import Lock
+from time import perf_counter
+import armazenamento_limites
+import metricas
 import uuid
 
 limiter = Limiter(
     app=app,
     key_func=lambda: request.headers.get('x-api-key'),
-    storage_uri='memory://')
+    storage_uri=app.config['LIMITE_STORAGE_URI'],
+    storage_options=opcoes_limite())
+
+inicializar_banco()
+
+def ler_geracao_coleta():
+    return estado_da_coleta(db_mongo['Controle_de_coleta'].find_one({'_id':'Previsao_do_tempo'}))
+
+cache_previsao = CachePrevisao(
+    ler_geracao=ler_geracao_coleta,
+    capacidade=app.config['CACHE_PREVISAO_CAPACIDADE'],
+    intervalo_verificacao=app.config['CACHE_PREVISAO_INTERVALO'],
+    capacidade_negativa=app.config['CACHE_PREVISAO_CAPACIDADE_NEGATIVA'],
+    ttl_negativo=app.config['CACHE_PREVISAO_TTL_NEGATIVO'])
+
+indice_cidades = IndiceCidades()
+
+def carregar_cidades():
+    agrupamento = [{'$group': {'_id': {'cidade': '$c', 'uf': '$uf'}}}]
+    return [(grupo['_id'].get('cidade'), grupo['_id'].get('uf')) for grupo in db_mongo['Previsao_do_tempo'].aggregate(agrupamento)]
+
+def indice_atualizado():
+    estado_coleta = cache_previsao.geracao_atual()
+    geracao = estado_coleta[0] if estado_coleta else None
+    if indice_cidades.precisa_atualizar(geracao):
+        indice_cidades.reconstruir(carregar_cidades(), geracao)
+    return indice_cidades
+
+def resolver_cidade(consulta):
+    return indice_atualizado().resolver(consulta) or (consulta, None)
+
+instantaneo_previsoes = InstantaneoPrevisoes()
+trava_instantaneo = Lock()
+
+def carregar_documentos():
+    return db_mongo['Previsao_do_tempo'].find({}, {'_id': 0})
+
+def instantaneo_atualizado():
+    estado_coleta = cache_previsao.geracao_atual()
+    geracao = estado_coleta[0] if estado_coleta else None
+    if instantaneo_previsoes.precisa_atualizar(geracao):
+        with trava_instantaneo:
+            if instantaneo_previsoes.precisa_atualizar(geracao):
+                instantaneo_previsoes.reconstruir(carregar_documentos(), geracao)
+    return instantaneo_previsoes
+
+def carregar_previsao(cidade, uf=None):
+    previsao = db_mongo['Previsao_do_tempo'].find_one(filtro_cidade(cidade, uf), sort=[('d', 1)])
+    if previsao is None:
+        return None
+    return formatar_previsao(previsao)
+
+def carregar_historico(cidade, uf, inicio, fim):
+    historico = db_mongo[COLECAO_HISTORICO].find(filtro_historico(cidade, uf, inicio, fim), {'_id': 0}).sort('d', 1).hint(INDICE_HISTORICO)
+    return [formatar_historico(bucket) for bucket in historico]
+
+def carregar_resposta(chave):
+    return db_mongo['Previsao_renderizada'].find_one({'_id':chave})
+
+def resposta_pre_renderizada(visao, cidade, uf, status):
+    resposta = cache_previsao.obter(('renderizada',visao,cidade,uf), lambda: carregar_resposta(chave_resposta(visao, cidade, uf)))
+    if not resposta_da_geracao(resposta, cache_previsao.geracao_atual()):
+        return None
+    codificacao = codificacao_da_resposta(request.headers.get('Accept-Encoding'), resposta)
+    resposta_http = make_response(resposta[codificacao or 'identity'], status)
+    resposta_http.mimetype = 'application/json'
+    if codificacao:
+        resposta_http.headers['Content-Encoding'] = codificacao
+    resposta_http.vary.add('Accept-Encoding')
+    return resposta_http
+
+def carregar_previsoes(chaves):
+    cidades = list({cidade for _, cidade, _ in chaves})
+    pendentes = set(chaves)
+    previsoes = {}
+    for previsao in db_mongo['Previsao_do_tempo'].find({'c':{'$in':cidades}}).sort([('c', 1), ('d', 1)]):
+        registrar_previsao(previsoes, pendentes, previsao)
+    return previsoes
+
+def cidades_do_lote():
+    if request.is_json:
+        cidades = (request.get_json(silent=True) or {}).get('cidades') or []
+    else:
+        cidades = request.args.get('cidades', '').split(',')
+    return normalizar_cidades(cidades)
+
+def custo_do_lote():
+    return unidades_do_lote(cidades_do_lote(), app.config['LOTE_CIDADES_MAXIMO'], app.config['LOTE_CIDADES_POR_UNIDADE'])
+
+def carregar_previsao_semana(cidade, uf=None):
+    previsao = db_mongo['Previsao_do_tempo'].find(filtro_cidade(cidade, uf)).sort('d', 1)
+    return [formatar_previsao(dados) for dados in previsao]
+
+executor_senhas = ExecutorDeSenhas(
+    threads=app.config['SENHAS_THREADS'],
+    fila_maxima=app.config['SENHAS_FILA_MAXIMA'])
+
+cache_autenticacao = CacheAutenticacao(
+    ttl=app.config['CACHE_AUTENTICACAO_TTL'],
+    ttl_negativo=app.config['CACHE_AUTENTICACAO_TTL_NEGATIVO'],
+    capacidade=app.config['CACHE_AUTENTICACAO_CAPACIDADE'])
+
+metricas.registrar_estatisticas('cache_previsao', cache_previsao.estatisticas)
+metricas.registrar_estatisticas('cache_autenticacao', cache_autenticacao.estatisticas)
+metricas.registrar_estatisticas('executor_senhas', executor_senhas.estatisticas)
+
+def iniciar_medicao():
+    g.inicio_requisicao = perf_counter()
+
+def registrar_medicao(resposta):
+    if 'inicio_requisicao' in g:
+        metricas.observar_requisicao(request.endpoint or 'desconhecida', request.method, resposta.status_code, perf_counter() - g.inicio_requisicao)
+    return resposta
+
+if app.config['METRICAS_ATIVAS']:
+    app.json = metricas.ProvedorJSONMedido(app)
+    app.before_request(iniciar_medicao)
+    app.after_request(registrar_medicao)
+
+def consultar_chave(chave_api):
+    return Usuario.query.filter_by(chave_api=chave_api).first() is not None
+
+def chave_valida(chave_api):
+    if 'chave_valida' not in g:
+        g.chave_valida = cache_autenticacao.validar(chave_api, consultar_chave)
+    return g.chave_valida
+
+@limiter.request_filter
+def chave_nao_autenticada():
+    chave_api = request.headers.get('x-api-key')
+    if not chave_api:
+        return True
+    try:
+        return not chave_valida(chave_api)
+    except Exception:
+        return True
+
+def marcar_inexistente():
+    g.recurso_inexistente = True
+
+def previsao_inexistente():
+    marcar_inexistente()
+    return jsonify(ERRO_PARAMETROS)
+
+def resposta_condicional(f):
+    @wraps(f)
+    def decorated(*args,**kwargs):
+        if 'inicio_limite' in g:
+            metricas.observar_etapa('limite', perf_counter() - g.pop('inicio_limite'))
+        estado_coleta = cache_previsao.geracao_atual()
+        resposta = make_response(f(*args, **kwargs))
+        if estado_coleta is None or not aceita_validadores(resposta.status_code, g.get('recurso_inexistente', False)):
+            return resposta
+        if nao_modificada(estado_coleta, request.method, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')):
+            resposta = make_response('', 304)
+        resposta.headers.update(cabecalhos_condicionais(estado_coleta))
+        return resposta
+    return decorated
 
 def verificar_chave(f):
     @wraps(f)
@@ -61,22 +307,25 @@ def verificar_chave(f):
         if 'x-api-key' in request.headers:
             chave_api = request.headers['x-api-key']
         if not chave_api:
-            return jsonify({'mensagem': 'Api key não foi incluído!'}, 401)
+            return jsonify(ERRO_CHAVE_AUSENTE), 401
         try:
-            usuario = Usuario.query.filter_by(chave_api=chave_api).first()
+            with metricas.etapa('autenticacao'):
+                chave_valida_ = chave_valida(chave_api)
         except:
-            return jsonify({'mensagem': 'Api key é inválido'}, 401)
+            return jsonify(ERRO_CHAVE_INVALIDA), 401
+        if not chave_valida_:
+            return jsonify(ERRO_CHAVE_INVALIDA), 401
+        g.inicio_limite = perf_counter()
         return f(*args, **kwargs)
     return decorated
 
+@app.errorhandler(FilaDeSenhasCheia)
+def servidor_ocupado(erro):
+    return jsonify(ERRO_SERVIDOR_OCUPADO), 503, {'Retry-After': '1'}
+
 @app.route('/cadastro/formulario', methods=['GET'])
 def formulario_de_cadastro():
-    formulario = {
-        'nome':'Seu nome',
-        'email':'Seu email',
-        'senha':'Sua senha'
-    }
-    return jsonify(formulario)
+    return jsonify(FORMULARIO_CADASTRO)
 
 @app.route('/cadastro', methods=['POST'])
 def novo_cadastro():
@@ -86,17 +335,16 @@ def novo_cadastro():
         email = formulario['email']
         senha = formulario['senha']
         if not all([nome,email,senha]):
-            return jsonify({'erro': 'nome, email e senha são obrigatórios'}), 400
-        salt = BcryptUtil.gerar_salt()
-        hash_senha_ = BcryptUtil.hash_senha(senha, salt)
+            return jsonify(ERRO_CADASTRO_INCOMPLETO), 400
+        salt = BcryptUtil.gerar_salt(app.config['BCRYPT_CUSTO'])
+        hash_senha_ = executor_senhas.executar(BcryptUtil.hash_senha, senha, salt)
         novo_usuario = Usuario(nome=nome,email=email,senha_hash=hash_senha_,salt=salt,chave_api='')
-        db_alchemy.create_all()
         db_alchemy.session.add(novo_usuario)
         db_alchemy.session.commit()
-        return jsonify({'mensagem': 'Cadastro realizado com sucesso!'}), 201
+        return jsonify(MENSAGEM_CADASTRO), 201
     except IntegrityError as erro:
         print(erro)
-        return jsonify({'erro':'O nome ou email já estão cadastrados. Escolha outro.'}), 400
+        return jsonify(ERRO_CADASTRO_DUPLICADO), 400
 
 @app.route('/login')
 def login():
@@ -104,7 +352,11 @@ def login():
     if not all([auth,auth.username,auth.password]):
         return make_response('Login invalido', 401,{'WWW-Authenticate': 'Basic realm="Login obrigatório"'})
     usuario = Usuario.query.filter_by(nome=auth.username).first()
-    if usuario and BcryptUtil.verificar_senha(auth.password,usuario.senha_hash,usuario.salt):
+    if usuario and executor_senhas.executar(BcryptUtil.verificar_senha, auth.password, usuario.senha_hash, usuario.salt):
+        if BcryptUtil.precisa_rehash(usuario.senha_hash, app.config['BCRYPT_CUSTO']):
+            usuario.salt = BcryptUtil.gerar_salt(app.config['BCRYPT_CUSTO'])
+            usuario.senha_hash = executor_senhas.executar(BcryptUtil.hash_senha, auth.password, usuario.salt)
+            db_alchemy.session.commit()
         if not usuario.chave_api:
             api_key = str(uuid.uuid4())
             usuario.chave_api = api_key
@@ -116,42 +368,149 @@ def login():
 
 @app.route('/tempo', methods=['GET'])
 @verificar_chave
-@limiter.limit('200 per day')
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
 def previsao_do_dia():
-    try:
-        previsao = db_mongo['Previsao_do_tempo'].find_one({'cidade':'Florianópolis'})
-        previsao_ = {key:value for key, value in previsao.items() if key != '_id'}
-        return jsonify(previsao_), 200
-    except AttributeError:
-        return jsonify({
-            'mensagem': 'Parâmetros de consulta inválidos. Verifique a sintaxe da solicitação.',
-            'status': 400})
+    resposta = resposta_pre_renderizada('dia','Florianópolis','SC',200)
+    if resposta is not None:
+        return resposta
+    previsao_ = cache_previsao.obter(('dia','Florianópolis',None), lambda: carregar_previsao('Florianópolis'))
+    if previsao_ is None:
+        return previsao_inexistente()
+    return jsonify(previsao_), 200
 
 @app.route('/tempo/cidade/<cidade>', methods=['GET'])
 @verificar_chave
-@limiter.limit('200 per day')
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
 def previsao_por_cidade(cidade):
-    try:
-        previsao = db_mongo['Previsao_do_tempo'].find_one({'cidade':cidade})
-        previsao_ = {key:value for key, value in previsao.items() if key != '_id'}
-        return jsonify(previsao_), 201
-    except AttributeError:
-        return jsonify({
-            'mensagem': 'Parâmetros de consulta inválidos. Verifique a sintaxe da solicitação.',
-            'status': 400})
+    cidade, uf = resolver_cidade(cidade)
+    resposta = resposta_pre_renderizada('dia',cidade,uf,201) if uf else None
+    if resposta is not None:
+        return resposta
+    previsao_ = cache_previsao.obter(('dia',cidade,uf), lambda: carregar_previsao(cidade, uf))
+    if previsao_ is None:
+        return previsao_inexistente()
+    return jsonify(previsao_), 201
 
 @app.route('/tempo/cidade/<cidade>/semana', methods=['GET']) 
 @verificar_chave
-@limiter.limit('200 per day')
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
 def previsao_da_semana(cidade):
+    cidade, uf = resolver_cidade(cidade)
+    resposta = resposta_pre_renderizada('semana',cidade,uf,201) if uf else None
+    if resposta is not None:
+        return resposta
     try:
-        previsao = list(db_mongo['Previsao_do_tempo'].find({'cidade':cidade}))
-        previsao_ = [{key:value for key,value in dados.items() if key != '_id'} for dados in previsao]
-        return jsonify(previsao_[0:]), 201
+        previsao_ = cache_previsao.obter(('semana',cidade,uf), lambda: carregar_previsao_semana(cidade, uf))
+        if not previsao_:
+            marcar_inexistente()
+        return jsonify(previsao_), 201
     except AttributeError:
-        return jsonify({
-            'mensagem': 'Parâmetros de consulta inválidos. Verifique a sintaxe da solicitação.',
-            'status': 400})
+        return previsao_inexistente()
+
+@app.route('/tempo/cidades', methods=['GET', 'POST'])
+@verificar_chave
+@limiter.limit('200 per day', cost=custo_do_lote, deduct_when=consumir_limite)
+@resposta_condicional
+def previsao_por_cidades():
+    cidades = cidades_do_lote()
+    erro = erro_do_lote(cidades, app.config['LOTE_CIDADES_MAXIMO'])
+    if erro:
+        return jsonify(erro), 400
+    resolvidas = {consulta: ('dia',) + resolver_cidade(consulta) for consulta in cidades}
+    previsoes = cache_previsao.obter_varios(list(dict.fromkeys(resolvidas.values())), carregar_previsoes)
+    return jsonify({consulta: previsoes[chave] for consulta, chave in resolvidas.items()}), 200
+
+@app.route('/cidades/sugestoes', methods=['GET'])
+@verificar_chave
+@limiter.limit('60 per minute', deduct_when=consumir_limite)
+@resposta_condicional
+def sugestoes_de_cidades():
+    prefixo = request.args.get('prefixo', '').strip()
+    if not prefixo:
+        return jsonify(ERRO_PREFIXO), 400
+    limite = inteiro_limitado(request.args.get('limite'), 10, indice_cidades.maximo_sugestoes)
+    return jsonify(indice_atualizado().sugerir(prefixo, limite)), 200
+
+def campo_invalido():
+    return jsonify(ERRO_CAMPO), 400
+
+def data_invalida():
+    return jsonify(ERRO_DATA), 400
+
+@app.route('/analise/ranking', methods=['GET'])
+@verificar_chave
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
+def ranking_de_cidades():
+    campo = request.args.get('campo', 'tmax')
+    if campo not in CAMPOS_NUMERICOS:
+        return campo_invalido()
+    try:
+        data = data_da_consulta(request.args.get('data'))
+    except ValueError:
+        return data_invalida()
+    quantidade = inteiro_limitado(request.args.get('n'), 10, app.config['ANALISE_RANKING_MAXIMO'])
+    crescente = request.args.get('ordem', 'desc') == 'asc'
+    return jsonify(instantaneo_atualizado().ranking(campo, quantidade, crescente, data, request.args.get('uf'))), 200
+
+@app.route('/analise/cidades', methods=['GET'])
+@verificar_chave
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
+def filtro_de_cidades():
+    try:
+        data = data_da_consulta(request.args.get('data'))
+    except ValueError:
+        return data_invalida()
+    try:
+        faixas = faixas_da_consulta(request.args)
+    except ValueError:
+        return jsonify(ERRO_FAIXAS), 400
+    limite = inteiro_limitado(request.args.get('limite'), app.config['ANALISE_LIMITE_MAXIMO'], app.config['ANALISE_LIMITE_MAXIMO'])
+    total, cidades = instantaneo_atualizado().filtrar(
+        data, request.args.get('uf'), request.args.get('condicao'), request.args.get('vento'), faixas, limite)
+    return jsonify({'total': total, 'cidades': cidades}), 200
+
+@app.route('/analise/estados', methods=['GET'])
+@verificar_chave
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
+def agregado_por_estado():
+    campo = request.args.get('campo', 'tmed')
+    if campo not in CAMPOS_NUMERICOS:
+        return campo_invalido()
+    try:
+        data = data_da_consulta(request.args.get('data'))
+    except ValueError:
+        return data_invalida()
+    return jsonify(instantaneo_atualizado().agregar_por_uf(campo, data)), 200
+
+@app.route('/tempo/cidade/<cidade>/historico', methods=['GET'])
+@verificar_chave
+@limiter.limit('200 per day', deduct_when=consumir_limite)
+@resposta_condicional
+def historico_da_cidade(cidade):
+    try:
+        inicio, fim = intervalo_do_historico(data_da_consulta(request.args.get('inicio')), data_da_consulta(request.args.get('fim')))
+    except ValueError:
+        return data_invalida()
+    if not intervalo_valido(inicio, fim, app.config['HISTORICO_INTERVALO_MAXIMO_DIAS']):
+        return jsonify(erro_intervalo(app.config['HISTORICO_INTERVALO_MAXIMO_DIAS'])), 400
+    cidade, uf = resolver_cidade(cidade)
+    historico = cache_previsao.obter(('historico',cidade,uf,inicio,fim), lambda: carregar_historico(cidade, uf, inicio, fim))
+    if not historico:
+        marcar_inexistente()
+    return jsonify(historico), 200
+
+@app.route('/metrics', methods=['GET'])
+def metricas_prometheus():
+    if not app.config['METRICAS_ATIVAS']:
+        return jsonify(ERRO_METRICAS), 404
+    corpo, tipo = metricas.gerar_metricas()
+    return make_response(corpo, 200, {'Content-Type': tipo})
 
 if __name__ == '__main__':
     app.run(port=5000, host='localhost', debug=True)
\ No newline at end of file
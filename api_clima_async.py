@@ -0,0 +1,516 @@
+"""
+API ASGI Assíncrona para Consulta de Dados Climáticos
+
+Esta é a variante assíncrona de 'api_clima.py'. Ela expõe as mesmas rotas, com a mesma autenticação por chave API,
+os mesmos limites de taxa e as mesmas respostas, mas atende as requisições em um loop de eventos: as consultas ao
+MongoDB usam o driver assíncrono Motor, as consultas ao banco de usuários rodam em threads e o bcrypt roda no
+executor de senhas limitado de 'assegurando_senha.py', sem bloquear as demais requisições.
+
+As duas aplicações podem rodar lado a lado. Elas compartilham o modelo 'Usuario' e as configurações de
+'conexao_db.py', os caches de 'cache_previsao.py' e 'cache_autenticacao.py' e as regras de 'api_comum.py' (filtros,
+validação, mensagens e cabeçalhos condicionais); apenas a leitura da requisição, o acesso aos bancos e a montagem da
+resposta HTTP são próprios de cada uma.
+
+Módulos Utilizados:
+    - starlette: Para criar a aplicação ASGI.
+    - motor: Driver assíncrono do MongoDB.
+    - limits: Para limitar as requisições de acordo com a chave API (a mesma biblioteca usada pelo Flask-Limiter).
+    - api_comum: Filtros, validação dos parâmetros, mensagens de erro e cabeçalhos condicionais, os mesmos da API Flask.
+    - conexao_db: Configurações e modelo de usuários compartilhados com a API Flask.
+    - assegurando_senha: Módulo para lidar com segurança de senhas usando o bcrypt.
+
+Rotas:
+    - As mesmas de 'api_clima.py': /cadastro/formulario, /cadastro, /login, /tempo, /tempo/cidade/<cidade>,
+      /tempo/cidade/<cidade>/semana, /tempo/cidade/<cidade>/historico, /tempo/cidades, /cidades/sugestoes, /analise/ranking, /analise/cidades e
+      /analise/estados e /metrics.
+
+Uso:
+    - Instale as dependências e execute: uvicorn api_clima_async:app --port 5001
+    - Para comparar com a API Flask, use o script 'teste_de_carga.py'.
+
+Nota:
+    - Os caches são locais a cada processo, como na API Flask.
+    - As métricas (metricas.py) são as mesmas da API Flask. A latência por rota é medida pelo middleware
+      MiddlewareMetricas, e a etapa 'limite' corresponde à consulta ao armazenamento do limite de taxa.
+    - A reconstrução do instantâneo colunar das rotas /analise roda em uma thread, para não bloquear o loop de eventos.
+    - Os contadores do limite de taxa ficam no armazenamento compartilhado de LIMITE_STORAGE_URI
+      (armazenamento_limites.py), com as mesmas chaves do Flask-Limiter ('LIMITER/<chave API>/<rota>/...', em que
+      a rota é o nome da função, igual ao endpoint do Flask); com o mesmo armazenamento, as duas APIs somam a cota.
+      A consulta ao armazenamento roda em uma thread, pois o backend SQLite é síncrono.
+    - Como na API Flask, ETag, Last-Modified e Cache-Control ('private') só são enviados em respostas 2xx de
+      recursos existentes, e só essas respostas são trocadas por 304. A cota do limite de taxa é verificada antes
+      da rota e descontada depois dela, exceto quando a resposta é 304.
+"""
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import Response
+from starlette.routing import Route
+from motor.motor_asyncio import AsyncIOMotorClient
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from sqlalchemy.exc import IntegrityError
+from conexao_db import app as app_flask, db_alchemy, Usuario, opcoes_mongo, opcoes_limite, inicializar_banco
+from assegurando_senha import BcryptUtil, ExecutorDeSenhas, FilaDeSenhasCheia
+from cache_previsao import CachePrevisao
+from cache_autenticacao import CacheAutenticacao
+from indice_cidades import IndiceCidades
+from instantaneo_previsoes import InstantaneoPrevisoes, CAMPOS_NUMERICOS, data_da_consulta, faixas_da_consulta
+from api_comum import (FORMULARIO_CADASTRO, MENSAGEM_CADASTRO, ERRO_CADASTRO_INCOMPLETO, ERRO_CADASTRO_DUPLICADO,
+                       ERRO_CHAVE_AUSENTE, ERRO_CHAVE_INVALIDA, ERRO_SERVIDOR_OCUPADO, ERRO_PARAMETROS, ERRO_PREFIXO,
+                       ERRO_CAMPO, ERRO_DATA, ERRO_FAIXAS, ERRO_METRICAS, estado_da_coleta, filtro_cidade,
+                       filtro_historico, registrar_previsao, normalizar_cidades, erro_do_lote, unidades_do_lote,
+                       inteiro_limitado, intervalo_do_historico, intervalo_valido, erro_intervalo,
+                       codificacao_da_resposta, nao_modificada, aceita_validadores, cabecalhos_condicionais,
+                       consumir_limite)
+from Dados_Climaticos.esquema_previsao import formatar_previsao, formatar_historico
+from Dados_Climaticos.publicacao import (COLECAO_HISTORICO, INDICE_HISTORICO, chave_resposta, resposta_da_geracao,
+                                         serializar_json)
+from functools import wraps
+from time import perf_counter
+import armazenamento_limites
+import metricas
+import asyncio
+import base64
+import uuid
+
+mongo = AsyncIOMotorClient(app_flask.config['MONGO_URI'], **opcoes_mongo())
+db_mongo = mongo.get_default_database('Dados_Climaticos')
+
+limite_diario = parse('200 per day')
+limite_sugestoes = parse('60 per minute')
+limitador = FixedWindowRateLimiter(storage_from_string(app_flask.config['LIMITE_STORAGE_URI'], **opcoes_limite()))
+
+inicializar_banco()
+
+def resposta_json(dados, status=200):
+    with metricas.etapa('serializacao'):
+        corpo = serializar_json(dados)
+    return Response(corpo, status_code=status, media_type='application/json')
+
+async def ler_geracao_coleta():
+    return estado_da_coleta(await db_mongo['Controle_de_coleta'].find_one({'_id':'Previsao_do_tempo'}))
+
+cache_previsao = CachePrevisao(
+    ler_geracao=ler_geracao_coleta,
+    capacidade=app_flask.config['CACHE_PREVISAO_CAPACIDADE'],
+    intervalo_verificacao=app_flask.config['CACHE_PREVISAO_INTERVALO'],
+    capacidade_negativa=app_flask.config['CACHE_PREVISAO_CAPACIDADE_NEGATIVA'],
+    ttl_negativo=app_flask.config['CACHE_PREVISAO_TTL_NEGATIVO'])
+
+cache_autenticacao = CacheAutenticacao(
+    ttl=app_flask.config['CACHE_AUTENTICACAO_TTL'],
+    ttl_negativo=app_flask.config['CACHE_AUTENTICACAO_TTL_NEGATIVO'],
+    capacidade=app_flask.config['CACHE_AUTENTICACAO_CAPACIDADE'])
+
+indice_cidades = IndiceCidades()
+
+async def carregar_cidades():
+    agrupamento = [{'$group': {'_id': {'cidade': '$c', 'uf': '$uf'}}}]
+    return [(grupo['_id'].get('cidade'), grupo['_id'].get('uf')) async for grupo in db_mongo['Previsao_do_tempo'].aggregate(agrupamento)]
+
+async def indice_atualizado():
+    estado_coleta = await cache_previsao.geracao_atual_async()
+    geracao = estado_coleta[0] if estado_coleta else None
+    if indice_cidades.precisa_atualizar(geracao):
+        indice_cidades.reconstruir(await carregar_cidades(), geracao)
+    return indice_cidades
+
+async def resolver_cidade(consulta):
+    return (await indice_atualizado()).resolver(consulta) or (consulta, None)
+
+instantaneo_previsoes = InstantaneoPrevisoes()
+trava_instantaneo = asyncio.Lock()
+
+async def carregar_documentos():
+    return await db_mongo['Previsao_do_tempo'].find({}, {'_id': 0}).to_list(length=None)
+
+async def instantaneo_atualizado():
+    estado_coleta = await cache_previsao.geracao_atual_async()
+    geracao = estado_coleta[0] if estado_coleta else None
+    if instantaneo_previsoes.precisa_atualizar(geracao):
+        async with trava_instantaneo:
+            if instantaneo_previsoes.precisa_atualizar(geracao):
+                await run_in_threadpool(instantaneo_previsoes.reconstruir, await carregar_documentos(), geracao)
+    return instantaneo_previsoes
+
+async def carregar_previsao(cidade, uf=None):
+    previsao = await db_mongo['Previsao_do_tempo'].find_one(filtro_cidade(cidade, uf), sort=[('d', 1)])
+    return formatar_previsao(previsao) if previsao is not None else None
+
+async def carregar_previsao_semana(cidade, uf=None):
+    return [formatar_previsao(previsao) async for previsao in db_mongo['Previsao_do_tempo'].find(filtro_cidade(cidade, uf)).sort('d', 1)]
+
+async def carregar_previsoes(chaves):
+    cidades = list({cidade for _, cidade, _ in chaves})
+    pendentes = set(chaves)
+    previsoes = {}
+    async for previsao in db_mongo['Previsao_do_tempo'].find({'c':{'$in':cidades}}).sort([('c', 1), ('d', 1)]):
+        registrar_previsao(previsoes, pendentes, previsao)
+    return previsoes
+
+async def carregar_historico(cidade, uf, inicio, fim):
+    historico = db_mongo[COLECAO_HISTORICO].find(filtro_historico(cidade, uf, inicio, fim), {'_id': 0}).sort('d', 1).hint(INDICE_HISTORICO)
+    return [formatar_historico(bucket) async for bucket in historico]
+
+async def carregar_resposta(chave):
+    return await db_mongo['Previsao_renderizada'].find_one({'_id':chave})
+
+async def resposta_pre_renderizada(request, visao, cidade, uf, status):
+    resposta = await cache_previsao.obter_async(('renderizada',visao,cidade,uf), lambda: carregar_resposta(chave_resposta(visao, cidade, uf)))
+    if not resposta_da_geracao(resposta, await cache_previsao.geracao_atual_async()):
+        return None
+    codificacao = codificacao_da_resposta(request.headers.get('accept-encoding'), resposta)
+    cabecalhos = {'Vary': 'Accept-Encoding'}
+    if codificacao:
+        cabecalhos['Content-Encoding'] = codificacao
+    return Response(resposta[codificacao or 'identity'], status_code=status, media_type='application/json', headers=cabecalhos)
+
+def consultar_chave_sync(chave_api):
+    with app_flask.app_context():
+        return Usuario.query.filter_by(chave_api=chave_api).first() is not None
+
+async def consultar_chave(chave_api):
+    return await run_in_threadpool(consultar_chave_sync, chave_api)
+
+def verificar_chave(f):
+    @wraps(f)
+    async def decorated(request):
+        chave_api = request.headers.get('x-api-key')
+        if not chave_api:
+            return resposta_json(ERRO_CHAVE_AUSENTE, 401)
+        try:
+            with metricas.etapa('autenticacao'):
+                chave_valida = await cache_autenticacao.validar_async(chave_api, consultar_chave)
+        except Exception:
+            return resposta_json(ERRO_CHAVE_INVALIDA, 401)
+        if not chave_valida:
+            return resposta_json(ERRO_CHAVE_INVALIDA, 401)
+        return await f(request)
+    return decorated
+
+async def custo_unitario(request):
+    return 1
+
+def limitar(custo=custo_unitario, limite=limite_diario):
+    def decorador(f):
+        @wraps(f)
+        async def decorated(request):
+            custo_ = await custo(request)
+            identificadores = (request.headers.get('x-api-key'), f.__name__)
+            with metricas.etapa('limite'):
+                permitida = await run_in_threadpool(limitador.test, limite, *identificadores)
+            if not permitida:
+                return Response(f'429 Too Many Requests: {limite}', status_code=429, media_type='text/html')
+            resposta = await f(request)
+            if consumir_limite(resposta):
+                with metricas.etapa('limite'):
+                    await run_in_threadpool(limitador.hit, limite, *identificadores, cost=custo_)
+            return resposta
+        return decorated
+    return decorador
+
+def marcar_inexistente(request):
+    request.state.recurso_inexistente = True
+
+def previsao_inexistente(request):
+    marcar_inexistente(request)
+    return resposta_json(ERRO_PARAMETROS)
+
+def resposta_condicional(f):
+    @wraps(f)
+    async def decorated(request):
+        estado_coleta = await cache_previsao.geracao_atual_async()
+        resposta = await f(request)
+        if estado_coleta is None or not aceita_validadores(resposta.status_code, getattr(request.state, 'recurso_inexistente', False)):
+            return resposta
+        if nao_modificada(estado_coleta, request.method, request.headers.get('if-none-match'), request.headers.get('if-modified-since')):
+            resposta = Response(status_code=304)
+        resposta.headers.update(cabecalhos_condicionais(estado_coleta))
+        return resposta
+    return decorated
+
+async def cidades_do_lote(request):
+    if getattr(request.state, 'cidades', None) is None:
+        if request.headers.get('content-type', '').startswith('application/json'):
+            try:
+                corpo = await request.json()
+            except ValueError:
+                corpo = {}
+            cidades = (corpo if isinstance(corpo, dict) else {}).get('cidades') or []
+        else:
+            cidades = request.query_params.get('cidades', '').split(',')
+        request.state.cidades = normalizar_cidades(cidades)
+    return request.state.cidades
+
+async def custo_do_lote(request):
+    return unidades_do_lote(await cidades_do_lote(request), app_flask.config['LOTE_CIDADES_MAXIMO'], app_flask.config['LOTE_CIDADES_POR_UNIDADE'])
+
+async def formulario_de_cadastro(request):
+    return resposta_json(FORMULARIO_CADASTRO)
+
+executor_senhas = ExecutorDeSenhas(
+    threads=app_flask.config['SENHAS_THREADS'],
+    fila_maxima=app_flask.config['SENHAS_FILA_MAXIMA'])
+
+metricas.registrar_estatisticas('cache_previsao', cache_previsao.estatisticas)
+metricas.registrar_estatisticas('cache_autenticacao', cache_autenticacao.estatisticas)
+metricas.registrar_estatisticas('executor_senhas', executor_senhas.estatisticas)
+
+async def operacao_de_senha(funcao, *args):
+    return await asyncio.wrap_future(executor_senhas.submeter(funcao, *args))
+
+async def servidor_ocupado(request, erro):
+    resposta = resposta_json(ERRO_SERVIDOR_OCUPADO, 503)
+    resposta.headers['Retry-After'] = '1'
+    return resposta
+
+def cadastrar_usuario(nome, email, salt, hash_senha_):
+    with app_flask.app_context():
+        novo_usuario = Usuario(nome=nome,email=email,senha_hash=hash_senha_,salt=salt,chave_api='')
+        db_alchemy.session.add(novo_usuario)
+        try:
+            db_alchemy.session.commit()
+        except IntegrityError:
+            db_alchemy.session.rollback()
+            raise
+
+async def novo_cadastro(request):
+    try:
+        formulario = await request.json()
+        nome = formulario['nome']
+        email = formulario['email']
+        senha = formulario['senha']
+        if not all([nome,email,senha]):
+            return resposta_json(ERRO_CADASTRO_INCOMPLETO, 400)
+        salt = BcryptUtil.gerar_salt(app_flask.config['BCRYPT_CUSTO'])
+        hash_senha_ = await operacao_de_senha(BcryptUtil.hash_senha, senha, salt)
+        await run_in_threadpool(cadastrar_usuario, nome, email, salt, hash_senha_)
+        return resposta_json(MENSAGEM_CADASTRO, 201)
+    except IntegrityError as erro:
+        print(erro)
+        return resposta_json(ERRO_CADASTRO_DUPLICADO, 400)
+
+def buscar_hash_senha(nome):
+    with app_flask.app_context():
+        usuario = Usuario.query.filter_by(nome=nome).first()
+        return (usuario.senha_hash, usuario.salt) if usuario else None
+
+def concluir_login(nome, salt=None, hash_senha_=None):
+    with app_flask.app_context():
+        usuario = Usuario.query.filter_by(nome=nome).first()
+        if hash_senha_ is not None:
+            usuario.salt = salt
+            usuario.senha_hash = hash_senha_
+        if not usuario.chave_api:
+            usuario.chave_api = str(uuid.uuid4())
+        db_alchemy.session.commit()
+        return usuario.chave_api
+
+def credenciais_basic(request):
+    tipo, _, valor = request.headers.get('authorization', '').partition(' ')
+    if tipo.lower() != 'basic' or not valor:
+        return None, None
+    try:
+        nome, _, senha = base64.b64decode(valor).decode('utf-8').partition(':')
+    except ValueError:
+        return None, None
+    return nome, senha
+
+async def login(request):
+    login_invalido = Response('Login invalido', status_code=401, headers={'WWW-Authenticate': 'Basic realm="Login obrigatório"'})
+    nome, senha = credenciais_basic(request)
+    if not all([nome,senha]):
+        return login_invalido
+    hash_armazenado = await run_in_threadpool(buscar_hash_senha, nome)
+    if not (hash_armazenado and await operacao_de_senha(BcryptUtil.verificar_senha, senha, *hash_armazenado)):
+        return login_invalido
+    salt = hash_senha_ = None
+    if BcryptUtil.precisa_rehash(hash_armazenado[0], app_flask.config['BCRYPT_CUSTO']):
+        salt = BcryptUtil.gerar_salt(app_flask.config['BCRYPT_CUSTO'])
+        hash_senha_ = await operacao_de_senha(BcryptUtil.hash_senha, senha, salt)
+    api_key = await run_in_threadpool(concluir_login, nome, salt, hash_senha_)
+    return resposta_json({'x-api-key':api_key})
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def previsao_do_dia(request):
+    resposta = await resposta_pre_renderizada(request, 'dia', 'Florianópolis', 'SC', 200)
+    if resposta is not None:
+        return resposta
+    previsao_ = await cache_previsao.obter_async(('dia','Florianópolis',None), lambda: carregar_previsao('Florianópolis'))
+    if previsao_ is None:
+        return previsao_inexistente(request)
+    return resposta_json(previsao_, 200)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def previsao_por_cidade(request):
+    cidade, uf = await resolver_cidade(request.path_params['cidade'])
+    resposta = await resposta_pre_renderizada(request, 'dia', cidade, uf, 201) if uf else None
+    if resposta is not None:
+        return resposta
+    previsao_ = await cache_previsao.obter_async(('dia',cidade,uf), lambda: carregar_previsao(cidade, uf))
+    if previsao_ is None:
+        return previsao_inexistente(request)
+    return resposta_json(previsao_, 201)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def previsao_da_semana(request):
+    cidade, uf = await resolver_cidade(request.path_params['cidade'])
+    resposta = await resposta_pre_renderizada(request, 'semana', cidade, uf, 201) if uf else None
+    if resposta is not None:
+        return resposta
+    previsao_ = await cache_previsao.obter_async(('semana',cidade,uf), lambda: carregar_previsao_semana(cidade, uf))
+    if not previsao_:
+        marcar_inexistente(request)
+    return resposta_json(previsao_, 201)
+
+@verificar_chave
+@limitar(custo=custo_do_lote)
+@resposta_condicional
+async def previsao_por_cidades(request):
+    cidades = await cidades_do_lote(request)
+    erro = erro_do_lote(cidades, app_flask.config['LOTE_CIDADES_MAXIMO'])
+    if erro:
+        return resposta_json(erro, 400)
+    resolvidas = {consulta: ('dia',) + await resolver_cidade(consulta) for consulta in cidades}
+    previsoes = await cache_previsao.obter_varios_async(list(dict.fromkeys(resolvidas.values())), carregar_previsoes)
+    return resposta_json({consulta: previsoes[chave] for consulta, chave in resolvidas.items()}, 200)
+
+@verificar_chave
+@limitar(limite=limite_sugestoes)
+@resposta_condicional
+async def sugestoes_de_cidades(request):
+    prefixo = request.query_params.get('prefixo', '').strip()
+    if not prefixo:
+        return resposta_json(ERRO_PREFIXO, 400)
+    limite = inteiro_limitado(request.query_params.get('limite'), 10, indice_cidades.maximo_sugestoes)
+    return resposta_json((await indice_atualizado()).sugerir(prefixo, limite), 200)
+
+def campo_invalido():
+    return resposta_json(ERRO_CAMPO, 400)
+
+def data_invalida():
+    return resposta_json(ERRO_DATA, 400)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def ranking_de_cidades(request):
+    campo = request.query_params.get('campo', 'tmax')
+    if campo not in CAMPOS_NUMERICOS:
+        return campo_invalido()
+    try:
+        data = data_da_consulta(request.query_params.get('data'))
+    except ValueError:
+        return data_invalida()
+    quantidade = inteiro_limitado(request.query_params.get('n'), 10, app_flask.config['ANALISE_RANKING_MAXIMO'])
+    crescente = request.query_params.get('ordem', 'desc') == 'asc'
+    instantaneo = await instantaneo_atualizado()
+    return resposta_json(instantaneo.ranking(campo, quantidade, crescente, data, request.query_params.get('uf')), 200)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def filtro_de_cidades(request):
+    try:
+        data = data_da_consulta(request.query_params.get('data'))
+    except ValueError:
+        return data_invalida()
+    try:
+        faixas = faixas_da_consulta(request.query_params)
+    except ValueError:
+        return resposta_json(ERRO_FAIXAS, 400)
+    limite = inteiro_limitado(request.query_params.get('limite'), app_flask.config['ANALISE_LIMITE_MAXIMO'], app_flask.config['ANALISE_LIMITE_MAXIMO'])
+    total, cidades = (await instantaneo_atualizado()).filtrar(
+        data, request.query_params.get('uf'), request.query_params.get('condicao'), request.query_params.get('vento'), faixas, limite)
+    return resposta_json({'total': total, 'cidades': cidades}, 200)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def agregado_por_estado(request):
+    campo = request.query_params.get('campo', 'tmed')
+    if campo not in CAMPOS_NUMERICOS:
+        return campo_invalido()
+    try:
+        data = data_da_consulta(request.query_params.get('data'))
+    except ValueError:
+        return data_invalida()
+    return resposta_json((await instantaneo_atualizado()).agregar_por_uf(campo, data), 200)
+
+@verificar_chave
+@limitar()
+@resposta_condicional
+async def historico_da_cidade(request):
+    try:
+        inicio, fim = intervalo_do_historico(data_da_consulta(request.query_params.get('inicio')), data_da_consulta(request.query_params.get('fim')))
+    except ValueError:
+        return data_invalida()
+    if not intervalo_valido(inicio, fim, app_flask.config['HISTORICO_INTERVALO_MAXIMO_DIAS']):
+        return resposta_json(erro_intervalo(app_flask.config['HISTORICO_INTERVALO_MAXIMO_DIAS']), 400)
+    cidade, uf = await resolver_cidade(request.path_params['cidade'])
+    historico = await cache_previsao.obter_async(('historico',cidade,uf,inicio,fim), lambda: carregar_historico(cidade, uf, inicio, fim))
+    if not historico:
+        marcar_inexistente(request)
+    return resposta_json(historico, 200)
+
+async def metricas_prometheus(request):
+    if not app_flask.config['METRICAS_ATIVAS']:
+        return resposta_json(ERRO_METRICAS, 404)
+    corpo, tipo = metricas.gerar_metricas()
+    return Response(corpo, status_code=200, headers={'Content-Type': tipo})
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que registra a latência de cada requisição HTTP, com o nome da função da rota (o mesmo rótulo
+    da API Flask), o método e o status da resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        inicio = perf_counter()
+        resposta = {'status': 500}
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                resposta['status'] = mensagem['status']
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            endpoint = scope.get('endpoint')
+            rota = getattr(endpoint, '__name__', 'desconhecida')
+            metricas.observar_requisicao(rota, scope['method'], resposta['status'], perf_counter() - inicio)
+
+app = Starlette(routes=[
+    Route('/cadastro/formulario', formulario_de_cadastro, methods=['GET']),
+    Route('/cadastro', novo_cadastro, methods=['POST']),
+    Route('/login', login, methods=['GET']),
+    Route('/tempo', previsao_do_dia, methods=['GET']),
+    Route('/tempo/cidade/{cidade}', previsao_por_cidade, methods=['GET']),
+    Route('/tempo/cidade/{cidade}/semana', previsao_da_semana, methods=['GET']),
+    Route('/tempo/cidade/{cidade}/historico', historico_da_cidade, methods=['GET']),
+    Route('/tempo/cidades', previsao_por_cidades, methods=['GET', 'POST']),
+    Route('/cidades/sugestoes', sugestoes_de_cidades, methods=['GET']),
+    Route('/analise/ranking', ranking_de_cidades, methods=['GET']),
+    Route('/analise/cidades', filtro_de_cidades, methods=['GET']),
+    Route('/analise/estados', agregado_por_estado, methods=['GET']),
+    Route('/metrics', metricas_prometheus, methods=['GET']),
+], exception_handlers={FilaDeSenhasCheia: servidor_ocupado},
+   middleware=[Middleware(MiddlewareMetricas)] if app_flask.config['METRICAS_ATIVAS'] else [])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5001, host='localhost')
@@ -0,0 +1,286 @@
+"""
+Regras Comuns às APIs de Dados Climáticos
+
+Este módulo concentra a parte das rotas que não depende do framework web nem faz I/O: os filtros das consultas ao
+MongoDB, a validação e a normalização dos parâmetros, as mensagens de erro e o cálculo dos cabeçalhos condicionais.
+Ele é usado pela API Flask (api_clima.py) e pela API assíncrona (api_clima_async.py); cada uma delas apenas lê a
+requisição, consulta os bancos (de forma síncrona ou assíncrona) e monta a resposta HTTP com o seu framework.
+
+Constantes:
+    - FORMULARIO_CADASTRO: O formulário retornado por /cadastro/formulario.
+    - ERRO_*, MENSAGEM_CADASTRO: Os corpos JSON das respostas de erro e de sucesso compartilhadas pelas rotas.
+    - ERRO_PARAMETROS: O corpo da resposta das rotas /tempo quando a cidade não é encontrada. Como na versão original
+      da API, ele é enviado com o status HTTP 200 e o código 400 apenas no corpo.
+
+Funções:
+    - estado_da_coleta(controle): Converte o marcador de geração da coleta em (geracao, finalizada_em).
+    - filtro_cidade(cidade, uf=None): Filtro do MongoDB para uma cidade, opcionalmente restrito a uma UF.
+    - filtro_historico(cidade, uf, inicio, fim): Filtro do MongoDB para o histórico de uma cidade em um intervalo.
+    - registrar_previsao(previsoes, pendentes, documento): Guarda a previsão de um documento nas chaves do lote que ele atende.
+    - normalizar_cidades(cidades): Remove espaços, valores vazios e repetidos da lista de cidades do lote.
+    - erro_do_lote(cidades, maximo): Valida o tamanho do lote de cidades.
+    - unidades_do_lote(cidades, maximo, por_unidade): Quantas unidades do limite de taxa o lote consome.
+    - inteiro_limitado(valor, padrao, maximo): Converte um parâmetro numérico da consulta e o limita a [1, maximo].
+    - intervalo_do_historico(inicio, fim): Completa o intervalo da rota de histórico com os valores padrão.
+    - intervalo_valido(inicio, fim, maximo_dias): Verifica a ordem e o tamanho do intervalo do histórico.
+    - erro_intervalo(maximo_dias): A mensagem de intervalo inválido da rota de histórico.
+    - codificacao_da_resposta(accept_encoding, resposta): Escolhe a variante comprimida de uma resposta pré-renderizada.
+    - nao_modificada(estado_coleta, metodo, if_none_match, if_modified_since): Indica se a requisição condicional pode receber 304.
+    - aceita_validadores(status, recurso_inexistente): Indica se a resposta recebe ETag, Last-Modified e Cache-Control.
+    - cabecalhos_condicionais(estado_coleta, agora=None): Os cabeçalhos ETag, Last-Modified e Cache-Control da coleta atual.
+    - consumir_limite(resposta): Indica se a resposta desconta a cota do limite de taxa.
+"""
+from datetime import datetime, timedelta, timezone
+from werkzeug.datastructures import Accept
+from werkzeug.http import http_date, parse_accept_header, parse_date, parse_etags, quote_etag
+from agenda_coleta import proxima_execucao
+from instantaneo_previsoes import CAMPOS_NUMERICOS
+from Dados_Climaticos.esquema_previsao import formatar_previsao
+import math
+
+FORMULARIO_CADASTRO = {'nome': 'Seu nome', 'email': 'Seu email', 'senha': 'Sua senha'}
+MENSAGEM_CADASTRO = {'mensagem': 'Cadastro realizado com sucesso!'}
+ERRO_CADASTRO_INCOMPLETO = {'erro': 'nome, email e senha são obrigatórios'}
+ERRO_CADASTRO_DUPLICADO = {'erro': 'O nome ou email já estão cadastrados. Escolha outro.'}
+ERRO_CHAVE_AUSENTE = {'mensagem': 'Api key não foi incluído!'}
+ERRO_CHAVE_INVALIDA = {'mensagem': 'Api key é inválido'}
+ERRO_SERVIDOR_OCUPADO = {'erro': 'Servidor ocupado. Tente novamente em instantes.'}
+ERRO_PARAMETROS = {'mensagem': 'Parâmetros de consulta inválidos. Verifique a sintaxe da solicitação.', 'status': 400}
+ERRO_LOTE_VAZIO = {'erro': 'Informe ao menos uma cidade em "cidades".'}
+ERRO_PREFIXO = {'erro': 'Informe o início do nome da cidade em "prefixo".'}
+ERRO_CAMPO = {'erro': f'Informe em "campo" um dos valores: {", ".join(CAMPOS_NUMERICOS)}.'}
+ERRO_DATA = {'erro': 'Informe a data no formato dd/mm/aaaa.'}
+ERRO_FAIXAS = {'erro': 'Os limites "<campo>_min" e "<campo>_max" devem ser números.'}
+ERRO_METRICAS = {'erro': 'As métricas estão desativadas (METRICAS_ATIVAS=0).'}
+
+def estado_da_coleta(controle):
+    """
+    Converte o documento de controle da coleta no estado usado pelos caches e pelas requisições condicionais.
+
+    Parâmetros:
+        controle (dict ou None): O documento '_id': 'Previsao_do_tempo' da coleção 'Controle_de_coleta'.
+
+    Retorna:
+        tuple ou None: (geracao, finalizada_em), com 'finalizada_em' em UTC e sem microssegundos (a precisão do
+        Last-Modified), ou None se nenhuma coleta foi publicada.
+    """
+    if not controle:
+        return None
+    return controle['geracao'], controle['finalizada_em'].replace(tzinfo=timezone.utc, microsecond=0)
+
+def filtro_cidade(cidade, uf=None):
+    """
+    Monta o filtro do MongoDB para as previsões de uma cidade.
+
+    Parâmetros:
+        cidade (str): O nome da cidade, como gravado pela spider.
+        uf (str): A UF da cidade; se None, o filtro considera apenas o nome.
+
+    Retorna:
+        dict: O filtro da consulta.
+    """
+    return {'c':cidade, 'uf':uf} if uf else {'c':cidade}
+
+def filtro_historico(cidade, uf, inicio, fim):
+    """
+    Monta o filtro do MongoDB para o histórico de uma cidade, atendido pelo índice (c, d, uf).
+
+    Parâmetros:
+        cidade (str): O nome da cidade.
+        uf (str): A UF da cidade, ou None.
+        inicio (datetime): O primeiro dia previsto do intervalo.
+        fim (datetime): O último dia previsto do intervalo, inclusive.
+
+    Retorna:
+        dict: O filtro da consulta.
+    """
+    return dict(filtro_cidade(cidade, uf), d={'$gte': inicio, '$lte': fim})
+
+def registrar_previsao(previsoes, pendentes, documento):
+    """
+    Guarda a previsão formatada de um documento nas chaves do lote que ele atende: a chave sem UF e a chave com a
+    UF do documento. Os documentos devem chegar ordenados por data, para que cada chave receba o primeiro dia.
+
+    Parâmetros:
+        previsoes (dict): As previsões já encontradas, por chave ('dia', cidade, uf).
+        pendentes (set): As chaves pedidas pelo lote.
+        documento (dict): O documento tipado da coleção 'Previsao_do_tempo'.
+    """
+    for chave in (('dia', documento['c'], None), ('dia', documento['c'], documento['uf'])):
+        if chave in pendentes and chave not in previsoes:
+            previsoes[chave] = formatar_previsao(documento)
+
+def normalizar_cidades(cidades):
+    """
+    Normaliza a lista de cidades de /tempo/cidades.
+
+    Parâmetros:
+        cidades (list): Os valores informados na query string ou no corpo JSON.
+
+    Retorna:
+        list: Os nomes sem espaços nas pontas, na ordem informada, sem valores vazios, repetidos ou que não são texto.
+    """
+    return list(dict.fromkeys(cidade.strip() for cidade in cidades if isinstance(cidade, str) and cidade.strip()))
+
+def erro_do_lote(cidades, maximo):
+    """
+    Valida o tamanho do lote de /tempo/cidades.
+
+    Parâmetros:
+        cidades (list): As cidades já normalizadas.
+        maximo (int): A quantidade máxima de cidades por requisição (LOTE_CIDADES_MAXIMO).
+
+    Retorna:
+        dict ou None: O corpo da resposta 400, ou None se o lote é válido.
+    """
+    if not cidades:
+        return ERRO_LOTE_VAZIO
+    if len(cidades) > maximo:
+        return {'erro': f"Informe no máximo {maximo} cidades por requisição."}
+    return None
+
+def unidades_do_lote(cidades, maximo, por_unidade):
+    """
+    Calcula quantas unidades do limite de taxa uma requisição a /tempo/cidades consome.
+
+    Parâmetros:
+        cidades (list): As cidades já normalizadas.
+        maximo (int): A quantidade máxima de cidades por requisição (LOTE_CIDADES_MAXIMO).
+        por_unidade (int): Quantas cidades cabem em uma unidade (LOTE_CIDADES_POR_UNIDADE).
+
+    Retorna:
+        int: Uma unidade a cada 'por_unidade' cidades; um lote inválido consome uma unidade.
+    """
+    if erro_do_lote(cidades, maximo):
+        return 1
+    return math.ceil(len(cidades) / por_unidade)
+
+def inteiro_limitado(valor, padrao, maximo):
+    """
+    Converte um parâmetro numérico da consulta (?n=10, ?limite=50) e o limita ao intervalo [1, maximo].
+
+    Parâmetros:
+        valor (str ou None): O valor informado na consulta.
+        padrao (int): O valor usado quando o parâmetro está ausente ou não é um número inteiro.
+        maximo (int): O maior valor aceito.
+
+    Retorna:
+        int: O valor limitado.
+    """
+    try:
+        numero = int(valor) if valor is not None else padrao
+    except ValueError:
+        numero = padrao
+    return min(max(1, numero), maximo)
+
+def intervalo_do_historico(inicio, fim):
+    """
+    Completa o intervalo da rota de histórico: por padrão, de 7 dias atrás a 7 dias à frente.
+
+    Parâmetros:
+        inicio (date ou None): O primeiro dia informado na consulta.
+        fim (date ou None): O último dia informado na consulta.
+
+    Retorna:
+        tuple: (inicio, fim) como datetime à meia-noite, o formato do campo 'd' do histórico.
+    """
+    hoje = datetime.combine(datetime.now().date(), datetime.min.time())
+    inicio = datetime.combine(inicio, datetime.min.time()) if inicio else hoje - timedelta(days=7)
+    fim = datetime.combine(fim, datetime.min.time()) if fim else inicio + timedelta(days=14)
+    return inicio, fim
+
+def intervalo_valido(inicio, fim, maximo_dias):
+    """
+    Verifica se 'fim' não é anterior a 'inicio' e se o intervalo tem no máximo 'maximo_dias' dias.
+    """
+    return inicio <= fim and (fim - inicio).days <= maximo_dias
+
+def erro_intervalo(maximo_dias):
+    """
+    Retorna o corpo da resposta 400 da rota de histórico para um intervalo inválido.
+    """
+    return {'erro': f"Informe 'fim' depois de 'inicio', com no máximo {maximo_dias} dias de intervalo."}
+
+def codificacao_da_resposta(accept_encoding, resposta):
+    """
+    Escolhe a variante de uma resposta pré-renderizada a partir do cabeçalho Accept-Encoding.
+
+    Parâmetros:
+        accept_encoding (str ou None): O cabeçalho Accept-Encoding da requisição.
+        resposta (dict): O documento da coleção 'Previsao_renderizada'.
+
+    Retorna:
+        str ou None: 'br' ou 'gzip', conforme as preferências do cliente e as variantes gravadas, ou None para
+        enviar o corpo sem compressão ('identity').
+    """
+    aceitas = parse_accept_header(accept_encoding, Accept)
+    return aceitas.best_match([codificacao for codificacao in ('br','gzip') if codificacao in resposta])
+
+def nao_modificada(estado_coleta, metodo, if_none_match, if_modified_since):
+    """
+    Indica se uma requisição condicional corresponde à coleta publicada e pode ser respondida com 304.
+
+    Parâmetros:
+        estado_coleta (tuple ou None): (geracao, finalizada_em), ver 'estado_da_coleta'.
+        metodo (str): O método HTTP da requisição.
+        if_none_match (str ou None): O cabeçalho If-None-Match, que tem precedência sobre If-Modified-Since.
+        if_modified_since (str ou None): O cabeçalho If-Modified-Since.
+
+    Retorna:
+        bool: True se o ETag (comparação fraca) ou a data informada correspondem à coleta atual.
+    """
+    if estado_coleta is None or metodo not in ('GET', 'HEAD'):
+        return False
+    geracao, finalizada_em = estado_coleta
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(f'geracao-{geracao}')
+    if if_modified_since:
+        desde = parse_date(if_modified_since)
+        return desde is not None and finalizada_em <= desde
+    return False
+
+def aceita_validadores(status, recurso_inexistente=False):
+    """
+    Indica se uma resposta recebe os cabeçalhos condicionais e pode ser trocada por 304: apenas respostas 2xx de
+    recursos existentes. Erros e respostas de cidades não encontradas ou vazias não são validadas.
+
+    Parâmetros:
+        status (int): O status HTTP da resposta.
+        recurso_inexistente (bool): Se a rota indicou que o recurso consultado não existe.
+
+    Retorna:
+        bool: True se a resposta deve receber ETag, Last-Modified e Cache-Control.
+    """
+    return 200 <= status < 300 and not recurso_inexistente
+
+def cabecalhos_condicionais(estado_coleta, agora=None):
+    """
+    Calcula os cabeçalhos condicionais de uma resposta da coleta publicada.
+
+    Parâmetros:
+        estado_coleta (tuple): (geracao, finalizada_em), ver 'estado_da_coleta'.
+        agora (datetime): O horário atual, no horário local; por padrão, datetime.now().
+
+    Retorna:
+        dict: ETag fraco derivado da geração, Last-Modified com o horário de finalização da coleta e Cache-Control
+        'private' com max-age até a próxima execução agendada.
+    """
+    geracao, finalizada_em = estado_coleta
+    agora = agora or datetime.now()
+    return {
+        'ETag': quote_etag(f'geracao-{geracao}', weak=True),
+        'Last-Modified': http_date(finalizada_em),
+        'Cache-Control': f'private, max-age={max(0, int((proxima_execucao(agora) - agora).total_seconds()))}'
+    }
+
+def consumir_limite(resposta):
+    """
+    Indica se a resposta desconta a cota do limite de taxa: as respostas 304 não descontam.
+
+    Parâmetros:
+        resposta: A resposta HTTP do Flask ou do Starlette (ambas têm 'status_code').
+
+    Retorna:
+        bool: False para as respostas 304.
+    """
+    return resposta.status_code != 304
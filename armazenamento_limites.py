@@ -0,0 +1,284 @@
+"""
+Armazenamentos Compartilhados para o Limite de Taxa da API
+
+O Flask-Limiter guarda os contadores do limite de taxa em um armazenamento da biblioteca 'limits', escolhido pela
+URI em 'storage_uri'. Com 'memory://' cada worker tem os seus próprios contadores: com N workers a cota diária é
+multiplicada por N e é zerada a cada reinício. Este módulo registra dois esquemas de URI adicionais na biblioteca:
+
+    - sqlite:///limites.db
+      Contadores em um arquivo SQLite compartilhado pelos processos da máquina, sem nenhum serviço externo.
+      Cada incremento é uma única instrução UPSERT dentro de uma transação IMMEDIATE, portanto é atômico entre
+      processos. O arquivo usa o modo WAL para que as leituras não bloqueiem as escritas.
+
+    - lote+<uri>, por exemplo lote+sqlite:///limites.db ou lote+redis://localhost:6379
+      Envolve qualquer armazenamento da biblioteca 'limits' e mantém em memória, por alguns instantes, os
+      incrementos das chaves que estão longe do seu limite. Esses incrementos são enviados ao armazenamento
+      compartilhado em um único incr quando o lote enche, quando o intervalo de sincronização passa ou quando
+      a chave se aproxima do limite. A partir da margem configurada, todo incremento é enviado imediatamente.
+
+Classes:
+    - ArmazenamentoSQLite: Armazenamento de contadores de janela fixa em um arquivo SQLite.
+    - ArmazenamentoEmLote: Camada em memória que agrupa os incrementos antes de enviá-los a outro armazenamento.
+
+Funções:
+    - limite_da_chave(chave): Extrai da chave gerada pela biblioteca 'limits' o número máximo de requisições.
+
+Nota:
+    - Apenas a estratégia 'fixed-window' (a padrão do Flask-Limiter) é suportada.
+    - Com ArmazenamentoEmLote, uma chave pode ultrapassar o limite em no máximo 'lote' requisições por worker,
+      e somente enquanto estiver abaixo da margem. Perto do limite a contagem é exata.
+    - Este módulo precisa ser importado antes da criação do Limiter para que os esquemas sejam registrados.
+"""
+from threading import Lock, local
+from time import time
+import atexit
+import math
+import os
+import sqlite3
+from limits.storage import Storage, storage_from_string
+
+def limite_da_chave(chave):
+    """
+    Extrai o número máximo de requisições da chave de um limite.
+
+    As chaves da biblioteca 'limits' terminam em '<quantidade>/<multiplicador>/<granularidade>',
+    por exemplo 'LIMITER/<chave api>/<rota>/200/1/day'.
+
+    Parâmetros:
+        chave (str): A chave do contador.
+
+    Retorna:
+        int: O número máximo de requisições, ou 0 se a chave não estiver nesse formato.
+    """
+    try:
+        return int(chave.rsplit('/', 3)[-3])
+    except (IndexError, ValueError):
+        return 0
+
+
+class ArmazenamentoSQLite(Storage):
+    """
+    Contadores de janela fixa em um arquivo SQLite compartilhado entre processos.
+
+    Atributos:
+        caminho (str): Caminho do arquivo SQLite.
+        timeout (float): Tempo, em segundos, de espera pela trava de escrita do arquivo.
+
+    Métodos:
+        incr(self, key, expiry, elastic_expiry=False, amount=1): Incrementa o contador de forma atômica e retorna o novo valor.
+        get(self, key): Retorna o valor do contador na janela atual.
+        get_expiry(self, key): Retorna o horário, em segundos desde a época, em que a janela termina.
+        check(self): Verifica se o arquivo pode ser consultado.
+        reset(self): Remove todos os contadores.
+        clear(self, key): Remove um contador.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    INTERVALO_EXPURGO = 60
+
+    def __init__(self, uri, timeout=5, **options):
+        """
+        Inicializa o armazenamento e cria a tabela de contadores, se necessário.
+
+        Parâmetros:
+            uri (str): 'sqlite:///caminho/relativo.db' ou 'sqlite:////caminho/absoluto.db'.
+            timeout (float): Tempo, em segundos, de espera pela trava de escrita do arquivo.
+        """
+        super().__init__(uri, **options)
+        self.caminho = uri.split(':///', 1)[1] if ':///' in uri else ':memory:'
+        self.timeout = timeout
+        self._conexoes = local()
+        self._ultimo_expurgo = 0
+        self._conexao().execute(
+            'CREATE TABLE IF NOT EXISTS limites (chave TEXT PRIMARY KEY, contador INTEGER NOT NULL, expira_em REAL NOT NULL)')
+
+    def _conexao(self):
+        """ Retorna a conexão da thread atual, abrindo uma nova na primeira chamada e depois de um fork. """
+        if getattr(self._conexoes, 'pid', None) != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            self._conexoes.conexao = conexao
+            self._conexoes.pid = os.getpid()
+        return self._conexoes.conexao
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        agora = time()
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            conexao.execute(
+                'INSERT INTO limites (chave, contador, expira_em) VALUES (:chave, :quantidade, :expira_em) '
+                'ON CONFLICT(chave) DO UPDATE SET '
+                'contador = CASE WHEN expira_em <= :agora THEN excluded.contador ELSE contador + excluded.contador END, '
+                'expira_em = CASE WHEN expira_em <= :agora OR :elastica THEN excluded.expira_em ELSE expira_em END',
+                {'chave': key, 'quantidade': amount, 'expira_em': agora + expiry, 'agora': agora, 'elastica': elastic_expiry})
+            contador, = conexao.execute('SELECT contador FROM limites WHERE chave = ?', (key,)).fetchone()
+            if agora - self._ultimo_expurgo > self.INTERVALO_EXPURGO:
+                conexao.execute('DELETE FROM limites WHERE expira_em <= ?', (agora,))
+                self._ultimo_expurgo = agora
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+        return contador
+
+    def get(self, key):
+        registro = self._conexao().execute(
+            'SELECT contador FROM limites WHERE chave = ? AND expira_em > ?', (key, time())).fetchone()
+        return registro[0] if registro else 0
+
+    def get_expiry(self, key):
+        registro = self._conexao().execute(
+            'SELECT expira_em FROM limites WHERE chave = ? AND expira_em > ?', (key, time())).fetchone()
+        return int(registro[0] if registro else time())
+
+    def check(self):
+        try:
+            self._conexao().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conexao().execute('DELETE FROM limites').rowcount
+
+    def clear(self, key):
+        self._conexao().execute('DELETE FROM limites WHERE chave = ?', (key,))
+
+
+class ArmazenamentoEmLote(Storage):
+    """
+    Agrupa em memória os incrementos das chaves longe do limite antes de enviá-los ao armazenamento compartilhado.
+
+    Atributos:
+        armazenamento (limits.storage.Storage): O armazenamento compartilhado, criado a partir da URI sem o prefixo 'lote+'.
+        lote (int): Número máximo de incrementos mantidos em memória por chave.
+        intervalo_sincronizacao (float): Tempo máximo, em segundos, em que um incremento fica só em memória.
+        margem (float): Fração do limite a partir da qual todo incremento é enviado imediatamente.
+
+    Métodos:
+        incr(self, key, expiry, elastic_expiry=False, amount=1): Incrementa o contador, em memória ou no armazenamento compartilhado.
+        descarregar(self): Envia ao armazenamento compartilhado todos os incrementos pendentes.
+        get(self, key): Retorna o valor do contador, incluindo os incrementos pendentes.
+        get_expiry(self, key): Retorna o horário em que a janela termina.
+        check(self): Verifica o armazenamento compartilhado.
+        reset(self): Remove todos os contadores.
+        clear(self, key): Remove um contador.
+    """
+
+    STORAGE_SCHEME = ['lote+sqlite', 'lote+redis', 'lote+mongodb', 'lote+memcached', 'lote+memory']
+
+    def __init__(self, uri, lote=10, intervalo_sincronizacao=1.0, margem=0.8, **options):
+        """
+        Inicializa a camada em memória e o armazenamento compartilhado.
+
+        Parâmetros:
+            uri (str): A URI do armazenamento compartilhado, com o prefixo 'lote+'.
+            lote (int): Número máximo de incrementos mantidos em memória por chave.
+            intervalo_sincronizacao (float): Tempo máximo, em segundos, em que um incremento fica só em memória.
+            margem (float): Fração do limite a partir da qual todo incremento é enviado imediatamente.
+            **options: Opções repassadas ao armazenamento compartilhado.
+        """
+        super().__init__(uri)
+        self.armazenamento = storage_from_string(uri.split('+', 1)[1], **options)
+        self.lote = lote
+        self.intervalo_sincronizacao = intervalo_sincronizacao
+        self.margem = margem
+        self._entradas = {}
+        self._trava = Lock()
+        self._pid = os.getpid()
+        self._ultima_descarga = time()
+        atexit.register(self.descarregar)
+
+    def _entradas_do_processo(self):
+        """ Retorna as entradas em memória, descartando as herdadas do processo pai após um fork. """
+        if self._pid != os.getpid():
+            self._entradas = {}
+            self._pid = os.getpid()
+        return self._entradas
+
+    def _incremento_local(self, key, amount, agora):
+        """ Acumula o incremento em memória e retorna o novo valor, ou None se ele precisa ser enviado. """
+        entrada = self._entradas_do_processo().get(key)
+        if entrada is None or entrada['expira_em'] <= agora:
+            return None
+        if agora - entrada['sincronizado_em'] >= self.intervalo_sincronizacao or entrada['pendente'] + amount > self.lote:
+            return None
+        contador = entrada['compartilhado'] + entrada['pendente'] + amount
+        if contador > limite_da_chave(key) * self.margem:
+            return None
+        entrada['pendente'] += amount
+        return contador
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        agora = time()
+        with self._trava:
+            contador = None if elastic_expiry else self._incremento_local(key, amount, agora)
+            if contador is not None:
+                descarregar = agora - self._ultima_descarga >= self.intervalo_sincronizacao
+            else:
+                entrada = self._entradas_do_processo().pop(key, None)
+                pendente = entrada['pendente'] if entrada and entrada['expira_em'] > agora else 0
+        if contador is not None:
+            if descarregar:
+                self.descarregar()
+            return contador
+
+        contador = self.armazenamento.incr(key, expiry, elastic_expiry, amount=pendente + amount)
+        expira_em = self.armazenamento.get_expiry(key)
+        with self._trava:
+            entradas = self._entradas_do_processo()
+            concorrente = entradas.get(key)
+            entradas[key] = {
+                'compartilhado': contador,
+                'pendente': concorrente['pendente'] if concorrente else 0,
+                'expira_em': expira_em,
+                'sincronizado_em': agora
+            }
+        return contador
+
+    def descarregar(self):
+        """
+        Envia ao armazenamento compartilhado os incrementos pendentes de todas as chaves e remove as expiradas.
+        """
+        agora = time()
+        with self._trava:
+            self._ultima_descarga = agora
+            entradas = self._entradas_do_processo()
+            pendentes = []
+            for chave, entrada in list(entradas.items()):
+                if entrada['expira_em'] <= agora:
+                    del entradas[chave]
+                elif entrada['pendente']:
+                    pendentes.append((chave, entrada['pendente'], entrada['expira_em']))
+                    entrada['compartilhado'] += entrada['pendente']
+                    entrada['pendente'] = 0
+        for chave, pendente, expira_em in pendentes:
+            self.armazenamento.incr(chave, max(1, math.ceil(expira_em - agora)), amount=pendente)
+
+    def get(self, key):
+        with self._trava:
+            entrada = self._entradas_do_processo().get(key)
+            pendente = entrada['pendente'] if entrada and entrada['expira_em'] > time() else 0
+        return self.armazenamento.get(key) + pendente
+
+    def get_expiry(self, key):
+        with self._trava:
+            entrada = self._entradas_do_processo().get(key)
+            if entrada and entrada['expira_em'] > time():
+                return int(entrada['expira_em'])
+        return self.armazenamento.get_expiry(key)
+
+    def check(self):
+        return self.armazenamento.check()
+
+    def reset(self):
+        with self._trava:
+            self._entradas_do_processo().clear()
+        return self.armazenamento.reset()
+
+    def clear(self, key):
+        with self._trava:
+            self._entradas_do_processo().pop(key, None)
+        self.armazenamento.clear(key)
@@ -1,15 +1,38 @@
+"""
+Segurança de Senhas com bcrypt
+
+Este módulo reúne as operações de hash e verificação de senhas e um executor limitado para executá-las fora da
+thread da requisição. O bcrypt é propositalmente lento; sem um limite, uma rajada de logins ocuparia todos os
+núcleos e atrasaria as demais rotas da API.
+
+Classes:
+    - BcryptUtil: Geração de salt, hash e verificação de senhas.
+    - ExecutorDeSenhas: Pool de threads com número máximo de operações simultâneas e de operações em fila.
+    - FilaDeSenhasCheia: Exceção levantada quando a fila do executor está cheia.
+
+Nota:
+    - O bcrypt libera o GIL durante o cálculo do hash, portanto as threads do executor rodam em paralelo.
+    - O custo (work factor) do bcrypt fica gravado no próprio hash. Use 'precisa_rehash' após um login bem-sucedido
+      para atualizar os hashes gerados com um custo diferente do configurado.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
 import bcrypt
 
 class BcryptUtil:
     @staticmethod
-    def gerar_salt():
+    def gerar_salt(custo=12):
         """
         Gera um salt aleatório para uso com o bcrypt.
 
+        Parâmetros:
+            custo (int): O custo (work factor) do bcrypt; cada unidade a mais dobra o tempo do hash.
+
         Retorna:
             bytes: O salt gerado.
         """
-        return bcrypt.gensalt()
+        return bcrypt.gensalt(rounds=custo)
 
     @staticmethod
     def hash_senha(senha,salt):
@@ -27,9 +50,12 @@ class BcryptUtil:
         return bcrypt.hashpw(senha_,salt)
 
     @staticmethod
-    def verificar_senha(senha,hash_armazenado,salt):
+    def verificar_senha(senha,hash_armazenado,salt=None):
         """
-        Verifica se a senha fornecida corresponde ao hash armazenado usando o salt especificado.
+        Verifica se a senha fornecida corresponde ao hash armazenado.
+
+        A comparação é feita pelo bcrypt.checkpw em tempo constante. O salt já faz parte do hash armazenado;
+        o parâmetro é mantido por compatibilidade.
 
         Parâmetros:
             senha (str): A senha a ser verificada.
@@ -39,5 +65,140 @@ class BcryptUtil:
         Retorna:
             bool: True se a senha corresponder ao hash armazenado, False caso contrário.
         """
-        hash_senha_ = BcryptUtil.hash_senha(senha,salt)
-        return hash_senha_ == hash_armazenado
+        if isinstance(hash_armazenado, str):
+            hash_armazenado = hash_armazenado.encode('utf-8')
+        try:
+            return bcrypt.checkpw(senha.encode('utf-8'), hash_armazenado)
+        except ValueError:
+            return False
+
+    @staticmethod
+    def precisa_rehash(hash_armazenado,custo):
+        """
+        Verifica se o hash armazenado foi gerado com um custo diferente do configurado.
+
+        Parâmetros:
+            hash_armazenado (bytes): O hash armazenado, no formato '$2b$<custo>$<salt e hash>'.
+            custo (int): O custo configurado.
+
+        Retorna:
+            bool: True se o hash deve ser recalculado com o custo configurado.
+        """
+        if isinstance(hash_armazenado, str):
+            hash_armazenado = hash_armazenado.encode('utf-8')
+        try:
+            return int(hash_armazenado.split(b'$')[2]) != custo
+        except (IndexError, ValueError):
+            return True
+
+
+class FilaDeSenhasCheia(Exception):
+    """ Levantada quando o executor de senhas já tem o número máximo de operações pendentes. """
+
+
+class ExecutorDeSenhas:
+    """
+    Executa as operações de senha em um pool de threads limitado.
+
+    Atributos:
+        threads (int): Número máximo de operações executadas ao mesmo tempo.
+        fila_maxima (int): Número máximo de operações aguardando uma thread livre. Acima disso, as novas
+            operações são recusadas com FilaDeSenhasCheia em vez de aumentar a latência de todas as outras.
+        concluidas (int): Quantidade de operações concluídas.
+        recusadas (int): Quantidade de operações recusadas por falta de espaço na fila.
+
+    Métodos:
+        submeter(self, funcao, *args): Envia a operação ao pool e retorna o Future correspondente.
+        executar(self, funcao, *args): Envia a operação ao pool e aguarda o resultado.
+        estatisticas(self): Retorna a ocupação atual e os contadores do executor.
+    """
+
+    def __init__(self, threads=2, fila_maxima=16):
+        """
+        Inicializa o executor. As threads só são criadas na primeira operação, depois do fork dos workers.
+
+        Parâmetros:
+            threads (int): Número máximo de operações executadas ao mesmo tempo.
+            fila_maxima (int): Número máximo de operações aguardando uma thread livre.
+        """
+        self.threads = threads
+        self.fila_maxima = fila_maxima
+        self.concluidas = 0
+        self.recusadas = 0
+        self._em_execucao = 0
+        self._pendentes = 0
+        self._espera_total = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='senhas')
+        self._vagas = BoundedSemaphore(threads + fila_maxima)
+        self._trava = Lock()
+
+    def submeter(self, funcao, *args):
+        """
+        Envia a operação ao pool.
+
+        Parâmetros:
+            funcao (callable): A operação, por exemplo BcryptUtil.verificar_senha.
+            *args: Os argumentos da operação.
+
+        Retorna:
+            concurrent.futures.Future: O resultado futuro da operação.
+
+        Exceções:
+            FilaDeSenhasCheia: Se o número de operações pendentes já atingiu threads + fila_maxima.
+        """
+        if not self._vagas.acquire(blocking=False):
+            with self._trava:
+                self.recusadas += 1
+            raise FilaDeSenhasCheia('Muitas operações de senha em andamento.')
+        with self._trava:
+            self._pendentes += 1
+        enviada_em = perf_counter()
+
+        def tarefa():
+            with self._trava:
+                self._em_execucao += 1
+                self._espera_total += perf_counter() - enviada_em
+            try:
+                return funcao(*args)
+            finally:
+                with self._trava:
+                    self._em_execucao -= 1
+                    self._pendentes -= 1
+                    self.concluidas += 1
+                self._vagas.release()
+
+        try:
+            return self._executor.submit(tarefa)
+        except BaseException:
+            with self._trava:
+                self._pendentes -= 1
+            self._vagas.release()
+            raise
+
+    def executar(self, funcao, *args):
+        """
+        Envia a operação ao pool e aguarda o resultado.
+
+        Retorna:
+            O valor retornado pela operação.
+        """
+        return self.submeter(funcao, *args).result()
+
+    def estatisticas(self):
+        """
+        Retorna a ocupação atual e os contadores do executor.
+
+        Retorna:
+            dict: Operações em execução, na fila, concluídas, recusadas e o tempo médio de espera na fila, em segundos.
+        """
+        with self._trava:
+            iniciadas = self.concluidas + self._em_execucao
+            return {
+                'threads': self.threads,
+                'fila_maxima': self.fila_maxima,
+                'em_execucao': self._em_execucao,
+                'na_fila': self._pendentes - self._em_execucao,
+                'concluidas': self.concluidas,
+                'recusadas': self.recusadas,
+                'espera_media': self._espera_total / iniciadas if iniciadas else 0.0
+            }
@@ -0,0 +1,361 @@
+"""
+Benchmark Offline da API de Previsão do Tempo
+
+Este script mede a API Flask de 'api_clima.py' sem depender de um MongoDB em produção nem de rede. Ele:
+    1. Gera previsões de 7 dias para os 5570 municípios de Dados_Climaticos/codigo_IBGE.txt, no formato dos itens da
+       spider, e as publica com a mesma pipeline da coleta (esquema_previsao + publicacao.publicar_coleta), incluindo
+       as respostas pré-renderizadas.
+    2. Cria um banco SQLite temporário de usuários, com as chaves API da carga e um usuário para a rota /login.
+    3. Inicia a API em uma thread, com o servidor WSGI do Werkzeug, em uma porta livre de 127.0.0.1.
+    4. Executa os cenários com as funções de 'teste_de_carga.py' e mostra a vazão e as latências p50, p95 e p99.
+    5. Compara o resultado com o arquivo de referência e termina com código 1 se algum cenário piorou além da tolerância.
+
+Cenários:
+    - tempo: /tempo (Florianópolis).
+    - cidade: /tempo/cidade/<cidade>, em rodízio sobre --cidades municípios sorteados.
+    - semana: /tempo/cidade/<cidade>/semana, sobre os mesmos municípios.
+    - login: /login com autenticação Basic, incluindo o bcrypt no executor de senhas.
+
+Banco de previsões:
+    - Por padrão, se o executável 'mongod' estiver instalado, um MongoDB temporário é iniciado em uma porta livre de
+      127.0.0.1, com os dados em um diretório temporário, e encerrado ao final.
+    - Sem o 'mongod', ou com --mongomock, o MongoDB é substituído pelo mongomock, em memória, no próprio processo.
+      O mongomock não usa índices: cada falha do cache percorre a coleção inteira, portanto os cenários com muitas
+      cidades distintas ficam dominados por ele. Compare apenas execuções feitas com o mesmo banco.
+    - Com --mongo-uri, os dados são publicados no MongoDB informado. Use um banco dedicado, pois as coleções de
+      previsão são substituídas.
+
+Funções:
+    - ler_codigos(): Retorna os códigos IBGE dos municípios coletados pela spider.
+    - gerar_itens(codigos, dias=7, semente=42): Gera os itens no formato da spider.
+    - popular_previsoes(db, itens): Converte os itens e publica a coleta.
+    - popular_usuarios(api, quantidade_chaves): Cria os usuários da carga e retorna as chaves API.
+    - iniciar_mongod(diretorio): Inicia um MongoDB temporário e retorna o processo e a URI.
+    - iniciar_servidor(app): Inicia a API em uma thread e retorna o servidor.
+    - executar_cenarios(base, chaves, cidades, argumentos): Executa os cenários e retorna as métricas de cada um.
+    - comparar(resultados, referencia, tolerancia): Retorna as regressões em relação à referência.
+    - main(): Lê os parâmetros, prepara o ambiente, executa o benchmark e compara com a referência.
+
+Uso:
+    python benchmark_api.py --salvar-referencia     # grava benchmark_referencia.json
+    python benchmark_api.py                         # compara com a referência; código de saída 1 em caso de regressão
+    python benchmark_api.py --cenarios cidade semana --concorrencia 64 --requisicoes 5000
+
+Nota:
+    - A referência depende da máquina. Gere-a na mesma máquina (ou no mesmo tipo de máquina de CI) em que as
+      comparações serão feitas, com os mesmos parâmetros.
+    - Os limites de taxa continuam ativos: a carga é dividida entre várias chaves API, com no máximo
+      REQUISICOES_POR_CHAVE requisições por chave e por rota, de forma que o caminho do limitador também é medido.
+    - O servidor do Werkzeug usa uma thread por conexão; os números absolutos são menores que os do Gunicorn, mas
+      servem para comparar duas versões do código na mesma máquina.
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from math import ceil
+from threading import Thread
+from time import monotonic, sleep
+from urllib.parse import quote
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import uuid
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_CODIGOS = os.path.join(DIRETORIO, 'Dados_Climaticos', 'codigo_IBGE.txt')
+ARQUIVO_REFERENCIA = os.path.join(DIRETORIO, 'benchmark_referencia.json')
+UFS = {
+    '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP', '17': 'TO', '21': 'MA', '22': 'PI',
+    '23': 'CE', '24': 'RN', '25': 'PB', '26': 'PE', '27': 'AL', '28': 'SE', '29': 'BA', '31': 'MG', '32': 'ES',
+    '33': 'RJ', '35': 'SP', '41': 'PR', '42': 'SC', '43': 'RS', '50': 'MS', '51': 'MT', '52': 'GO', '53': 'DF'}
+NOMES_CONHECIDOS = {'4205407': 'Florianópolis', '3550308': 'São Paulo', '3304557': 'Rio de Janeiro', '5300108': 'Brasília'}
+DIAS_DA_SEMANA = ('Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo')
+CONDICOES = ('Poucas nuvens', 'Muitas nuvens', 'Muitas nuvens com chuva isolada', 'Chuva', 'Céu claro', 'Pancadas de chuva')
+VENTOS = ('Fracos', 'Moderados', 'Fortes', 'Moderados com rajadas')
+CENARIOS = ('tempo', 'cidade', 'semana', 'login')
+REQUISICOES_POR_CHAVE = 180
+USUARIO_LOGIN = 'benchmark'
+SENHA_LOGIN = 'benchmark'
+FOLGA_MS = 1.0
+
+def ler_codigos():
+    with open(ARQUIVO_CODIGOS, 'r', encoding='UTF-8') as arquivo:
+        return [codigo for codigo in arquivo.read().strip().split(';') if codigo]
+
+def gerar_itens(codigos, dias=7, semente=42):
+    """
+    Gera as previsões no mesmo formato dos itens da spider.
+
+    Parâmetros:
+        codigos (list): Os códigos IBGE dos municípios; os dois primeiros dígitos indicam o estado.
+        dias (int): Quantidade de dias de previsão por município.
+        semente (int): Semente do gerador, para que duas execuções usem exatamente os mesmos dados.
+
+    Retorna:
+        list: Dicionários com os campos de CAMPOS_ITEM da spider.
+    """
+    aleatorio = random.Random(semente)
+    hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    itens = []
+    for codigo in codigos:
+        nome = NOMES_CONHECIDOS.get(codigo, f'Município {codigo}')
+        uf = UFS.get(codigo[:2], 'XX')
+        for dia in range(dias):
+            data = hoje + timedelta(days=dia)
+            temperatura_minima = aleatorio.randint(-2, 26)
+            umidade_minima = aleatorio.randint(15, 80)
+            itens.append({
+                'cidade data': f'{nome}-{uf}, {data:%d/%m/%Y} - {DIAS_DA_SEMANA[data.weekday()]}',
+                'codicao meteorologica': f' {aleatorio.choice(CONDICOES)} ',
+                'temperatura minima': temperatura_minima,
+                'temperatura maxima': temperatura_minima + aleatorio.randint(2, 14),
+                'umidade minima': umidade_minima,
+                'umidade maxima': min(100, umidade_minima + aleatorio.randint(5, 35)),
+                'vento': aleatorio.choice(VENTOS)
+            })
+    return itens
+
+def popular_previsoes(db, itens):
+    from Dados_Climaticos.esquema_previsao import documento_da_previsao
+    from Dados_Climaticos.publicacao import COLECAO_STAGING, publicar_coleta
+    staging = db[COLECAO_STAGING]
+    staging.drop()
+    documentos = [documento_da_previsao(item) for item in itens]
+    for inicio in range(0, len(documentos), 1000):
+        staging.insert_many(documentos[inicio:inicio + 1000], ordered=True)
+    publicar_coleta(db, arquivar=False)
+
+def popular_usuarios(api, quantidade_chaves):
+    """
+    Cria os usuários da carga no banco SQLite temporário.
+
+    Parâmetros:
+        api (module): O módulo api_clima já importado.
+        quantidade_chaves (int): Quantidade de usuários com chave API.
+
+    Retorna:
+        list: As chaves API criadas.
+    """
+    from assegurando_senha import BcryptUtil
+    chaves = [str(uuid.uuid4()) for _ in range(quantidade_chaves)]
+    with api.app.app_context():
+        salt = BcryptUtil.gerar_salt(api.app.config['BCRYPT_CUSTO'])
+        usuarios = [api.Usuario(nome=USUARIO_LOGIN, email=f'{USUARIO_LOGIN}@benchmark', senha_hash=BcryptUtil.hash_senha(SENHA_LOGIN, salt), salt=salt, chave_api='')]
+        usuarios += [
+            api.Usuario(nome=f'carga{indice}', email=f'carga{indice}@benchmark', senha_hash='-', salt='-', chave_api=chave)
+            for indice, chave in enumerate(chaves)]
+        api.db_alchemy.session.add_all(usuarios)
+        api.db_alchemy.session.commit()
+    return chaves
+
+def porta_livre():
+    with socket.socket() as soquete:
+        soquete.bind(('127.0.0.1', 0))
+        return soquete.getsockname()[1]
+
+def iniciar_mongod(diretorio, tempo_maximo=30):
+    """
+    Inicia um MongoDB temporário em uma porta livre de 127.0.0.1.
+
+    Parâmetros:
+        diretorio (str): Diretório temporário onde os dados são gravados.
+        tempo_maximo (float): Tempo máximo, em segundos, de espera até o servidor aceitar conexões.
+
+    Retorna:
+        tuple: (subprocess.Popen, URI do banco 'Dados_Climaticos').
+    """
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    porta = porta_livre()
+    caminho_dados = os.path.join(diretorio, 'mongo')
+    os.makedirs(caminho_dados)
+    processo = subprocess.Popen(
+        ['mongod', '--dbpath', caminho_dados, '--port', str(porta), '--bind_ip', '127.0.0.1'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = monotonic() + tempo_maximo
+    while True:
+        cliente = MongoClient('127.0.0.1', porta, serverSelectionTimeoutMS=500)
+        try:
+            cliente.admin.command('ping')
+            break
+        except PyMongoError:
+            if processo.poll() is not None or monotonic() > limite:
+                processo.kill()
+                raise SystemExit('Não foi possível iniciar o mongod temporário.')
+            sleep(0.2)
+        finally:
+            cliente.close()
+    return processo, f'mongodb://127.0.0.1:{porta}/Dados_Climaticos'
+
+def iniciar_servidor(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def executar_cenarios(base, chaves, cidades, argumentos):
+    """
+    Executa os cenários escolhidos, cada um precedido de uma requisição de aquecimento que não é medida.
+
+    Retorna:
+        dict: {cenario: métricas de teste_de_carga.executar_carga}.
+    """
+    from teste_de_carga import executar_carga, _requisitar
+    urls = {
+        'tempo': [f'{base}/tempo'],
+        'cidade': [f'{base}/tempo/cidade/{quote(cidade)}' for cidade in cidades],
+        'semana': [f'{base}/tempo/cidade/{quote(cidade)}/semana' for cidade in cidades]
+    }
+    resultados = {}
+    for cenario in argumentos.cenarios:
+        if cenario == 'login':
+            resultados[cenario] = executar_carga(
+                f'{base}/login', None, argumentos.concorrencia_login, argumentos.requisicoes_login,
+                auth=(USUARIO_LOGIN, SENHA_LOGIN))
+        else:
+            _requisitar(urls[cenario][0], {'x-api-key': chaves[0]})
+            resultados[cenario] = executar_carga(urls[cenario], chaves, argumentos.concorrencia, argumentos.requisicoes)
+    return resultados
+
+def comparar(resultados, referencia, tolerancia):
+    """
+    Compara as métricas com a referência.
+
+    Um cenário regride se tiver falhas, se a vazão cair mais do que a tolerância ou se a latência p95 ou p99 subir
+    mais do que a tolerância (e mais do que FOLGA_MS, para ignorar variações abaixo de um milissegundo).
+
+    Parâmetros:
+        resultados (dict): As métricas desta execução.
+        referencia (dict): As métricas de referência, no mesmo formato.
+        tolerancia (float): A variação aceita, por exemplo 0.25 para 25%.
+
+    Retorna:
+        list: Descrições das regressões encontradas; vazia se não houver nenhuma.
+    """
+    regressoes = []
+    for cenario, metricas in resultados.items():
+        if metricas['falhas']:
+            regressoes.append(f"{cenario}: {metricas['falhas']} requisições falharam")
+        anterior = referencia.get(cenario)
+        if anterior is None:
+            continue
+        if metricas['vazao'] < anterior['vazao'] * (1 - tolerancia):
+            regressoes.append(f"{cenario}: vazão {metricas['vazao']:.1f} req/s, referência {anterior['vazao']:.1f} req/s")
+        for percentil in ('p95', 'p99'):
+            if metricas[percentil] > anterior[percentil] * (1 + tolerancia) + FOLGA_MS:
+                regressoes.append(f"{cenario}: {percentil} {metricas[percentil]:.2f} ms, referência {anterior[percentil]:.2f} ms")
+    return regressoes
+
+def imprimir(resultados, referencia):
+    print(f"{'cenário':<10}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}{'falhas':>9}{'req/s ref.':>13}{'p95 ref.':>11}")
+    for cenario, metricas in resultados.items():
+        anterior = referencia.get(cenario)
+        linha = (f"{cenario:<10}{metricas['vazao']:>10.1f}{metricas['p50']:>12.2f}{metricas['p95']:>12.2f}"
+                 f"{metricas['p99']:>12.2f}{metricas['falhas']:>9}")
+        if anterior:
+            linha += f"{anterior['vazao']:>13.1f}{anterior['p95']:>11.2f}"
+        print(linha)
+
+def ler_referencia(caminho):
+    try:
+        with open(caminho, 'r', encoding='UTF-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+def main():
+    parser = ArgumentParser(description='Executa o benchmark offline da API e compara com a referência.')
+    parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=list(CENARIOS), help='Cenários executados.')
+    parser.add_argument('--concorrencia', type=int, default=32, help='Requisições simultâneas nos cenários de previsão.')
+    parser.add_argument('--requisicoes', type=int, default=2000, help='Total de requisições por cenário de previsão.')
+    parser.add_argument('--cidades', type=int, default=500, help='Quantidade de municípios sorteados para os cenários cidade e semana.')
+    parser.add_argument('--concorrencia-login', type=int, default=4, help='Logins simultâneos.')
+    parser.add_argument('--requisicoes-login', type=int, default=40, help='Total de logins.')
+    parser.add_argument('--semente', type=int, default=42, help='Semente dos dados gerados e do sorteio das cidades.')
+    parser.add_argument('--mongo-uri', help='Usa este MongoDB em vez de um banco temporário. Use um banco dedicado.')
+    parser.add_argument('--mongomock', action='store_true', help='Usa o mongomock mesmo se o mongod estiver instalado.')
+    parser.add_argument('--referencia', default=ARQUIVO_REFERENCIA, help='Arquivo JSON com o resultado de referência.')
+    parser.add_argument('--salvar-referencia', action='store_true', help='Grava o resultado desta execução como referência.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Piora aceita em relação à referência (0.25 = 25%%).')
+    argumentos = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_api_')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(diretorio, 'usuarios.db')}"
+    os.environ['LIMITE_STORAGE_URI'] = f"lote+sqlite:///{os.path.join(diretorio, 'limites.db')}"
+    mongod = None
+    if argumentos.mongo_uri:
+        banco = 'externo'
+        os.environ['MONGO_URI'] = argumentos.mongo_uri
+    elif not argumentos.mongomock and shutil.which('mongod'):
+        banco = 'mongod'
+        mongod, os.environ['MONGO_URI'] = iniciar_mongod(diretorio)
+    else:
+        banco = 'mongomock'
+        print('Usando o mongomock: as falhas do cache percorrem a coleção inteira (sem índices).')
+        os.environ['MONGO_URI'] = 'mongodb://localhost:27017/Dados_Climaticos'
+    try:
+        if banco == 'mongomock':
+            import mongomock
+            with mongomock.patch(servers=(('localhost', 27017),)):
+                import api_clima
+        else:
+            import api_clima
+        resultados, parametros = executar_benchmark(api_clima, argumentos, banco)
+    finally:
+        if mongod is not None:
+            mongod.terminate()
+            mongod.wait()
+        shutil.rmtree(diretorio, ignore_errors=True)
+    referencia = ler_referencia(argumentos.referencia)
+    imprimir(resultados, referencia['resultados'] if referencia else {})
+    comparar_com_referencia(resultados, parametros, referencia, argumentos)
+
+def executar_benchmark(api_clima, argumentos, banco):
+    codigos = ler_codigos()
+    print(f'Publicando {len(codigos)} municípios x 7 dias de previsão...')
+    popular_previsoes(api_clima.db_mongo, gerar_itens(codigos, semente=argumentos.semente))
+    quantidade_chaves = ceil((argumentos.requisicoes + 1) / REQUISICOES_POR_CHAVE)
+    chaves = popular_usuarios(api_clima, quantidade_chaves)
+    cidades = [NOMES_CONHECIDOS.get(codigo, f'Município {codigo}')
+               for codigo in random.Random(argumentos.semente).sample(codigos, min(argumentos.cidades, len(codigos)))]
+
+    servidor = iniciar_servidor(api_clima.app)
+    try:
+        resultados = executar_cenarios(f'http://127.0.0.1:{servidor.port}', chaves, cidades, argumentos)
+    finally:
+        servidor.shutdown()
+
+    parametros = {
+        'concorrencia': argumentos.concorrencia, 'requisicoes': argumentos.requisicoes, 'cidades': argumentos.cidades,
+        'concorrencia_login': argumentos.concorrencia_login, 'requisicoes_login': argumentos.requisicoes_login,
+        'bcrypt_custo': api_clima.app.config['BCRYPT_CUSTO'], 'mongo': banco}
+    return resultados, parametros
+
+def comparar_com_referencia(resultados, parametros, referencia, argumentos):
+    if argumentos.salvar_referencia:
+        with open(argumentos.referencia, 'w', encoding='UTF-8') as arquivo:
+            json.dump({'gerada_em': datetime.now().isoformat(timespec='seconds'), 'parametros': parametros,
+                       'resultados': resultados}, arquivo, indent=2)
+        print(f'Referência gravada em {argumentos.referencia}.')
+        return
+    if referencia is None:
+        print('Nenhuma referência encontrada; execute com --salvar-referencia para criá-la.')
+        return
+    if referencia['parametros'] != parametros:
+        print('Aviso: a referência foi gerada com outros parâmetros; a comparação pode não ser significativa.')
+    regressoes = comparar(resultados, referencia['resultados'], argumentos.tolerancia)
+    if regressoes:
+        print('REGRESSÃO DE DESEMPENHO:')
+        for regressao in regressoes:
+            print(f'  - {regressao}')
+        sys.exit(1)
+    print(f'Nenhuma regressão acima de {argumentos.tolerancia:.0%} em relação à referência.')
+
+if __name__ == '__main__':
+    main()
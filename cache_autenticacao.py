@@ -0,0 +1,133 @@
+"""
+Cache em Memória para Autenticação por Chave API
+
+Este módulo fornece um cache com tempo de expiração (TTL) para o resultado da validação das chaves API,
+evitando uma consulta ao banco de dados de usuários a cada requisição autenticada.
+
+Chaves inexistentes também são armazenadas (cache negativo), com um TTL próprio e menor, para que uma
+sequência de requisições com chaves inválidas não chegue ao banco de dados.
+
+Classes:
+    - CacheAutenticacao: Cache LRU limitado com TTL separado para chaves válidas e inválidas.
+
+Nota:
+    - Quando uma chave é revogada ou substituída, chame 'invalidar(chave)' com a chave antiga para que a mudança seja
+      vista imediatamente. Uma chave recém-emitida (uuid4) nunca foi consultada e não precisa ser invalidada.
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class CacheAutenticacao:
+    """
+    Cache LRU com TTL para o resultado da validação de chaves API.
+
+    Atributos:
+        ttl (float): Tempo, em segundos, em que uma chave válida permanece em cache.
+        ttl_negativo (float): Tempo, em segundos, em que uma chave inválida permanece em cache.
+        capacidade (int): Número máximo de chaves mantidas no cache.
+        acertos (int): Quantidade de validações respondidas pelo cache.
+        falhas (int): Quantidade de validações que precisaram consultar o banco de dados.
+
+    Métodos:
+        validar(self, chave, consultar): Retorna se a chave é válida, consultando o banco apenas em caso de falha.
+        validar_async(self, chave, consultar): Versão assíncrona de validar, usada pela API ASGI.
+        invalidar(self, chave=None): Remove uma chave do cache, ou todas se nenhuma for informada.
+        estatisticas(self): Retorna os contadores e o tamanho atual do cache.
+    """
+
+    def __init__(self, ttl=300, ttl_negativo=30, capacidade=10000):
+        """
+        Inicializa o cache.
+
+        Parâmetros:
+            ttl (float): Tempo, em segundos, em que uma chave válida permanece em cache.
+            ttl_negativo (float): Tempo, em segundos, em que uma chave inválida permanece em cache.
+            capacidade (int): Número máximo de chaves mantidas no cache.
+        """
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.capacidade = capacidade
+        self.acertos = 0
+        self.falhas = 0
+        self._dados = OrderedDict()
+        self._trava = Lock()
+
+    def _buscar(self, chave, agora):
+        """ Retorna o resultado em cache, ou None se a chave não está em cache ou expirou. """
+        with self._trava:
+            entrada = self._dados.get(chave)
+            if entrada is not None and entrada[1] > agora:
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            self.falhas += 1
+            return None
+
+    def _armazenar(self, chave, valida, agora):
+        """ Armazena o resultado da consulta com o TTL correspondente. """
+        expira_em = agora + (self.ttl if valida else self.ttl_negativo)
+        with self._trava:
+            self._dados[chave] = (valida, expira_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False)
+
+    def validar(self, chave, consultar):
+        """
+        Retorna se a chave API é válida.
+
+        Parâmetros:
+            chave (str): A chave API enviada na requisição.
+            consultar (callable): Função que recebe a chave e retorna True se ela pertence a um usuário.
+
+        Retorna:
+            bool: True se a chave for válida, False caso contrário.
+        """
+        agora = monotonic()
+        valida = self._buscar(chave, agora)
+        if valida is None:
+            valida = bool(consultar(chave))
+            self._armazenar(chave, valida, agora)
+        return valida
+
+    async def validar_async(self, chave, consultar):
+        """
+        Versão assíncrona de validar, em que 'consultar' é uma corrotina.
+        """
+        agora = monotonic()
+        valida = self._buscar(chave, agora)
+        if valida is None:
+            valida = bool(await consultar(chave))
+            self._armazenar(chave, valida, agora)
+        return valida
+
+    def invalidar(self, chave=None):
+        """
+        Remove uma chave do cache, ou todas as chaves se nenhuma for informada.
+
+        Parâmetros:
+            chave (str): A chave API a ser removida.
+        """
+        with self._trava:
+            if chave is None:
+                self._dados.clear()
+            else:
+                self._dados.pop(chave, None)
+
+    def estatisticas(self):
+        """
+        Retorna os contadores e o tamanho atual do cache.
+
+        Retorna:
+            dict: Acertos, falhas, taxa de acerto e número de entradas.
+        """
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'entradas': len(self._dados)
+            }
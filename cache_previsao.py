@@ -0,0 +1,260 @@
+"""
+Cache em Memória para as Previsões do Tempo
+
+Este módulo fornece um cache LRU (Least Recently Used) limitado, usado pela API para responder às rotas
+de previsão do tempo sem consultar o MongoDB a cada requisição.
+
+Os dados da coleção 'Previsao_do_tempo' só mudam quando a spider termina uma coleta. Ao final de cada
+execução, a pipeline 'DadosClimaticosMongoPipeline' grava um marcador de geração na coleção
+'Controle_de_coleta'. O cache consulta esse marcador periodicamente e descarta todas as entradas
+quando a geração muda.
+
+Resultados vazios (None, ou uma lista vazia para o histórico), como os de uma cidade inexistente, ficam em um
+cache negativo separado, menor e com TTL curto. Assim requisições com nomes aleatórios não descartam do LRU
+principal as previsões das cidades reais.
+
+Classes:
+    - CachePrevisao: Cache LRU com contadores de acertos/falhas e invalidação por geração de coleta.
+
+Nota:
+    - O cache é local a cada processo. Em servidores com vários workers, cada worker mantém a sua cópia.
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class CachePrevisao:
+    """
+    Cache LRU limitado para previsões do tempo, invalidado pela geração da coleta.
+
+    Atributos:
+        capacidade (int): Número máximo de entradas mantidas no cache.
+        intervalo_verificacao (float): Intervalo mínimo, em segundos, entre duas leituras do marcador de geração.
+        capacidade_negativa (int): Número máximo de resultados vazios mantidos no cache negativo.
+        ttl_negativo (float): Tempo, em segundos, em que um resultado vazio permanece no cache negativo.
+        acertos (int): Quantidade de consultas respondidas pelo cache.
+        falhas (int): Quantidade de consultas que precisaram carregar os dados.
+        geracao: Última geração de coleta conhecida.
+
+    Métodos:
+        obter(self, chave, carregar): Retorna o valor em cache ou o carrega com a função fornecida.
+        obter_varios(self, chaves, carregar_varios): Retorna vários valores, carregando todas as falhas de uma só vez.
+        geracao_atual(self): Retorna a geração de coleta conhecida, relendo o marcador apenas se o intervalo expirou.
+        obter_async, obter_varios_async, geracao_atual_async: Versões assíncronas, usadas pela API ASGI.
+        invalidar(self): Descarta todas as entradas do cache.
+        estatisticas(self): Retorna os contadores e o tamanho atual do cache.
+    """
+
+    def __init__(self, ler_geracao, capacidade=8192, intervalo_verificacao=30, capacidade_negativa=1024, ttl_negativo=60):
+        """
+        Inicializa o cache.
+
+        Parâmetros:
+            ler_geracao (callable): Função sem parâmetros que retorna a geração atual da coleta.
+            capacidade (int): Número máximo de entradas mantidas no cache.
+            intervalo_verificacao (float): Intervalo mínimo, em segundos, entre duas leituras do marcador de geração.
+            capacidade_negativa (int): Número máximo de resultados vazios mantidos no cache negativo.
+            ttl_negativo (float): Tempo, em segundos, em que um resultado vazio permanece no cache negativo.
+        """
+        self.ler_geracao = ler_geracao
+        self.capacidade = capacidade
+        self.intervalo_verificacao = intervalo_verificacao
+        self.capacidade_negativa = capacidade_negativa
+        self.ttl_negativo = ttl_negativo
+        self.acertos = 0
+        self.falhas = 0
+        self.geracao = None
+        self._dados = OrderedDict()
+        self._negativos = OrderedDict()
+        self._trava = Lock()
+        self._proxima_verificacao = 0.0
+
+    def _precisa_verificar(self):
+        """ Retorna True, no máximo uma vez por intervalo, quando o marcador de geração deve ser relido. """
+        agora = monotonic()
+        if agora < self._proxima_verificacao:
+            return False
+        self._proxima_verificacao = agora + self.intervalo_verificacao
+        return True
+
+    def _atualizar_geracao(self, geracao):
+        """ Invalida o cache se a geração lida for diferente da conhecida. """
+        if geracao != self.geracao:
+            with self._trava:
+                self._dados.clear()
+                self._negativos.clear()
+                self.geracao = geracao
+
+    def _verificar_geracao(self):
+        """ Lê o marcador de geração, no máximo uma vez por intervalo, e invalida o cache se ele mudou. """
+        if self._precisa_verificar():
+            self._atualizar_geracao(self.ler_geracao())
+
+    async def _verificar_geracao_async(self):
+        """ Versão assíncrona de _verificar_geracao, para quando 'ler_geracao' é uma corrotina. """
+        if self._precisa_verificar():
+            self._atualizar_geracao(await self.ler_geracao())
+
+    def _consultar(self, chave, agora):
+        """ Retorna (encontrado, valor) de uma chave; deve ser chamada com a trava adquirida. """
+        if chave in self._dados:
+            self._dados.move_to_end(chave)
+            return True, self._dados[chave]
+        negativo = self._negativos.get(chave)
+        if negativo is not None:
+            if negativo[1] > agora:
+                return True, negativo[0]
+            del self._negativos[chave]
+        return False, None
+
+    def _buscar(self, chave):
+        """ Retorna (encontrado, valor, geracao) e atualiza os contadores. """
+        agora = monotonic()
+        with self._trava:
+            encontrado, valor = self._consultar(chave, agora)
+            if encontrado:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+            return encontrado, valor, self.geracao
+
+    def _buscar_varios(self, chaves):
+        """ Retorna (valores encontrados, chaves ausentes, geracao) e atualiza os contadores. """
+        agora = monotonic()
+        valores = {}
+        faltantes = []
+        with self._trava:
+            for chave in chaves:
+                encontrado, valor = self._consultar(chave, agora)
+                if encontrado:
+                    self.acertos += 1
+                    valores[chave] = valor
+                elif chave not in faltantes:
+                    self.falhas += 1
+                    faltantes.append(chave)
+            return valores, faltantes, self.geracao
+
+    def _armazenar(self, valores, geracao):
+        """
+        Armazena os valores carregados, desde que a geração não tenha mudado durante o carregamento.
+        Os resultados vazios vão para o cache negativo, com o TTL 'ttl_negativo'.
+        """
+        expira_em = monotonic() + self.ttl_negativo
+        with self._trava:
+            if geracao != self.geracao:
+                return
+            for chave, valor in valores.items():
+                if valor is None or valor == []:
+                    self._negativos[chave] = (valor, expira_em)
+                    self._negativos.move_to_end(chave)
+                else:
+                    self._dados[chave] = valor
+                    self._dados.move_to_end(chave)
+            while len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False)
+            while len(self._negativos) > self.capacidade_negativa:
+                self._negativos.popitem(last=False)
+
+    def obter(self, chave, carregar):
+        """
+        Retorna o valor associado à chave, carregando-o e armazenando-o em caso de falha.
+
+        Parâmetros:
+            chave (hashable): A chave da entrada, por exemplo ('dia', 'Florianópolis').
+            carregar (callable): Função sem parâmetros que retorna o valor a partir do banco de dados.
+
+        Retorna:
+            O valor em cache ou o valor recém-carregado (que pode ser None, armazenado no cache negativo).
+        """
+        self._verificar_geracao()
+        encontrado, valor, geracao = self._buscar(chave)
+        if not encontrado:
+            valor = carregar()
+            self._armazenar({chave: valor}, geracao)
+        return valor
+
+    async def obter_async(self, chave, carregar):
+        """
+        Versão assíncrona de obter, em que 'carregar' e 'ler_geracao' são corrotinas.
+        """
+        await self._verificar_geracao_async()
+        encontrado, valor, geracao = self._buscar(chave)
+        if not encontrado:
+            valor = await carregar()
+            self._armazenar({chave: valor}, geracao)
+        return valor
+
+    def obter_varios(self, chaves, carregar_varios):
+        """
+        Retorna os valores de várias chaves, carregando as que não estão em cache com uma única chamada.
+
+        Parâmetros:
+            chaves (list): As chaves desejadas.
+            carregar_varios (callable): Função que recebe a lista de chaves ausentes e retorna um dicionário
+                {chave: valor}. Chaves que não aparecem no dicionário são armazenadas com o valor None, no cache negativo.
+
+        Retorna:
+            dict: Um dicionário {chave: valor} com todas as chaves pedidas.
+        """
+        self._verificar_geracao()
+        valores, faltantes, geracao = self._buscar_varios(chaves)
+        if faltantes:
+            carregados = carregar_varios(faltantes)
+            carregados = {chave: carregados.get(chave) for chave in faltantes}
+            self._armazenar(carregados, geracao)
+            valores.update(carregados)
+        return valores
+
+    async def obter_varios_async(self, chaves, carregar_varios):
+        """
+        Versão assíncrona de obter_varios, em que 'carregar_varios' e 'ler_geracao' são corrotinas.
+        """
+        await self._verificar_geracao_async()
+        valores, faltantes, geracao = self._buscar_varios(chaves)
+        if faltantes:
+            carregados = await carregar_varios(faltantes)
+            carregados = {chave: carregados.get(chave) for chave in faltantes}
+            self._armazenar(carregados, geracao)
+            valores.update(carregados)
+        return valores
+
+    def geracao_atual(self):
+        """
+        Retorna a geração de coleta conhecida, relendo o marcador apenas se o intervalo de verificação expirou.
+
+        Retorna:
+            O valor retornado por 'ler_geracao' na última verificação.
+        """
+        self._verificar_geracao()
+        return self.geracao
+
+    async def geracao_atual_async(self):
+        """ Versão assíncrona de geracao_atual, em que 'ler_geracao' é uma corrotina. """
+        await self._verificar_geracao_async()
+        return self.geracao
+
+    def invalidar(self):
+        """ Descarta todas as entradas do cache e força a releitura do marcador de geração. """
+        with self._trava:
+            self._dados.clear()
+            self._negativos.clear()
+            self._proxima_verificacao = 0.0
+
+    def estatisticas(self):
+        """
+        Retorna os contadores e o tamanho atual do cache.
+
+        Retorna:
+            dict: Acertos, falhas, taxa de acerto, número de entradas, de entradas negativas e geração atual.
+        """
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'entradas': len(self._dados),
+                'entradas_negativas': len(self._negativos),
+                'geracao': self.geracao
+            }
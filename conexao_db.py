@@ -8,12 +8,49 @@ modelo de dados para os usuários do aplicativo.
 Configurações:
     - MONGO_URI: URI de conexão com o MongoDB (pode ser definida como uma variável de ambiente).
     - SQLALCHEMY_DATABASE_URI: URI de conexão com o banco de dados SQLite (pode ser definida como uma variável de ambiente).
+    - MONGO_POOL_MAXIMO / MONGO_POOL_MINIMO: Tamanho máximo e mínimo do pool de conexões de cada processo com o MongoDB.
+    - MONGO_TIMEOUT_SELECAO_MS / MONGO_TIMEOUT_SOCKET_MS: Tempo máximo para encontrar um servidor e para aguardar uma resposta.
+    - SQLALCHEMY_POOL_TAMANHO / SQLALCHEMY_POOL_TIMEOUT: Tamanho do pool de conexões do SQLAlchemy e tempo máximo de
+      espera, em segundos, por uma conexão livre.
+    - LIMITE_STORAGE_URI: URI do armazenamento dos contadores do limite de taxa, compartilhado entre os workers
+      (padrão 'lote+sqlite:///limites.db'; veja armazenamento_limites.py).
+    - LIMITE_LOTE / LIMITE_INTERVALO_SINCRONIZACAO: Incrementos mantidos em memória por chave e tempo máximo, em
+      segundos, até que sejam enviados ao armazenamento compartilhado (apenas para URIs 'lote+').
+    - SQLITE_BUSY_TIMEOUT_MS / SQLITE_CACHE_KB: Tempo máximo de espera pela trava de escrita do SQLite e tamanho do
+      cache de páginas de cada conexão.
+    - BCRYPT_CUSTO: Custo (work factor) do bcrypt para novas senhas; hashes com outro custo são recalculados no login.
+    - SENHAS_THREADS / SENHAS_FILA_MAXIMA: Operações de bcrypt simultâneas por worker e operações aguardando na fila.
+    - METRICAS_ATIVAS: 1 para registrar as métricas de desempenho expostas em /metrics (padrão), 0 para desativá-las.
+      Todas as configurações acima podem ser definidas como variáveis de ambiente com o mesmo nome.
+    - CACHE_PREVISAO_CAPACIDADE: Número máximo de entradas do cache de previsões da API.
+    - CACHE_PREVISAO_INTERVALO: Intervalo, em segundos, entre verificações da geração da coleta.
+    - CACHE_PREVISAO_CAPACIDADE_NEGATIVA / CACHE_PREVISAO_TTL_NEGATIVO: Número máximo de resultados vazios (cidades
+      inexistentes) mantidos à parte pelo cache de previsões e tempo, em segundos, em que cada um permanece em cache.
+    - CACHE_AUTENTICACAO_TTL / CACHE_AUTENTICACAO_TTL_NEGATIVO: Tempo em cache de chaves API válidas e inválidas.
+    - CACHE_AUTENTICACAO_CAPACIDADE: Número máximo de chaves API mantidas no cache de autenticação.
+    - LOTE_CIDADES_MAXIMO: Número máximo de cidades por requisição na rota /tempo/cidades.
+    - LOTE_CIDADES_POR_UNIDADE: Quantas cidades da rota /tempo/cidades contam como uma requisição no limite de taxa.
+    - HISTORICO_INTERVALO_MAXIMO_DIAS: Número máximo de dias consultados de uma vez na rota de histórico.
+    - ANALISE_RANKING_MAXIMO / ANALISE_LIMITE_MAXIMO: Número máximo de cidades no ranking e na lista do filtro das rotas /analise.
 
 Classes:
     - Usuario: Modelo de dados para representar um usuário do aplicativo.
 
+Funções:
+    - opcoes_mongo(): Retorna as opções do pool de conexões do MongoDB, usadas também pelo driver assíncrono, e o
+      ouvinte de comandos das métricas, se ativas.
+    - opcoes_limite(): Retorna as opções do armazenamento do limite de taxa.
+    - reiniciar_conexoes(): Descarta as conexões herdadas do processo pai; chamada em cada worker após o fork.
+    - configurar_sqlite(conexao, registro): Aplica os PRAGMAs de desempenho a cada nova conexão SQLite.
+    - inicializar_banco(): Cria as tabelas e os índices que faltam no banco de usuários; executada uma vez na inicialização.
+
 Notas:
 - Certifique-se de configurar as variáveis de ambiente adequadas para MONGO_URI e SQLALCHEMY_DATABASE_URI.
+- O MongoClient é criado com connect=False: nenhum socket ou thread de monitoramento é aberto até a primeira consulta.
+    Assim o módulo pode ser importado no processo mestre do servidor (preload) e cada worker abre as suas
+    próprias conexões depois do fork.
+- As conexões SQLite usam o modo WAL (leituras não bloqueiam a escrita), synchronous=NORMAL e busy_timeout, de
+    forma que cadastros e logins simultâneos aguardam a trava de escrita em vez de falhar com "database is locked".
 - Este módulo fornece configurações iniciais para um aplicativo Flask, mas você pode expandir
     e personalizar o aplicativo conforme necessário para atender aos requisitos específicos.
 
@@ -22,18 +59,91 @@ Notas:
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from pymongo import MongoClient
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+import metricas
+import sqlite3
+import os
 
 app = Flask(__name__)
 
 # Configurações movidas para variáveis de ambiente
-app.config['MONGO_URI'] = 'mongodb://localhost:27017/Dados_Climaticos'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///usuarios.db'
+app.config['MONGO_URI'] = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/Dados_Climaticos')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI', 'sqlite:///usuarios.db')
+app.config['MONGO_POOL_MAXIMO'] = int(os.environ.get('MONGO_POOL_MAXIMO', 50))
+app.config['MONGO_POOL_MINIMO'] = int(os.environ.get('MONGO_POOL_MINIMO', 0))
+app.config['MONGO_TIMEOUT_SELECAO_MS'] = int(os.environ.get('MONGO_TIMEOUT_SELECAO_MS', 5000))
+app.config['MONGO_TIMEOUT_SOCKET_MS'] = int(os.environ.get('MONGO_TIMEOUT_SOCKET_MS', 10000))
+app.config['SQLALCHEMY_POOL_TAMANHO'] = int(os.environ.get('SQLALCHEMY_POOL_TAMANHO', 5))
+app.config['SQLALCHEMY_POOL_TIMEOUT'] = int(os.environ.get('SQLALCHEMY_POOL_TIMEOUT', 30))
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_CACHE_KB'] = int(os.environ.get('SQLITE_CACHE_KB', 8192))
+app.config['LIMITE_STORAGE_URI'] = os.environ.get('LIMITE_STORAGE_URI', 'lote+sqlite:///limites.db')
+app.config['LIMITE_LOTE'] = int(os.environ.get('LIMITE_LOTE', 10))
+app.config['LIMITE_INTERVALO_SINCRONIZACAO'] = float(os.environ.get('LIMITE_INTERVALO_SINCRONIZACAO', 1))
+app.config['BCRYPT_CUSTO'] = int(os.environ.get('BCRYPT_CUSTO', 12))
+app.config['SENHAS_THREADS'] = int(os.environ.get('SENHAS_THREADS', 2))
+app.config['SENHAS_FILA_MAXIMA'] = int(os.environ.get('SENHAS_FILA_MAXIMA', 16))
+app.config['METRICAS_ATIVAS'] = bool(int(os.environ.get('METRICAS_ATIVAS', 1)))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': app.config['SQLALCHEMY_POOL_TAMANHO'],
+    'pool_timeout': app.config['SQLALCHEMY_POOL_TIMEOUT'],
+    'pool_pre_ping': True
+}
+app.config['CACHE_PREVISAO_CAPACIDADE'] = 8192
+app.config['CACHE_PREVISAO_INTERVALO'] = 30
+app.config['CACHE_PREVISAO_CAPACIDADE_NEGATIVA'] = 1024
+app.config['CACHE_PREVISAO_TTL_NEGATIVO'] = 60
+app.config['CACHE_AUTENTICACAO_TTL'] = 300
+app.config['CACHE_AUTENTICACAO_TTL_NEGATIVO'] = 30
+app.config['CACHE_AUTENTICACAO_CAPACIDADE'] = 10000
+app.config['LOTE_CIDADES_MAXIMO'] = 500
+app.config['LOTE_CIDADES_POR_UNIDADE'] = 25
+app.config['ANALISE_RANKING_MAXIMO'] = 100
+app.config['HISTORICO_INTERVALO_MAXIMO_DIAS'] = 31
+app.config['ANALISE_LIMITE_MAXIMO'] = 1000
+
+def opcoes_mongo():
+    opcoes = {
+        'maxPoolSize': app.config['MONGO_POOL_MAXIMO'],
+        'minPoolSize': app.config['MONGO_POOL_MINIMO'],
+        'serverSelectionTimeoutMS': app.config['MONGO_TIMEOUT_SELECAO_MS'],
+        'socketTimeoutMS': app.config['MONGO_TIMEOUT_SOCKET_MS']
+    }
+    if app.config['METRICAS_ATIVAS']:
+        opcoes['event_listeners'] = [metricas.ouvinte_mongo]
+    return opcoes
+
+def opcoes_limite():
+    if not app.config['LIMITE_STORAGE_URI'].startswith('lote+'):
+        return {}
+    return {
+        'lote': app.config['LIMITE_LOTE'],
+        'intervalo_sincronizacao': app.config['LIMITE_INTERVALO_SINCRONIZACAO']
+    }
 
 # Inicialização das extensões
-mongo = MongoClient(app.config['MONGO_URI'])
-db_mongo = mongo.Dados_Climaticos
+metricas.configurar(app.config['METRICAS_ATIVAS'], Engine)
+mongo = MongoClient(app.config['MONGO_URI'], connect=False, **opcoes_mongo())
+db_mongo = mongo.get_default_database('Dados_Climaticos')
 db_alchemy = SQLAlchemy(app)
 
+def reiniciar_conexoes():
+    with app.app_context():
+        db_alchemy.engine.dispose(close=False)
+
+@event.listens_for(Engine, 'connect')
+def configurar_sqlite(conexao, registro):
+    if not isinstance(conexao, sqlite3.Connection):
+        return
+    cursor = conexao.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_KB']}")
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
 # Classe de modelo
 class Usuario(db_alchemy.Model):
     id = db_alchemy.Column(db_alchemy.Integer, primary_key=True)
@@ -41,4 +151,25 @@ class Usuario(db_alchemy.Model):
     email = db_alchemy.Column(db_alchemy.String(200), unique=True, nullable=False)
     senha_hash = db_alchemy.Column(db_alchemy.String(128), nullable=False)
     salt = db_alchemy.Column(db_alchemy.String(100), nullable=False)
-    chave_api = db_alchemy.Column(db_alchemy.String(100))
\ No newline at end of file
+    chave_api = db_alchemy.Column(db_alchemy.String(100), index=True)
+
+def inicializar_banco():
+    """
+    Cria as tabelas e os índices que faltam no banco de usuários.
+
+    Bancos criados antes de 'chave_api' ser indexada recebem o índice aqui. As colunas 'nome' e 'email' precisam de
+    um índice único; se a tabela existente não tiver a restrição, um índice único é criado no lugar.
+    """
+    with app.app_context():
+        db_alchemy.create_all()
+        tabela = Usuario.__table__
+        for indice in tabela.indexes:
+            indice.create(bind=db_alchemy.engine, checkfirst=True)
+        inspetor = inspect(db_alchemy.engine)
+        colunas_unicas = {
+            tuple(indice['column_names'])
+            for indice in inspetor.get_indexes(tabela.name, include_auto_indexes=True) if indice['unique']}
+        for coluna in ('nome', 'email'):
+            if (coluna,) not in colunas_unicas:
+                with db_alchemy.engine.begin() as conexao:
+                    conexao.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS ux_{tabela.name}_{coluna} ON {tabela.name} ({coluna})'))
@@ -2,96 +2,268 @@
 Agendador de Execução de Spider para Coleta de Dados Climáticos
 
 Este script Python foi projetado para agendar e executar periodicamente uma spider de coleta de dados climáticos
-desenvolvida com Scrapy. Ele verifica se a spider está em execução, agenda novas execuções e gerencia a execução 
-da spider dentro de um intervalo de tempo específico, controlando o uso de recursos da máquina.
+desenvolvida com Scrapy. Ele calcula o horário exato da próxima execução, dorme até lá, executa a spider como um
+processo filho e registra o histórico de execuções, sem consultar os processos da máquina em intervalos curtos.
 
 Módulos Utilizados:
     - datetime: Para manipulação de data e hora.
     - time: Para operações relacionadas ao tempo.
-    - threading.Thread: Para executar a spider em uma thread separada.
-    - schedule: Para agendar execuções da spider.
-    - psutil: Para verificar os processos em execução.
+    - json: Para gravar o histórico de execuções.
+    - subprocess: Para executar a spider e os processos da coleta fragmentada.
+    - fcntl: Para a trava exclusiva do arquivo de trava, liberada pelo sistema operacional quando o processo termina.
+    - pymongo: Para acompanhar o progresso dos fragmentos.
+    - Dados_Climaticos.publicacao: Para publicar a coleta fragmentada da mesma forma que a pipeline.
     - os: Para manipulação de caminhos de diretório.
 
 Funções:
-    - verificar_execucao_spider(spider='botdadosclimaticos'): Verifica se a spider está em execução.
-    - executar_spider(): Executa a spider no diretório correspondente.
+    - proxima_execucao(agora): Calcula o horário da próxima execução dentro da janela de coleta (ver agenda_coleta.py).
+    - adquirir_trava(): Trava o arquivo de trava com flock, impedindo execuções sobrepostas.
+    - liberar_trava(): Fecha o arquivo travado; a trava é liberada quando nenhum processo o mantém aberto.
+    - descritores_herdados(): Retorna o descritor do arquivo travado, repassado aos processos da spider.
+    - executar_spider(): Executa a spider no diretório correspondente e aguarda o seu término.
+    - executar_spider_fragmentado(fragmentos=FRAGMENTOS_SPIDER): Divide as cidades em fragmentos, executa um processo por fragmento e publica a coleta.
+    - reportar_progresso(db, processos): Mostra quantos itens cada fragmento já gravou e retorna os registros de controle dos fragmentos.
+    - arquivo_relatorio(fragmento=None): Retorna o caminho do relatório de telemetria da spider ou de um fragmento.
+    - liberar_relatorio(arquivo): Remove o relatório de uma execução anterior antes de iniciar a spider.
+    - ler_relatorios(fragmentos=FRAGMENTOS_SPIDER): Lê os relatórios de telemetria gravados pela última execução.
+    - registrar_execucao(inicio, fim, codigo_saida, relatorios=()): Acrescenta uma execução e a sua telemetria ao histórico.
+    - ler_historico(limite=None): Retorna as execuções registradas no histórico.
+    - tendencia_etapas(limite=None): Resume, por execução, os itens por segundo e o tempo médio de cada etapa.
+    - mostrar_tendencia(limite=24): Mostra a tendência das últimas execuções.
     - main(): Função principal que controla o agendamento da spider.
 
 Configuração:
-    - Certifique-se de ter a biblioteca Schedule e Psutil instalada e configurada corretamente.
+    - Certifique-se de ter a biblioteca Pymongo instalada e configurada corretamente.
+    - FRAGMENTOS_SPIDER (variável de ambiente, padrão 1): Número de processos da spider executados em paralelo.
+      Com mais de um fragmento, cada processo coleta uma parte dos códigos IBGE e grava na mesma coleção
+      temporária; a coleta só é publicada quando todos os processos terminam com sucesso (código 0 e motivo
+      'finished' registrado pela pipeline) e a coleta tem o volume mínimo de publicacao.volume_suficiente. Caso
+      contrário, a coleção temporária é descartada. O histórico é mantido por HISTORICO_RETENCAO_DIAS dias, lido
+      das configurações do projeto Scrapy (Dados_Climaticos/settings.py), como na pipeline.
+    - HORA_INICIO e HORA_FIM (agenda_coleta.py): A janela de coleta. A spider é executada a cada hora cheia, de
+      HORA_INICIO até HORA_FIM, inclusive (14 execuções por dia com 7 e 20).
+    - ARQUIVO_TRAVA: Arquivo travado com flock (trava exclusiva do sistema operacional) durante uma execução.
+      Enquanto a trava existir, nenhuma outra execução é iniciada, mesmo por outra instância deste script ou pelo
+      migrar_previsoes.py. O descritor travado é herdado pelos processos da spider, portanto a trava dura até o fim
+      da coleta mesmo que o agendador seja encerrado, e o sistema a libera quando todos esses processos terminam;
+      não há trava órfã a ser detectada. O arquivo guarda o PID do agendador apenas para consulta.
+    - ARQUIVO_HISTORICO: Arquivo JSON Lines com o início, o fim, a duração e o código de saída de cada execução,
+      além dos relatórios de telemetria da spider (ver Dados_Climaticos/telemetria.py). No histórico, as falhas de
+      cada relatório são resumidas à lista das cidades que falharam; o relatório completo da última execução
+      permanece em ARQUIVO_RELATORIO.
 
 Uso:
     - Certifique-se de que a spider Scrapy 'botdadosclimaticos' está definida e pronta para ser executada.
     - Execute este script Python para agendar e controlar a execução da spider de coleta de dados climáticos.
+    - 'python executando_spider.py --tendencia [N]' mostra os itens por segundo e o tempo médio de cada etapa
+      nas últimas N execuções (padrão 24), sem iniciar o agendamento.
     - A execução da spider é agendada para ocorrer todos os dias das 7h às 20h, com intervalos de 1 hora dentro desse período.
-    - O script também pausa a execução fora desse horário para economizar recursos da máquina.
+    - Fora desse horário o script dorme até a próxima janela, sem consumir recursos da máquina.
+    - Se uma execução ultrapassar a hora seguinte, os horários perdidos são ignorados e a próxima execução
+      acontece na hora cheia seguinte ao término.
 
 Nota:
     - Ajuste as configurações de horário e caminhos de diretório conforme necessário para atender aos requisitos do seu projeto.
 
 """
-from datetime import datetime, time, timedelta
-from threading import Thread
+from datetime import datetime
 from time import sleep
-import schedule
-import psutil
+from pymongo import MongoClient
+from agenda_coleta import HORA_INICIO, HORA_FIM, CAMINHO_SPIDER, proxima_execucao
+from Dados_Climaticos.publicacao import (COLECAO_PREVISAO, COLECAO_STAGING, COLECAO_CONTROLE, descartar_coleta,
+                                         publicar_coleta, volume_suficiente)
+from Dados_Climaticos.settings import HISTORICO_RETENCAO_DIAS
+import subprocess
+import fcntl
+import json
+import sys
 import os
 
-def verificar_execucao_spider(spider='botdadosclimaticos'):
-    for processo in psutil.process_iter(attrs=['pid','name','cmdline']):
-        try:
-            processo_cmdline = processo.info['cmdline']
-            if processo_cmdline and spider in ''.join(processo_cmdline):
-                return True
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    return False
+FRAGMENTOS_SPIDER = int(os.environ.get('FRAGMENTOS_SPIDER', 1))
+INTERVALO_PROGRESSO = 30
+ARQUIVO_TRAVA = os.path.join(CAMINHO_SPIDER, 'spider.lock')
+ARQUIVO_HISTORICO = os.path.join(CAMINHO_SPIDER, 'historico_execucoes.jsonl')
+ARQUIVO_RELATORIO = os.path.join(CAMINHO_SPIDER, 'relatorio_coleta.json')
+MONGO_URI = 'mongodb://localhost:27017/'
+MONGO_DATABASE = 'Dados_Climaticos'
+
+trava = None
+
+def adquirir_trava():
+    global trava
+    arquivo = open(ARQUIVO_TRAVA, 'a+')
+    try:
+        fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        arquivo.close()
+        return False
+    arquivo.seek(0)
+    arquivo.truncate()
+    arquivo.write(str(os.getpid()))
+    arquivo.flush()
+    trava = arquivo
+    return True
+
+def liberar_trava():
+    global trava
+    if trava is None:
+        return
+    trava.close()
+    trava = None
+
+def descritores_herdados():
+    return (trava.fileno(),) if trava is not None else ()
+
+def arquivo_relatorio(fragmento=None):
+    if fragmento is None:
+        return ARQUIVO_RELATORIO
+    return ARQUIVO_RELATORIO.replace('.json', f'_fragmento_{fragmento}.json')
 
 def executar_spider():
-    caminho_spider = os.path.join(os.getcwd().replace('\\','/') + '/Dados_Climaticos')
-    func = Thread(target=lambda: os.system(f'cd {caminho_spider} && scrapy crawl botdadosclimaticos'),daemon=True)
-    func.start()
+    if FRAGMENTOS_SPIDER > 1:
+        return executar_spider_fragmentado()
+    liberar_relatorio(arquivo_relatorio())
+    return subprocess.run(['scrapy', 'crawl', 'botdadosclimaticos', '-s', f'TELEMETRIA_ARQUIVO={arquivo_relatorio()}'],
+                          cwd=CAMINHO_SPIDER, pass_fds=descritores_herdados()).returncode
+
+def executar_spider_fragmentado(fragmentos=FRAGMENTOS_SPIDER):
+    cliente = MongoClient(MONGO_URI)
+    try:
+        db = cliente[MONGO_DATABASE]
+        db[COLECAO_STAGING].drop()
+        db[COLECAO_CONTROLE].delete_many({'_id': {'$regex': f'^{COLECAO_PREVISAO}_fragmento_'}})
+        for fragmento in range(fragmentos):
+            liberar_relatorio(arquivo_relatorio(fragmento))
+        processos = [
+            subprocess.Popen(
+                ['scrapy', 'crawl', 'botdadosclimaticos',
+                 '-a', f'fragmento={fragmento}', '-a', f'fragmentos={fragmentos}',
+                 '-s', 'MONGO_PUBLICAR=False', '-s', f'TELEMETRIA_ARQUIVO={arquivo_relatorio(fragmento)}'],
+                cwd=CAMINHO_SPIDER, pass_fds=descritores_herdados())
+            for fragmento in range(fragmentos)]
+        while any(processo.poll() is None for processo in processos):
+            sleep(INTERVALO_PROGRESSO)
+            reportar_progresso(db, processos)
+        registros = reportar_progresso(db, processos)
+        falhas = [fragmento for fragmento, processo in enumerate(processos)
+                  if processo.returncode != 0 or registros.get(fragmento, {}).get('motivo') != 'finished']
+        if falhas:
+            print(f'Fragmentos {falhas} falharam ou foram interrompidos; a coleta não foi publicada.')
+            descartar_coleta(db)
+            return 1
+        if not volume_suficiente(db):
+            print('A coleta dos fragmentos tem menos documentos que o mínimo em relação à coleta publicada; '
+                  'a coleção publicada não foi alterada.')
+            descartar_coleta(db)
+            return 1
+        if not publicar_coleta(db, retencao_dias=HISTORICO_RETENCAO_DIAS):
+            print('Nenhum dado coletado pelos fragmentos; a coleção publicada não foi alterada.')
+        return 0
+    finally:
+        cliente.close()
+
+def reportar_progresso(db, processos):
+    registros = {
+        registro['_id']: registro
+        for registro in db[COLECAO_CONTROLE].find({'_id': {'$regex': f'^{COLECAO_PREVISAO}_fragmento_'}})}
+    registros = {fragmento: registros.get(f'{COLECAO_PREVISAO}_fragmento_{fragmento}', {}) for fragmento in range(len(processos))}
+    for fragmento, processo in enumerate(processos):
+        estado = 'em execução' if processo.poll() is None else f'finalizado ({processo.returncode})'
+        print(f"Fragmento {fragmento + 1}/{len(processos)}: {registros[fragmento].get('itens', 0)} itens, {estado}")
+    return registros
+
+def liberar_relatorio(arquivo):
+    try:
+        os.remove(arquivo)
+    except FileNotFoundError:
+        pass
+
+def ler_relatorios(fragmentos=FRAGMENTOS_SPIDER):
+    arquivos = [arquivo_relatorio()] if fragmentos <= 1 else [arquivo_relatorio(fragmento) for fragmento in range(fragmentos)]
+    relatorios = []
+    for arquivo in arquivos:
+        try:
+            with open(arquivo, 'r', encoding='UTF-8') as relatorio:
+                relatorios.append(json.load(relatorio))
+        except (FileNotFoundError, ValueError):
+            continue
+    return relatorios
+
+def registrar_execucao(inicio, fim, codigo_saida, relatorios=()):
+    telemetria = []
+    for relatorio in relatorios:
+        falhas = relatorio['falhas']
+        telemetria.append(dict(relatorio, falhas={
+            'total': falhas['total'], 'por_etapa': falhas['por_etapa'], 'cidades': sorted(falhas['por_cidade'])}))
+    duracao = (fim - inicio).total_seconds()
+    itens = sum(relatorio['itens'] for relatorio in telemetria)
+    execucao = {
+        'inicio': inicio.isoformat(timespec='seconds'),
+        'fim': fim.isoformat(timespec='seconds'),
+        'duracao_segundos': round(duracao, 1),
+        'codigo_saida': codigo_saida,
+        'fragmentos': FRAGMENTOS_SPIDER,
+        'itens': itens,
+        'itens_por_segundo': round(itens / duracao, 2) if duracao else 0,
+        'telemetria': telemetria
+    }
+    with open(ARQUIVO_HISTORICO, 'a', encoding='UTF-8') as arquivo:
+        arquivo.write(json.dumps(execucao) + '\n')
+    return execucao
+
+def ler_historico(limite=None):
+    try:
+        with open(ARQUIVO_HISTORICO, 'r', encoding='UTF-8') as arquivo:
+            execucoes = [json.loads(linha) for linha in arquivo if linha.strip()]
+    except FileNotFoundError:
+        return []
+    return execucoes[-limite:] if limite else execucoes
+
+def tendencia_etapas(limite=None):
+    tendencia = []
+    for execucao in ler_historico(limite):
+        etapas = {}
+        for relatorio in execucao.get('telemetria', []):
+            for etapa, resumo in relatorio['etapas'].items():
+                contagem, total = etapas.get(etapa, (0, 0))
+                etapas[etapa] = (contagem + resumo['contagem'], total + resumo['total_segundos'])
+        tendencia.append({
+            'inicio': execucao['inicio'],
+            'duracao_segundos': execucao['duracao_segundos'],
+            'itens_por_segundo': execucao.get('itens_por_segundo'),
+            'cidades_com_falha': sum(len(relatorio['falhas']['cidades']) for relatorio in execucao.get('telemetria', [])),
+            'media_ms': {etapa: round(total / contagem * 1000, 2) for etapa, (contagem, total) in sorted(etapas.items())}
+        })
+    return tendencia
+
+def mostrar_tendencia(limite=24):
+    for execucao in tendencia_etapas(limite):
+        etapas = ', '.join(f'{etapa} {media:.0f}ms' for etapa, media in execucao['media_ms'].items())
+        print(f"{execucao['inicio']}: {execucao['duracao_segundos']}s, {execucao['itens_por_segundo']} itens/s, "
+              f"{execucao['cidades_com_falha']} cidades com falha; {etapas or 'sem telemetria'}")
 
 def main():
-    agenda = schedule.Scheduler()
     while True:
-        
-        iniciar_execucao = time(7)
-        finalizar_execucao = time(20)
-        hora_atual = time(datetime.now().hour)
-
-        agenda.run_pending()
-        sleep(1)
-        
-        if not verificar_execucao_spider():
-            eventos = agenda.get_jobs()
-            if not eventos:
-                agenda.every().day.at('07:00').do(executar_spider)
-
-            elif iniciar_execucao < hora_atual < finalizar_execucao:
-                if not [True for evento in eventos if evento.unit == 'hours']:
-                    agenda.every(1).hour.do(executar_spider)
-                    print(agenda.get_jobs())
-                    sleep(3420)
-
-            elif hora_atual >= finalizar_execucao:
-                if [True for evento in eventos if evento.unit == 'hours']:
-                    agenda.cancel_job([evento for evento in eventos if evento.unit == 'hours'][0])
-                elif [True for evento in eventos if evento.unit == 'days']:
-                    evento_diario = [evento.next_run for evento in eventos if evento.unit == 'days'][0]
-                    tempo_evento = timedelta(days=evento_diario.day, hours=evento_diario.hour, minutes=evento_diario.minute, seconds=evento_diario.second)
-                    horario_atual = timedelta(days=datetime.now().day, hours=datetime.now().hour, minutes=datetime.now().minute, seconds=datetime.now().second)
-                    tempo_restante = (tempo_evento - horario_atual).seconds - 180
-                    sleep(tempo_restante)
-        else:
-            eventos = agenda.get_jobs()
-            print(agenda.get_jobs())
-            if hora_atual >= finalizar_execucao:
-                if [True for evento in eventos if evento.unit == 'hours']:
-                    agenda.cancel_job([evento for evento in eventos if evento.unit == 'hours'][0])
-            elif [True for evento in eventos if evento.unit == 'hours']:
-                agenda.cancel_job([evento for evento in eventos if evento.unit == 'hours'][0])
+        proxima = proxima_execucao(datetime.now())
+        print(f'Próxima execução da spider: {proxima:%d/%m/%Y %H:%M}')
+        espera = (proxima - datetime.now()).total_seconds()
+        if espera > 0:
+            sleep(espera)
+
+        if not adquirir_trava():
+            print('A spider já está em execução; este horário foi ignorado.')
+            continue
+        inicio = datetime.now()
+        try:
+            codigo_saida = executar_spider()
+        finally:
+            liberar_trava()
+        execucao = registrar_execucao(inicio, datetime.now(), codigo_saida, ler_relatorios())
+        print(f"Execução finalizada em {execucao['duracao_segundos']}s (código {codigo_saida}), "
+              f"{execucao['itens']} itens ({execucao['itens_por_segundo']} itens/s).")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == '--tendencia':
+        mostrar_tendencia(int(sys.argv[2]) if len(sys.argv) > 2 else 24)
+    else:
+        main()
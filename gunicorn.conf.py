@@ -0,0 +1,51 @@
+"""
+Configuração do Gunicorn para Executar a API em Produção
+
+O servidor de desenvolvimento do Flask ('python api_clima.py') atende a um processo só e com o recarregador do
+modo debug. Este arquivo, lido automaticamente pelo Gunicorn quando executado na raiz do projeto, inicia N workers
+a partir de uma aplicação pré-carregada no processo mestre, de forma que as requisições sejam distribuídas entre
+todos os núcleos da máquina.
+
+Configuração (variáveis de ambiente):
+    - API_ENDERECO: Endereço e porta em que o servidor escuta (padrão 0.0.0.0:5000).
+    - API_WORKERS: Número de processos (padrão 2 x núcleos + 1).
+    - API_THREADS: Número de threads por processo (padrão 1).
+    - API_TIMEOUT: Tempo máximo, em segundos, de uma requisição antes de o worker ser reiniciado (padrão 30).
+    - API_KEEPALIVE: Tempo, em segundos, em que uma conexão ociosa é mantida aberta (padrão 5).
+    - API_MAX_REQUISICOES: Reinicia cada worker após esse número de requisições, 0 desativa (padrão 0).
+    - Os pools de conexão do MongoDB e do SQLAlchemy são configurados em conexao_db.py.
+    - PROMETHEUS_MULTIPROC_DIR: Diretório em que os workers gravam as métricas de /metrics. Se METRICAS_ATIVAS não
+      for 0 e a variável não estiver definida, um diretório temporário é criado a cada inicialização.
+
+Funções:
+    - post_fork(server, worker): Descarta no worker as conexões herdadas do processo mestre.
+    - child_exit(server, worker): Descarta as métricas em memória compartilhada de um worker encerrado.
+
+Uso:
+    gunicorn
+"""
+from multiprocessing import cpu_count
+import os
+import tempfile
+
+if int(os.environ.get('METRICAS_ATIVAS', 1)) and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='metricas_api_')
+
+wsgi_app = 'api_clima:app'
+bind = os.environ.get('API_ENDERECO', '0.0.0.0:5000')
+workers = int(os.environ.get('API_WORKERS', cpu_count() * 2 + 1))
+threads = int(os.environ.get('API_THREADS', 1))
+timeout = int(os.environ.get('API_TIMEOUT', 30))
+keepalive = int(os.environ.get('API_KEEPALIVE', 5))
+max_requests = int(os.environ.get('API_MAX_REQUISICOES', 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+
+def post_fork(server, worker):
+    from conexao_db import reiniciar_conexoes
+    reiniciar_conexoes()
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
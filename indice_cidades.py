@@ -0,0 +1,170 @@
+"""
+Índice em Memória dos Nomes das Cidades
+
+Este módulo mantém um índice normalizado dos nomes dos municípios presentes na coleta, usado pela API para
+resolver o nome informado pelo cliente para o nome gravado no MongoDB e para sugerir cidades a partir de um prefixo.
+
+A normalização remove acentos, ignora maiúsculas e minúsculas e trata hífens, apóstrofos e espaços repetidos como
+um único espaço. Assim "florianopolis", "FLORIANÓPOLIS" e "Florianópolis" resolvem para a mesma cidade.
+Quando o mesmo nome existe em mais de um estado, a consulta pode indicar a UF: "Bom Jesus-PI", "bom jesus, pi"
+ou "Bom Jesus/PI".
+
+Classes:
+    - IndiceCidades: Mapa do nome normalizado para o nome canônico e árvore de prefixos (trie) para sugestões.
+
+Funções:
+    - normalizar(nome): Retorna o nome sem acentos, em minúsculas e com separadores uniformes.
+
+Nota:
+    - O índice é reconstruído pela API a cada nova geração da coleta, a partir dos pares (cidade, UF) gravados
+      pela pipeline. Entre duas coletas todas as consultas são respondidas em memória.
+"""
+from threading import Lock
+import re
+import unicodedata
+
+SEPARADORES = re.compile(r"[\s\-'’`]+")
+SUFIXO_UF = re.compile(r'^(?P<nome>.+?)[\s,/\-]+(?P<uf>[a-z]{2})$')
+
+def normalizar(nome):
+    """
+    Normaliza o nome de uma cidade para comparação.
+
+    Parâmetros:
+        nome (str): O nome informado.
+
+    Retorna:
+        str: O nome sem acentos, em minúsculas e com os separadores substituídos por um espaço.
+    """
+    decomposto = unicodedata.normalize('NFKD', nome)
+    sem_acentos = ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+    return SEPARADORES.sub(' ', sem_acentos.casefold()).strip()
+
+
+class IndiceCidades:
+    """
+    Índice normalizado dos nomes das cidades.
+
+    Atributos:
+        geracao (int): A geração da coleta a partir da qual o índice foi construído.
+        maximo_sugestoes (int): Número máximo de sugestões guardadas em cada nó da árvore de prefixos.
+
+    Métodos:
+        precisa_atualizar(self, geracao): Verifica se o índice foi construído a partir de outra geração da coleta.
+        reconstruir(self, cidades, geracao): Reconstrói o índice a partir dos pares (cidade, UF).
+        resolver(self, consulta): Retorna o nome canônico da cidade consultada.
+        sugerir(self, prefixo, limite=10): Retorna as cidades cujo nome começa com o prefixo.
+        __len__(self): Retorna o número de cidades indexadas.
+    """
+
+    def __init__(self, maximo_sugestoes=20):
+        """
+        Inicializa um índice vazio.
+
+        Parâmetros:
+            maximo_sugestoes (int): Número máximo de sugestões guardadas em cada nó da árvore de prefixos.
+        """
+        self.geracao = None
+        self.maximo_sugestoes = maximo_sugestoes
+        self._por_nome = {}
+        self._raiz = {'filhos': {}, 'sugestoes': []}
+        self._quantidade = 0
+        self._construido = False
+        self._trava = Lock()
+
+    def __len__(self):
+        return self._quantidade
+
+    def precisa_atualizar(self, geracao):
+        """
+        Verifica se o índice precisa ser reconstruído.
+
+        Parâmetros:
+            geracao (int): A geração atual da coleta.
+
+        Retorna:
+            bool: True se o índice nunca foi construído ou foi construído a partir de outra geração.
+        """
+        return not self._construido or self.geracao != geracao
+
+    def reconstruir(self, cidades, geracao):
+        """
+        Reconstrói o índice. As estruturas novas substituem as antigas de uma só vez, sem bloquear as consultas.
+
+        Parâmetros:
+            cidades (iterable): Pares (cidade, uf) como gravados no MongoDB; a UF pode ser None em dados antigos.
+            geracao (int): A geração da coleta correspondente.
+        """
+        por_nome = {}
+        for cidade, uf in cidades:
+            if not cidade:
+                continue
+            entradas = por_nome.setdefault(normalizar(cidade), {})
+            entradas.setdefault(uf.upper() if uf else None, cidade)
+
+        raiz = {'filhos': {}, 'sugestoes': []}
+        ordenadas = sorted(
+            ((nome, cidade, uf) for nome, entradas in por_nome.items() for uf, cidade in entradas.items()),
+            key=lambda entrada: (entrada[0], entrada[2] or ''))
+        for nome, cidade, uf in ordenadas:
+            sugestao = {'cidade': cidade, 'uf': uf}
+            no = raiz
+            if len(no['sugestoes']) < self.maximo_sugestoes:
+                no['sugestoes'].append(sugestao)
+            for letra in nome:
+                no = no['filhos'].setdefault(letra, {'filhos': {}, 'sugestoes': []})
+                if len(no['sugestoes']) < self.maximo_sugestoes:
+                    no['sugestoes'].append(sugestao)
+
+        with self._trava:
+            self._por_nome = por_nome
+            self._raiz = raiz
+            self._quantidade = len(ordenadas)
+            self.geracao = geracao
+            self._construido = True
+
+    def resolver(self, consulta):
+        """
+        Resolve o nome consultado para o nome gravado no MongoDB.
+
+        Parâmetros:
+            consulta (str): O nome informado pelo cliente, opcionalmente seguido da UF.
+
+        Retorna:
+            tuple ou None: (cidade, uf), em que 'uf' é o estado da cidade quando ele é conhecido: o único estado
+            em que o nome existe ou o estado indicado na consulta. 'uf' é None quando o nome existe em mais de um
+            estado e a consulta não indicou qual deles. Retorna None se a cidade não estiver no índice.
+        """
+        nome = normalizar(consulta)
+        entradas = self._por_nome.get(nome)
+        if entradas is not None:
+            if len(entradas) == 1:
+                return next(iter(entradas.items()))[::-1]
+            return next(iter(entradas.values())), None
+
+        sufixo = SUFIXO_UF.match(nome)
+        if sufixo is None:
+            return None
+        entradas = self._por_nome.get(sufixo.group('nome'))
+        uf = sufixo.group('uf').upper()
+        if entradas is None or uf not in entradas:
+            return None
+        return entradas[uf], uf
+
+    def sugerir(self, prefixo, limite=10):
+        """
+        Retorna as cidades cujo nome normalizado começa com o prefixo, em ordem alfabética.
+
+        Parâmetros:
+            prefixo (str): O início do nome.
+            limite (int): Número máximo de sugestões, até 'maximo_sugestoes'.
+
+        Retorna:
+            list: Dicionários {'cidade': ..., 'uf': ...}.
+        """
+        no = self._raiz
+        for letra in normalizar(prefixo):
+            no = no['filhos'].get(letra)
+            if no is None:
+                return []
+        return no['sugestoes'][:limite]
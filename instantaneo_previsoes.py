@@ -0,0 +1,296 @@
+"""
+Instantâneo Colunar das Previsões do Tempo
+
+Este módulo mantém em memória uma cópia colunar (NumPy) de toda a coleção 'Previsao_do_tempo', usada pela API para
+responder às consultas analíticas nacionais e estaduais (as cidades mais quentes, a umidade média por estado, as
+cidades com chuva) com operações vetorizadas, sem percorrer documento por documento nem consultar o MongoDB.
+
+Cada previsão é uma linha e cada campo é um array:
+    - cidade, uf, condicao, vento: códigos inteiros que apontam para as tabelas de valores distintos (colunas
+      categóricas); o filtro por condição compara apenas os poucos valores distintos e depois os códigos.
+    - data: datetime64[D].
+    - tmin, tmax, umin, umax: int16; tmed, umed: float32.
+
+Classes:
+    - InstantaneoPrevisoes: As colunas da coleta atual e as consultas de ranking, filtro e agregação por estado.
+
+Funções:
+    - data_da_consulta(texto): Converte a data informada na consulta ('dd/mm/aaaa' ou 'aaaa-mm-dd') em date.
+    - faixas_da_consulta(parametros): Lê os limites '<campo>_min' e '<campo>_max' dos parâmetros da consulta.
+
+Nota:
+    - O instantâneo é reconstruído pela API a cada nova geração da coleta, como o índice de cidades. As colunas novas
+      substituem as antigas de uma só vez; as consultas em andamento continuam usando as colunas anteriores.
+    - Com cerca de 5.600 municípios e 7 dias, o instantâneo ocupa pouco mais de 1 MB por processo.
+"""
+from datetime import datetime
+from threading import Lock
+import numpy as np
+from indice_cidades import normalizar
+
+CAMPOS_NUMERICOS = ('tmin', 'tmax', 'tmed', 'umin', 'umax', 'umed')
+CAMPOS_CATEGORICOS = ('c', 'uf', 'cm', 'v')
+VALORES_AUSENTES = dict.fromkeys(CAMPOS_NUMERICOS, 0) | {'d': None}
+TIPOS = {'tmin': np.int16, 'tmax': np.int16, 'tmed': np.float32, 'umin': np.int16, 'umax': np.int16, 'umed': np.float32}
+
+def _categorias(valores):
+    """ Retorna a tabela de valores distintos e o código de cada valor. """
+    tabela, codigos = np.unique(np.array(valores, dtype=object), return_inverse=True)
+    return tabela, codigos.astype(np.int32)
+
+def _valor(valor):
+    """ Converte um escalar do NumPy em int ou float do Python, arredondando as médias para uma casa decimal. """
+    return int(valor) if isinstance(valor, np.integer) else round(float(valor), 1)
+
+
+class InstantaneoPrevisoes:
+    """
+    Cópia colunar em memória da coleta atual.
+
+    Atributos:
+        geracao (int): A geração da coleta a partir da qual o instantâneo foi construído.
+
+    Métodos:
+        precisa_atualizar(self, geracao): Verifica se o instantâneo foi construído a partir de outra geração da coleta.
+        reconstruir(self, documentos, geracao): Reconstrói as colunas a partir dos documentos tipados.
+        datas(self): Retorna as datas presentes na coleta.
+        ranking(self, campo, quantidade=10, crescente=False, data=None, uf=None): As N cidades com os maiores (ou
+            menores) valores do campo.
+        filtrar(self, data=None, uf=None, condicao=None, vento=None, faixas=None, limite=None): As cidades que atendem
+            a todos os critérios.
+        agregar_por_uf(self, campo, data=None): Média, mínimo e máximo do campo em cada estado.
+        __len__(self): Retorna o número de previsões no instantâneo.
+    """
+
+    def __init__(self):
+        """ Inicializa um instantâneo vazio. """
+        self.geracao = None
+        self._colunas = None
+        self._trava = Lock()
+
+    def __len__(self):
+        colunas = self._colunas
+        return len(colunas['data']) if colunas else 0
+
+    def precisa_atualizar(self, geracao):
+        """
+        Verifica se o instantâneo precisa ser reconstruído.
+
+        Parâmetros:
+            geracao (int): A geração atual da coleta.
+
+        Retorna:
+            bool: True se o instantâneo nunca foi construído ou foi construído a partir de outra geração.
+        """
+        return self._colunas is None or self.geracao != geracao
+
+    def reconstruir(self, documentos, geracao):
+        """
+        Reconstrói as colunas a partir dos documentos da coleção 'Previsao_do_tempo'.
+
+        Parâmetros:
+            documentos (iterable): Os documentos tipados (ver esquema_previsao.py); documentos no formato antigo são ignorados.
+            geracao (int): A geração da coleta correspondente.
+        """
+        valores = {campo: [] for campo in CAMPOS_CATEGORICOS + CAMPOS_NUMERICOS + ('d',)}
+        for documento in documentos:
+            if 'c' not in documento:
+                continue
+            for campo, lista in valores.items():
+                lista.append(documento.get(campo, VALORES_AUSENTES.get(campo, '')))
+
+        colunas = {'data': np.array(valores['d'], dtype='datetime64[D]')}
+        for campo in CAMPOS_NUMERICOS:
+            colunas[campo] = np.array(valores[campo], dtype=TIPOS[campo])
+        for campo in CAMPOS_CATEGORICOS:
+            colunas[f'{campo}_tabela'], colunas[campo] = _categorias(valores[campo])
+        colunas['cm_normalizada'] = np.array([normalizar(condicao) for condicao in colunas['cm_tabela']], dtype=object)
+        colunas['v_normalizado'] = np.array([normalizar(vento) for vento in colunas['v_tabela']], dtype=object)
+        colunas['datas'] = np.unique(colunas['data'])
+
+        with self._trava:
+            self._colunas = colunas
+            self.geracao = geracao
+
+    def datas(self):
+        """
+        Retorna as datas presentes na coleta.
+
+        Retorna:
+            list: As datas, em ordem, como objetos datetime.date.
+        """
+        colunas = self._colunas
+        return [] if colunas is None else colunas['datas'].astype(object).tolist()
+
+    def _selecao(self, colunas, data, uf):
+        """ Retorna a máscara das linhas da data (por padrão, a primeira da coleta) e, se informada, da UF. """
+        if data is None:
+            data = colunas['datas'][0] if len(colunas['datas']) else None
+        mascara = colunas['data'] == np.datetime64(data, 'D')
+        if uf:
+            codigo = np.searchsorted(colunas['uf_tabela'], uf.upper())
+            if codigo >= len(colunas['uf_tabela']) or colunas['uf_tabela'][codigo] != uf.upper():
+                return np.zeros_like(mascara)
+            mascara &= colunas['uf'] == codigo
+        return mascara
+
+    def _linhas(self, colunas, indices):
+        """ Monta os dicionários da resposta para as linhas indicadas. """
+        data = colunas['data'][indices].astype(object)
+        cidade = colunas['c_tabela'][colunas['c'][indices]]
+        uf = colunas['uf_tabela'][colunas['uf'][indices]]
+        condicao = colunas['cm_tabela'][colunas['cm'][indices]]
+        vento = colunas['v_tabela'][colunas['v'][indices]]
+        numericos = {campo: colunas[campo][indices] for campo in CAMPOS_NUMERICOS}
+        return [
+            dict({
+                'cidade': cidade[posicao],
+                'uf': uf[posicao],
+                'data': f'{data[posicao]:%d/%m/%Y}',
+                'condicao': condicao[posicao],
+                'vento': vento[posicao]
+            }, **{campo: _valor(valores[posicao]) for campo, valores in numericos.items()})
+            for posicao in range(len(indices))]
+
+    def ranking(self, campo, quantidade=10, crescente=False, data=None, uf=None):
+        """
+        Retorna as cidades com os maiores (ou menores) valores do campo.
+
+        A seleção usa np.argpartition, que encontra em tempo linear o valor do N-ésimo colocado; só as linhas até esse
+        valor são ordenadas. Os empates são desempatados pelo nome da cidade, inclusive no último lugar do ranking.
+
+        Parâmetros:
+            campo (str): Um dos CAMPOS_NUMERICOS, por exemplo 'tmax'.
+            quantidade (int): Número de cidades.
+            crescente (bool): Se True, retorna os menores valores em vez dos maiores.
+            data (date): A data da previsão; por padrão, a primeira data da coleta.
+            uf (str): Restringe o ranking a um estado.
+
+        Retorna:
+            list: As previsões das cidades, do primeiro ao último colocado.
+        """
+        colunas = self._colunas
+        if colunas is None:
+            return []
+        indices = np.flatnonzero(self._selecao(colunas, data, uf))
+        valores = colunas[campo][indices].astype(np.float64)
+        if not crescente:
+            valores = -valores
+        quantidade = min(quantidade, len(indices))
+        if quantidade <= 0:
+            return []
+        corte = valores[np.argpartition(valores, quantidade - 1)[quantidade - 1]]
+        primeiros = np.flatnonzero(valores <= corte)
+        primeiros = primeiros[np.lexsort((colunas['c'][indices[primeiros]], valores[primeiros]))][:quantidade]
+        return self._linhas(colunas, indices[primeiros])
+
+    def filtrar(self, data=None, uf=None, condicao=None, vento=None, faixas=None, limite=None):
+        """
+        Retorna as cidades que atendem a todos os critérios, em ordem alfabética.
+
+        Parâmetros:
+            data (date): A data da previsão; por padrão, a primeira data da coleta.
+            uf (str): Restringe o filtro a um estado.
+            condicao (str): Trecho da condição meteorológica, sem diferenciar acentos e maiúsculas (por exemplo 'chuva').
+            vento (str): Trecho da descrição do vento (por exemplo 'forte').
+            faixas (dict): {campo: (minimo, maximo)}; qualquer um dos limites pode ser None.
+            limite (int): Número máximo de cidades na lista retornada.
+
+        Retorna:
+            tuple: (total de cidades encontradas, lista com as previsões de até 'limite' cidades).
+        """
+        colunas = self._colunas
+        if colunas is None:
+            return 0, []
+        mascara = self._selecao(colunas, data, uf)
+        for campo, trecho in (('cm', condicao), ('v', vento)):
+            if trecho:
+                tabela = colunas['cm_normalizada'] if campo == 'cm' else colunas['v_normalizado']
+                trecho = normalizar(trecho)
+                codigos = np.flatnonzero([trecho in valor for valor in tabela])
+                mascara &= np.isin(colunas[campo], codigos)
+        for campo, (minimo, maximo) in (faixas or {}).items():
+            if minimo is not None:
+                mascara &= colunas[campo] >= minimo
+            if maximo is not None:
+                mascara &= colunas[campo] <= maximo
+        indices = np.flatnonzero(mascara)
+        indices = indices[np.argsort(colunas['c'][indices], kind='stable')]
+        return len(indices), self._linhas(colunas, indices[:limite])
+
+    def agregar_por_uf(self, campo, data=None):
+        """
+        Calcula a média, o mínimo e o máximo do campo em cada estado.
+
+        As linhas são ordenadas pelo código da UF e cada estado é reduzido de uma vez com np.add.reduceat,
+        np.minimum.reduceat e np.maximum.reduceat.
+
+        Parâmetros:
+            campo (str): Um dos CAMPOS_NUMERICOS, por exemplo 'umed'.
+            data (date): A data da previsão; por padrão, a primeira data da coleta.
+
+        Retorna:
+            dict: {uf: {'media': ..., 'minimo': ..., 'maximo': ..., 'cidades': ...}}.
+        """
+        colunas = self._colunas
+        if colunas is None:
+            return {}
+        indices = np.flatnonzero(self._selecao(colunas, data, None))
+        if not len(indices):
+            return {}
+        ufs = colunas['uf'][indices]
+        ordem = np.argsort(ufs, kind='stable')
+        ufs = ufs[ordem]
+        valores = colunas[campo][indices[ordem]].astype(np.float64)
+        inicios = np.flatnonzero(np.r_[True, ufs[1:] != ufs[:-1]])
+        contagens = np.diff(np.r_[inicios, len(ufs)])
+        medias = np.add.reduceat(valores, inicios) / contagens
+        minimos = np.minimum.reduceat(valores, inicios)
+        maximos = np.maximum.reduceat(valores, inicios)
+        return {
+            colunas['uf_tabela'][ufs[inicio]]: {
+                'media': round(float(media), 1),
+                'minimo': _valor(colunas[campo].dtype.type(minimo)),
+                'maximo': _valor(colunas[campo].dtype.type(maximo)),
+                'cidades': int(contagem)
+            }
+            for inicio, media, minimo, maximo, contagem in zip(inicios, medias, minimos, maximos, contagens)}
+
+def data_da_consulta(texto):
+    """
+    Converte a data informada na consulta ('dd/mm/aaaa' ou 'aaaa-mm-dd') em date.
+
+    Retorna:
+        date ou None: None se o texto estiver vazio.
+
+    Exceções:
+        ValueError: Se o texto não estiver em nenhum dos formatos.
+    """
+    if not texto:
+        return None
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f'Data inválida: {texto}')
+
+def faixas_da_consulta(parametros):
+    """
+    Lê os limites dos campos numéricos informados na consulta, por exemplo ?tmax_min=30&umed_max=40.
+
+    Parâmetros:
+        parametros (Mapping): Os parâmetros da query string.
+
+    Retorna:
+        dict: {campo: (minimo, maximo)}, apenas para os campos com algum limite informado.
+
+    Exceções:
+        ValueError: Se algum limite não for um número.
+    """
+    faixas = {}
+    for campo in CAMPOS_NUMERICOS:
+        minimo, maximo = parametros.get(f'{campo}_min'), parametros.get(f'{campo}_max')
+        if minimo or maximo:
+            faixas[campo] = (float(minimo) if minimo else None, float(maximo) if maximo else None)
+    return faixas
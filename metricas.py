@@ -0,0 +1,192 @@
+"""
+Métricas de Desempenho da API no Formato do Prometheus
+
+Este módulo reúne a instrumentação das duas APIs e a geração do texto exposto na rota /metrics:
+    - api_requisicao_segundos: Histograma da latência de cada requisição, por rota (nome da função), método e status.
+    - api_etapa_segundos: Histograma das etapas da requisição: 'autenticacao' (validação da chave API em
+      verificar_chave), 'limite' (verificação do limite de taxa) e 'serializacao' (geração do JSON da resposta).
+    - mongo_comando_segundos / mongo_comando_falhas_total: Duração e falhas dos comandos do MongoDB, por comando e
+      coleção, obtidas pelo monitoramento de comandos do pymongo (também usado pelo Motor).
+    - sqlalchemy_consulta_segundos: Duração e quantidade das consultas ao banco de usuários, por operação (SELECT,
+      INSERT, UPDATE...), obtidas pelos eventos do SQLAlchemy.
+    - api_<fonte>_<estatistica>: As estatísticas dos caches (acertos, falhas, taxa_acerto, entradas) e do executor de
+      senhas (em_execucao, na_fila, concluidas, recusadas, espera_media), lidas no momento da coleta, com o rótulo pid.
+
+Classes:
+    - OuvinteMongo: Ouvinte de comandos do pymongo que alimenta os histogramas do MongoDB.
+    - ColetorEstatisticas: Coletor que expõe as estatísticas dos caches e do executor de senhas.
+    - ProvedorJSONMedido: Provedor JSON do Flask que mede o tempo do jsonify.
+
+Funções:
+    - configurar(ativas, motor_sqlalchemy=None): Ativa ou desativa a coleta e instrumenta o SQLAlchemy.
+    - etapa(nome): Gerenciador de contexto que mede uma etapa da requisição.
+    - observar_etapa(nome, segundos): Registra a duração de uma etapa medida fora de um bloco 'with'.
+    - observar_requisicao(rota, metodo, status, segundos): Registra a latência de uma requisição.
+    - registrar_estatisticas(nome, estatisticas): Registra uma fonte de estatísticas exposta em /metrics.
+    - gerar_metricas(): Retorna o corpo e o Content-Type da resposta de /metrics.
+
+Nota:
+    - As métricas são ativadas pela configuração METRICAS_ATIVAS de conexao_db.py. Desativadas, nenhum ouvinte é
+      registrado, as funções de medição não fazem nada e a rota /metrics responde 404.
+    - Com o Gunicorn, gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR: cada worker grava os seus histogramas em
+      arquivos desse diretório e /metrics soma os de todos os workers. As estatísticas dos caches e do executor são
+      locais a cada processo e mostram as do worker que atendeu a coleta, identificado pelo rótulo pid.
+"""
+from contextlib import contextmanager
+from time import perf_counter
+import os
+from flask.json.provider import DefaultJSONProvider
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from pymongo import monitoring
+from sqlalchemy import event
+
+BALDES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LATENCIA_REQUISICAO = Histogram(
+    'api_requisicao_segundos', 'Latência das requisições da API, por rota, método e status.',
+    ['rota', 'metodo', 'status'], buckets=BALDES)
+DURACAO_ETAPA = Histogram(
+    'api_etapa_segundos', 'Duração das etapas da requisição: autenticacao, limite e serializacao.',
+    ['etapa'], buckets=BALDES)
+DURACAO_MONGO = Histogram(
+    'mongo_comando_segundos', 'Duração dos comandos enviados ao MongoDB, por comando e coleção.',
+    ['comando', 'colecao'], buckets=BALDES)
+FALHAS_MONGO = Counter(
+    'mongo_comando_falhas', 'Comandos do MongoDB que terminaram com erro, por comando e coleção.',
+    ['comando', 'colecao'])
+DURACAO_SQL = Histogram(
+    'sqlalchemy_consulta_segundos', 'Duração das consultas ao banco de usuários, por operação.',
+    ['operacao'], buckets=BALDES)
+
+ativas = False
+_fontes = {}
+
+
+class OuvinteMongo(monitoring.CommandListener):
+    """
+    Ouvinte de comandos do pymongo. O tempo de cada comando é medido pelo próprio driver (duration_micros);
+    o evento de início só guarda a coleção, que não está nos eventos de conclusão.
+    """
+
+    def __init__(self):
+        self._colecoes = {}
+
+    def started(self, evento):
+        colecao = evento.command.get('collection' if evento.command_name == 'getMore' else evento.command_name)
+        self._colecoes[(evento.connection_id, evento.request_id)] = colecao if isinstance(colecao, str) else ''
+
+    def _concluido(self, evento):
+        colecao = self._colecoes.pop((evento.connection_id, evento.request_id), '')
+        DURACAO_MONGO.labels(evento.command_name, colecao).observe(evento.duration_micros / 1e6)
+        return colecao
+
+    def succeeded(self, evento):
+        self._concluido(evento)
+
+    def failed(self, evento):
+        FALHAS_MONGO.labels(evento.command_name, self._concluido(evento)).inc()
+
+ouvinte_mongo = OuvinteMongo()
+
+
+class ColetorEstatisticas:
+    """ Expõe, no momento da coleta, as estatísticas numéricas de cada fonte registrada. """
+
+    def collect(self):
+        pid = str(os.getpid())
+        for fonte, estatisticas in list(_fontes.items()):
+            for nome, valor in estatisticas().items():
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    metrica = GaugeMetricFamily(f'api_{fonte}_{nome}', f'{nome} de {fonte}.', labels=['pid'])
+                    metrica.add_metric([pid], valor)
+                    yield metrica
+
+coletor_estatisticas = ColetorEstatisticas()
+
+
+class ProvedorJSONMedido(DefaultJSONProvider):
+    """ Provedor JSON do Flask que registra o tempo de cada jsonify na etapa 'serializacao'. """
+
+    def response(self, *args, **kwargs):
+        with etapa('serializacao'):
+            return super().response(*args, **kwargs)
+
+
+def _antes_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    contexto._inicio_metricas = perf_counter()
+
+def _depois_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    inicio = getattr(contexto, '_inicio_metricas', None)
+    if inicio is not None:
+        operacao = instrucao.lstrip().split(None, 1)[0].upper() if instrucao.strip() else ''
+        DURACAO_SQL.labels(operacao).observe(perf_counter() - inicio)
+
+def configurar(ativar, motor_sqlalchemy=None):
+    """
+    Ativa ou desativa a coleta das métricas.
+
+    Parâmetros:
+        ativar (bool): Se True, as medições passam a ser registradas.
+        motor_sqlalchemy: A classe Engine (ou um motor específico) cujas consultas serão medidas.
+    """
+    global ativas
+    ativas = ativar
+    if ativar and motor_sqlalchemy is not None and not event.contains(motor_sqlalchemy, 'before_cursor_execute', _antes_da_consulta):
+        event.listen(motor_sqlalchemy, 'before_cursor_execute', _antes_da_consulta)
+        event.listen(motor_sqlalchemy, 'after_cursor_execute', _depois_da_consulta)
+    if ativar and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            REGISTRY.register(coletor_estatisticas)
+        except ValueError:
+            pass
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede o bloco como uma etapa da requisição.
+
+    Parâmetros:
+        nome (str): 'autenticacao', 'limite' ou 'serializacao'.
+    """
+    if not ativas:
+        yield
+        return
+    inicio = perf_counter()
+    try:
+        yield
+    finally:
+        DURACAO_ETAPA.labels(nome).observe(perf_counter() - inicio)
+
+def observar_etapa(nome, segundos):
+    if ativas:
+        DURACAO_ETAPA.labels(nome).observe(segundos)
+
+def observar_requisicao(rota, metodo, status, segundos):
+    if ativas:
+        LATENCIA_REQUISICAO.labels(rota, metodo, str(status)).observe(segundos)
+
+def registrar_estatisticas(nome, estatisticas):
+    """
+    Registra uma fonte de estatísticas exposta em /metrics.
+
+    Parâmetros:
+        nome (str): O prefixo das métricas, por exemplo 'cache_previsao'.
+        estatisticas (callable): Função sem parâmetros que retorna um dicionário, como CachePrevisao.estatisticas.
+    """
+    _fontes[nome] = estatisticas
+
+def gerar_metricas():
+    """
+    Gera o texto exposto na rota /metrics.
+
+    Retorna:
+        tuple: (corpo em bytes, Content-Type).
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        registro.register(coletor_estatisticas)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
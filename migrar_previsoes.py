@@ -0,0 +1,68 @@
+"""
+Migração das Previsões para o Formato Tipado
+
+Este script converte os documentos da coleção 'Previsao_do_tempo' gravados no formato antigo (campo 'cidade', data
+em texto e 'temperatura'/'umidade' como '23°C'/'70%') para o formato tipado de Dados_Climaticos/esquema_previsao.py.
+
+A coleta substitui a coleção inteira a cada execução, portanto depois da primeira coleta com a nova pipeline todos os
+documentos já estão no formato tipado. Este script só é necessário para que a API atenda os dados antigos até lá.
+
+Etapas:
+    1. Adquire o arquivo de trava do agendador, para não concorrer com uma coleta em andamento.
+    2. Copia a coleção publicada para a coleção temporária, convertendo os documentos antigos.
+    3. Publica a coleção temporária com publicacao.publicar_coleta, como ao final de uma coleta: os índices e as
+       respostas pré-renderizadas são recriados e a geração é incrementada, invalidando os caches da API.
+       Os dados migrados não são acrescentados ao histórico, pois não correspondem a uma nova coleta.
+
+Funções:
+    - migrar(db, tamanho_lote=1000): Converte e publica os documentos; retorna quantos foram convertidos.
+    - main(): Conecta ao MongoDB e executa a migração.
+
+Uso:
+    python migrar_previsoes.py
+
+Nota:
+    - O formato antigo guardava apenas a média da temperatura e da umidade, que é usada também como mínimo e máximo.
+"""
+from pymongo import MongoClient
+from executando_spider import MONGO_URI, MONGO_DATABASE, adquirir_trava, liberar_trava
+from Dados_Climaticos.publicacao import COLECAO_PREVISAO, COLECAO_STAGING, publicar_coleta
+from Dados_Climaticos.esquema_previsao import documento_legado, converter_documento_legado
+
+def migrar(db, tamanho_lote=1000):
+    if not db[COLECAO_PREVISAO].count_documents({'cidade': {'$exists': True}}, limit=1):
+        return 0
+    staging = db[COLECAO_STAGING]
+    staging.drop()
+    convertidos = 0
+    lote = []
+    for documento in db[COLECAO_PREVISAO].find({}, {'_id': 0}):
+        if documento_legado(documento):
+            documento = converter_documento_legado(documento)
+            convertidos += 1
+        lote.append(documento)
+        if len(lote) >= tamanho_lote:
+            staging.insert_many(lote, ordered=True)
+            lote = []
+    if lote:
+        staging.insert_many(lote, ordered=True)
+    publicar_coleta(db, arquivar=False)
+    return convertidos
+
+def main():
+    if not adquirir_trava():
+        print('A spider está em execução; tente novamente após o término da coleta.')
+        return
+    cliente = MongoClient(MONGO_URI)
+    try:
+        convertidos = migrar(cliente[MONGO_DATABASE])
+    finally:
+        cliente.close()
+        liberar_trava()
+    if convertidos:
+        print(f'{convertidos} documentos convertidos para o formato tipado e publicados.')
+    else:
+        print('Nenhum documento no formato antigo; nada foi alterado.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Teste de Carga das APIs de Previsão do Tempo
+
+Este script envia requisições simultâneas a uma ou mais instâncias da API (por exemplo, a API Flask de
+'api_clima.py' e a API ASGI de 'api_clima_async.py') e compara a vazão e as latências p50, p95 e p99.
+
+Com o parâmetro --login, cada alvo recebe também uma carga contínua de logins (bcrypt) durante a carga de leitura
+das previsões, e o resultado mostra a vazão de logins ao lado das latências das previsões. Assim é possível ver
+quanto uma rajada de logins afeta as demais rotas.
+
+Módulos Utilizados:
+    - requests: Para enviar as requisições HTTP.
+    - concurrent.futures: Para manter N requisições simultâneas.
+    - argparse: Para ler os parâmetros da linha de comando.
+
+Funções:
+    - percentil(valores, p): Retorna o percentil p de uma lista ordenada.
+    - executar_carga(url, chave_api, concorrencia, requisicoes, auth=None): Executa a carga contra uma URL (ou uma lista
+      de URLs e de chaves, usadas em rodízio) e retorna as métricas.
+    - executar_carga_login(url, credenciais, concorrencia, parar): Envia logins até que 'parar' seja sinalizado.
+    - url_de_login(url): Retorna a URL da rota /login do mesmo servidor.
+    - main(): Lê os parâmetros, executa a carga em cada alvo e imprime a comparação.
+
+Uso:
+    python teste_de_carga.py --chave <x-api-key> --concorrencia 64 --requisicoes 5000 \\
+        --alvo flask=http://localhost:5000/tempo/cidade/São Paulo \\
+        --alvo asgi=http://localhost:5001/tempo/cidade/São Paulo \\
+        --login davi:davi123 --concorrencia-login 8
+
+Nota:
+    - Para medir a API sem MongoDB nem rede, com dados gerados e comparação com um resultado de referência, use
+      'benchmark_api.py', que reutiliza as funções deste script.
+    - Cada chave API tem o limite de 200 requisições por dia por rota. Para testes de carga, use uma chave
+      dedicada e ajuste o limite nas duas APIs enquanto o teste é executado.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread, local
+from time import perf_counter
+from urllib.parse import urlsplit
+import requests
+
+_sessoes = local()
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, max(0, round(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+def _requisitar(url, cabecalhos, auth=None):
+    if not hasattr(_sessoes, 'sessao'):
+        _sessoes.sessao = requests.Session()
+    inicio = perf_counter()
+    try:
+        resposta = _sessoes.sessao.get(url, headers=cabecalhos, auth=auth, timeout=30)
+        sucesso = resposta.status_code < 400
+    except requests.RequestException:
+        sucesso = False
+    return perf_counter() - inicio, sucesso
+
+def executar_carga(url, chave_api, concorrencia, requisicoes, auth=None):
+    urls = [url] if isinstance(url, str) else url
+    chaves = [chave_api] if isinstance(chave_api, str) else (chave_api or [])
+
+    def requisitar(indice):
+        cabecalhos = {'Accept-Encoding': 'gzip'}
+        if chaves:
+            cabecalhos['x-api-key'] = chaves[indice % len(chaves)]
+        return _requisitar(urls[indice % len(urls)], cabecalhos, auth)
+
+    inicio = perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(requisitar, range(requisicoes)))
+    duracao = perf_counter() - inicio
+    latencias = sorted(latencia * 1000 for latencia, _ in resultados)
+    return {
+        'requisicoes': requisicoes,
+        'falhas': sum(1 for _, sucesso in resultados if not sucesso),
+        'vazao': requisicoes / duracao,
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95),
+        'p99': percentil(latencias, 99)
+    }
+
+def url_de_login(url):
+    partes = urlsplit(url)
+    return f'{partes.scheme}://{partes.netloc}/login'
+
+def executar_carga_login(url, credenciais, concorrencia, parar):
+    resultados = []
+
+    def enviar_logins():
+        while not parar.is_set():
+            resultados.append(_requisitar(url, {}, auth=credenciais))
+
+    inicio = perf_counter()
+    threads = [Thread(target=enviar_logins) for _ in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = perf_counter() - inicio
+    return {
+        'logins': len(resultados),
+        'falhas': sum(1 for _, sucesso in resultados if not sucesso),
+        'vazao': len(resultados) / duracao if duracao else 0.0
+    }
+
+def main():
+    parser = ArgumentParser(description='Compara a vazão e as latências de instâncias da API de previsão do tempo.')
+    parser.add_argument('--alvo', action='append', required=True, help='nome=url da rota a ser testada. Pode ser repetido.')
+    parser.add_argument('--chave', required=True, help='Chave API enviada no cabeçalho x-api-key.')
+    parser.add_argument('--concorrencia', type=int, default=32, help='Número de requisições simultâneas.')
+    parser.add_argument('--requisicoes', type=int, default=2000, help='Total de requisições por alvo.')
+    parser.add_argument('--login', help='usuario:senha enviados à rota /login durante a carga de previsões.')
+    parser.add_argument('--concorrencia-login', type=int, default=4, help='Número de logins simultâneos.')
+    argumentos = parser.parse_args()
+
+    colunas = f"{'alvo':<12}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}{'falhas':>9}"
+    print(colunas + (f"{'logins/s':>11}{'falhas login':>14}" if argumentos.login else ''))
+    for alvo in argumentos.alvo:
+        nome, _, url = alvo.partition('=')
+        if argumentos.login:
+            parar = Event()
+            carga_login = {}
+            thread_login = Thread(target=lambda: carga_login.update(executar_carga_login(
+                url_de_login(url), tuple(argumentos.login.split(':', 1)), argumentos.concorrencia_login, parar)))
+            thread_login.start()
+        try:
+            metricas = executar_carga(url, argumentos.chave, argumentos.concorrencia, argumentos.requisicoes)
+        finally:
+            if argumentos.login:
+                parar.set()
+                thread_login.join()
+        linha = (f"{nome:<12}{metricas['vazao']:>10.1f}{metricas['p50']:>12.2f}{metricas['p95']:>12.2f}"
+                 f"{metricas['p99']:>12.2f}{metricas['falhas']:>9}")
+        if argumentos.login:
+            linha += f"{carga_login['vazao']:>11.1f}{carga_login['falhas']:>14}"
+        print(linha)
+
+if __name__ == '__main__':
+    main()
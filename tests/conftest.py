@@ -0,0 +1,6 @@
+import os
+import sys
+
+CAMINHO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, CAMINHO_RAIZ)
@@ -0,0 +1,27 @@
+"""
+Testes da janela de horários da coleta usada pelo agendador e pelo Cache-Control da API.
+"""
+from datetime import datetime, timedelta
+
+from agenda_coleta import HORA_FIM, HORA_INICIO, proxima_execucao
+
+def test_janela_inclui_hora_fim():
+    agora = datetime(2024, 5, 10, 0, 0)
+    execucoes = []
+    while agora.day == 10:
+        execucao = proxima_execucao(agora)
+        if execucao.day != 10:
+            break
+        execucoes.append(execucao)
+        agora = execucao + timedelta(minutes=1)
+    assert [execucao.hour for execucao in execucoes] == list(range(HORA_INICIO, HORA_FIM + 1))
+    assert len(execucoes) == 14
+
+def test_hora_cheia_na_janela_e_a_propria_execucao():
+    assert proxima_execucao(datetime(2024, 5, 10, 20, 0)) == datetime(2024, 5, 10, 20, 0)
+    assert proxima_execucao(datetime(2024, 5, 10, 12, 15)) == datetime(2024, 5, 10, 13, 0)
+
+def test_fora_da_janela():
+    assert proxima_execucao(datetime(2024, 5, 10, 5, 40)) == datetime(2024, 5, 10, 7, 0)
+    assert proxima_execucao(datetime(2024, 5, 10, 20, 30)) == datetime(2024, 5, 11, 7, 0)
+    assert proxima_execucao(datetime(2024, 5, 10, 23, 59)) == datetime(2024, 5, 11, 7, 0)
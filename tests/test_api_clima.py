@@ -0,0 +1,84 @@
+"""
+Testes das requisições condicionais e do limite de taxa da API Flask, sobre um MongoDB em memória (mongomock):
+validadores apenas em respostas 2xx de recursos existentes, respostas 304 que não consomem o limite de taxa e
+contadores com a mesma chave usada pela API assíncrona.
+"""
+import importlib
+from limits import parse
+import mongomock
+import pytest
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    diretorio = tmp_path_factory.mktemp('api_clima')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('SQLALCHEMY_DATABASE_URI', f"sqlite:///{diretorio / 'usuarios.db'}")
+        monkeypatch.setenv('LIMITE_STORAGE_URI', 'memory://')
+        with mongomock.patch(servers=(('localhost', 27017),)):
+            api_clima = importlib.import_module('api_clima')
+    from Dados_Climaticos.esquema_previsao import documento_da_previsao
+    from Dados_Climaticos.publicacao import COLECAO_STAGING, publicar_coleta
+    api_clima.db_mongo[COLECAO_STAGING].insert_many([documento_da_previsao({
+        'cidade data': f'Florianópolis-SC, {dia}/10/2026 - Sábado', 'codicao meteorologica': ' Chuva ',
+        'temperatura minima': 16, 'temperatura maxima': 24, 'umidade minima': 55, 'umidade maxima': 98,
+        'vento': 'Fraco'}) for dia in (17, 18)])
+    publicar_coleta(api_clima.db_mongo, arquivar=False)
+    with api_clima.app.app_context():
+        api_clima.db_alchemy.session.add(api_clima.Usuario(nome='teste', email='teste@teste', senha_hash='-', salt='-', chave_api='chave'))
+        api_clima.db_alchemy.session.commit()
+    return api_clima
+
+@pytest.fixture
+def cliente(api):
+    api.limiter.reset()
+    return api.app.test_client()
+
+def consultar(cliente, url, **cabecalhos):
+    return cliente.get(url, headers=dict({'x-api-key': 'chave'}, **cabecalhos))
+
+def cota_consumida(api, rota):
+    return api.limiter.storage.get(parse('200 per day').key_for('chave', rota))
+
+def test_contadores_usam_a_chave_da_api_assincrona(api, cliente):
+    consultar(cliente, '/tempo/cidade/Florianópolis')
+
+    assert list(api.limiter.storage.storage) == ['LIMITER/chave/previsao_por_cidade/200/1/day']
+
+def test_resposta_existente_recebe_validadores_e_304(api, cliente):
+    resposta = consultar(cliente, '/tempo/cidade/Florianópolis')
+    assert resposta.status_code == 201
+    assert resposta.headers['Cache-Control'].startswith('private')
+
+    for cabecalho, valor in (('If-None-Match', resposta.headers['ETag']), ('If-Modified-Since', resposta.headers['Last-Modified'])):
+        nao_modificada = consultar(cliente, '/tempo/cidade/Florianópolis', **{cabecalho: valor})
+        assert nao_modificada.status_code == 304
+        assert nao_modificada.headers['ETag'] == resposta.headers['ETag']
+    assert cota_consumida(api, 'previsao_por_cidade') == 1
+
+def test_cidade_inexistente_nao_recebe_validadores_nem_304(api, cliente):
+    etag = consultar(cliente, '/tempo/cidade/Florianópolis').headers['ETag']
+
+    for url in ('/tempo/cidade/Cidade Inexistente', '/tempo/cidade/Cidade Inexistente/semana'):
+        resposta = consultar(cliente, url, **{'If-None-Match': etag})
+        assert resposta.status_code in (200, 201)
+        assert 'ETag' not in resposta.headers
+        assert 'Last-Modified' not in resposta.headers
+        assert 'Cache-Control' not in resposta.headers
+    assert cota_consumida(api, 'previsao_por_cidade') == 2
+    assert cota_consumida(api, 'previsao_da_semana') == 1
+
+def test_erros_nao_recebem_validadores_nem_304(api, cliente):
+    etag = consultar(cliente, '/tempo/cidade/Florianópolis').headers['ETag']
+
+    for url in ('/analise/ranking?campo=inexistente', '/tempo/cidades', '/tempo/cidade/Florianópolis/historico?inicio=31/02/2026'):
+        resposta = consultar(cliente, url, **{'If-None-Match': etag})
+        assert resposta.status_code == 400
+        assert 'ETag' not in resposta.headers
+        assert 'Cache-Control' not in resposta.headers
+
+def test_semana_e_analise_existentes_recebem_304(api, cliente):
+    for url in ('/tempo/cidade/florianopolis/semana', '/analise/ranking?campo=tmax'):
+        etag = consultar(cliente, url).headers['ETag']
+        assert consultar(cliente, url, **{'If-None-Match': etag}).status_code == 304
+    assert cota_consumida(api, 'previsao_da_semana') == 1
+    assert cota_consumida(api, 'ranking_de_cidades') == 1
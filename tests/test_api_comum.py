@@ -0,0 +1,87 @@
+"""
+Testes das regras compartilhadas pelas APIs Flask e assíncrona: requisições condicionais, parâmetros e lotes.
+"""
+from datetime import date, datetime, timezone
+from api_comum import (ERRO_LOTE_VAZIO, aceita_validadores, cabecalhos_condicionais, codificacao_da_resposta,
+                       erro_do_lote, estado_da_coleta, filtro_historico, inteiro_limitado, intervalo_do_historico,
+                       intervalo_valido, nao_modificada, normalizar_cidades, registrar_previsao, unidades_do_lote)
+
+ESTADO = (3, datetime(2026, 10, 17, 13, 5, tzinfo=timezone.utc))
+
+def test_estado_da_coleta():
+    controle = {'geracao': 3, 'finalizada_em': datetime(2026, 10, 17, 13, 5, 0, 123456)}
+
+    assert estado_da_coleta(controle) == ESTADO
+    assert estado_da_coleta(None) is None
+
+def test_nao_modificada_pelo_etag():
+    assert nao_modificada(ESTADO, 'GET', 'W/"geracao-3"', None)
+    assert nao_modificada(ESTADO, 'HEAD', '"geracao-2", W/"geracao-3"', None)
+    assert nao_modificada(ESTADO, 'GET', '*', None)
+    assert not nao_modificada(ESTADO, 'GET', 'W/"geracao-2"', 'Sat, 17 Oct 2026 13:05:00 GMT')
+    assert not nao_modificada(ESTADO, 'POST', 'W/"geracao-3"', None)
+    assert not nao_modificada(None, 'GET', 'W/"geracao-3"', None)
+
+def test_nao_modificada_pela_data():
+    assert nao_modificada(ESTADO, 'GET', None, 'Sat, 17 Oct 2026 13:05:00 GMT')
+    assert not nao_modificada(ESTADO, 'GET', None, 'Sat, 17 Oct 2026 13:04:59 GMT')
+    assert not nao_modificada(ESTADO, 'GET', None, 'data inválida')
+    assert not nao_modificada(ESTADO, 'GET', None, None)
+
+def test_validadores_apenas_em_2xx_de_recursos_existentes():
+    assert aceita_validadores(200) and aceita_validadores(201)
+    assert not aceita_validadores(200, recurso_inexistente=True)
+    assert not aceita_validadores(400)
+    assert not aceita_validadores(404)
+    assert not aceita_validadores(304)
+
+def test_cabecalhos_condicionais():
+    assert cabecalhos_condicionais(ESTADO, datetime(2026, 10, 17, 12, 15)) == {
+        'ETag': 'W/"geracao-3"',
+        'Last-Modified': 'Sat, 17 Oct 2026 13:05:00 GMT',
+        'Cache-Control': 'private, max-age=2700'}
+    assert cabecalhos_condicionais(ESTADO, datetime(2026, 10, 17, 13, 0))['Cache-Control'] == 'private, max-age=0'
+
+def test_lote_de_cidades():
+    cidades = normalizar_cidades([' Florianópolis ', 'Joinville', '', 'Florianópolis', 7, None])
+
+    assert cidades == ['Florianópolis', 'Joinville']
+    assert erro_do_lote(cidades, 2) is None
+    assert erro_do_lote([], 2) == ERRO_LOTE_VAZIO
+    assert erro_do_lote(cidades, 1) == {'erro': 'Informe no máximo 1 cidades por requisição.'}
+    assert unidades_do_lote(cidades * 5, 100, 4) == 3
+    assert unidades_do_lote(cidades, 1, 4) == 1
+
+def test_inteiro_limitado():
+    assert inteiro_limitado(None, 10, 50) == 10
+    assert inteiro_limitado('abc', 10, 50) == 10
+    assert inteiro_limitado('0', 10, 50) == 1
+    assert inteiro_limitado('80', 10, 50) == 50
+
+def test_intervalo_do_historico():
+    inicio, fim = intervalo_do_historico(date(2026, 10, 10), None)
+
+    assert (inicio, fim) == (datetime(2026, 10, 10), datetime(2026, 10, 24))
+    assert intervalo_valido(inicio, fim, 31)
+    assert not intervalo_valido(inicio, fim, 13)
+    assert not intervalo_valido(fim, inicio, 31)
+    assert filtro_historico('Bom Jesus', 'PI', inicio, fim) == {'c': 'Bom Jesus', 'uf': 'PI', 'd': {'$gte': inicio, '$lte': fim}}
+
+def test_codificacao_da_resposta():
+    resposta = {'identity': b'{}', 'gzip': b'...'}
+
+    assert codificacao_da_resposta('gzip, deflate, br', resposta) == 'gzip'
+    assert codificacao_da_resposta('gzip;q=0.5, br', dict(resposta, br=b'..')) == 'br'
+    assert codificacao_da_resposta('deflate', resposta) is None
+    assert codificacao_da_resposta(None, resposta) is None
+
+def test_previsao_do_lote_e_a_do_primeiro_dia():
+    previsoes = {}
+    pendentes = {('dia', 'Bom Jesus', None), ('dia', 'Bom Jesus', 'RS')}
+    for uf, dia in (('PI', 17), ('RS', 17), ('RS', 18)):
+        registrar_previsao(previsoes, pendentes, {
+            'c': 'Bom Jesus', 'uf': uf, 'd': datetime(2026, 10, dia), 'cm': 'Chuva', 'tmed': 15.0,
+            'umed': 70.0, 'v': 'Fraco'})
+
+    assert set(previsoes) == pendentes
+    assert previsoes[('dia', 'Bom Jesus', 'RS')]['data'].startswith(' 17/10/2026')
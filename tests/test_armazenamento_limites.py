@@ -0,0 +1,148 @@
+"""
+Testes dos armazenamentos do limite de taxa: UPSERT atômico no SQLite, contadores compartilhados entre instâncias,
+incrementos agrupados em memória abaixo da margem e descarga sem perdas, inclusive na saída do processo.
+"""
+import sqlite3
+from threading import Thread
+import pytest
+import armazenamento_limites
+from armazenamento_limites import ArmazenamentoEmLote, ArmazenamentoSQLite, limite_da_chave
+
+CHAVE = 'LIMITER/chave/previsao_por_cidade/100/1/day'
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio_ = Relogio()
+    monkeypatch.setattr(armazenamento_limites, 'time', relogio_)
+    return relogio_
+
+@pytest.fixture
+def uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'limites.db'}"
+
+@pytest.fixture
+def descargas(monkeypatch):
+    registradas = []
+    monkeypatch.setattr(armazenamento_limites.atexit, 'register', registradas.append)
+    return registradas
+
+def test_limite_da_chave():
+    assert limite_da_chave(CHAVE) == 100
+    assert limite_da_chave('LIMITER/chave/rota/200/1/day') == 200
+    assert limite_da_chave('sem/limite') == 0
+    assert limite_da_chave('') == 0
+
+def test_sqlite_incrementa_e_reinicia_a_janela(uri, relogio):
+    armazenamento = ArmazenamentoSQLite(uri)
+
+    assert armazenamento.incr(CHAVE, 60) == 1
+    assert armazenamento.incr(CHAVE, 60, amount=4) == 5
+    assert armazenamento.get(CHAVE) == 5
+    assert armazenamento.get_expiry(CHAVE) == 1060
+
+    relogio.agora += 60
+    assert armazenamento.get(CHAVE) == 0
+    assert armazenamento.incr(CHAVE, 60) == 1
+    assert armazenamento.get_expiry(CHAVE) == 1120
+
+def test_sqlite_incrementa_sob_a_trava_de_escrita(uri):
+    armazenamento = ArmazenamentoSQLite(uri, timeout=0.1)
+    armazenamento.incr(CHAVE, 60)
+    outra_conexao = sqlite3.connect(uri.split(':///', 1)[1], isolation_level=None)
+    outra_conexao.execute('BEGIN IMMEDIATE')
+
+    with pytest.raises(sqlite3.OperationalError, match='locked'):
+        armazenamento.incr(CHAVE, 60)
+    assert armazenamento.get(CHAVE) == 1
+
+    outra_conexao.execute('ROLLBACK')
+    assert armazenamento.incr(CHAVE, 60) == 2
+
+def test_sqlite_compartilha_os_contadores_entre_instancias(uri):
+    instancias = [ArmazenamentoSQLite(uri), ArmazenamentoSQLite(uri)]
+
+    def incrementar(armazenamento):
+        for _ in range(50):
+            armazenamento.incr(CHAVE, 60)
+
+    threads = [Thread(target=incrementar, args=(instancias[indice % 2],)) for indice in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert instancias[0].get(CHAVE) == instancias[1].get(CHAVE) == 200
+
+def test_lote_agrupa_os_incrementos_abaixo_da_margem(uri, relogio, descargas):
+    lote = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=60)
+    compartilhado = lote.armazenamento
+
+    assert lote.incr(CHAVE, 3600) == 1
+    for esperado in range(2, 12):
+        assert lote.incr(CHAVE, 3600) == esperado
+    assert compartilhado.get(CHAVE) == 1
+    assert lote.get(CHAVE) == 11
+
+    assert lote.incr(CHAVE, 3600) == 12
+    assert compartilhado.get(CHAVE) == 12
+
+def test_lote_envia_cada_incremento_a_partir_da_margem(uri, relogio, descargas):
+    lote = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=60)
+    compartilhado = lote.armazenamento
+    compartilhado.incr(CHAVE, 3600, amount=75)
+
+    for esperado in range(76, 81):
+        assert lote.incr(CHAVE, 3600) == esperado
+    assert compartilhado.get(CHAVE) == 76
+
+    for esperado in range(81, 86):
+        assert lote.incr(CHAVE, 3600) == esperado
+        assert compartilhado.get(CHAVE) == esperado
+
+def test_lote_envia_os_pendentes_apos_o_intervalo(uri, relogio, descargas):
+    lote = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=1.0)
+    lote.incr(CHAVE, 3600)
+    lote.incr(CHAVE, 3600)
+    assert lote.armazenamento.get(CHAVE) == 1
+
+    relogio.agora += 1
+    assert lote.incr(CHAVE, 3600) == 3
+    assert lote.armazenamento.get(CHAVE) == 3
+
+def test_lote_compartilha_os_contadores_entre_instancias(uri, relogio, descargas):
+    primeiro = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=60)
+    segundo = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=60)
+
+    for _ in range(5):
+        primeiro.incr(CHAVE, 3600)
+        segundo.incr(CHAVE, 3600)
+    primeiro.descarregar()
+    segundo.descarregar()
+
+    assert primeiro.armazenamento.get(CHAVE) == 10
+    assert primeiro.get(CHAVE) == segundo.get(CHAVE) == 10
+
+def test_descarga_na_saida_nao_perde_incrementos(uri, relogio, descargas):
+    lote = ArmazenamentoEmLote(f'lote+{uri}', lote=10, intervalo_sincronizacao=60)
+    outra_chave = 'LIMITER/chave/previsao_da_semana/100/1/day'
+    for _ in range(7):
+        lote.incr(CHAVE, 3600)
+    for _ in range(3):
+        lote.incr(outra_chave, 3600)
+
+    assert descargas == [lote.descarregar]
+    descargas[0]()
+
+    reaberto = ArmazenamentoSQLite(uri)
+    assert reaberto.get(CHAVE) == 7
+    assert reaberto.get(outra_chave) == 3
+    assert reaberto.get_expiry(CHAVE) == 4600
+    lote.descarregar()
+    assert reaberto.get(CHAVE) == 7
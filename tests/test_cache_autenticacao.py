@@ -0,0 +1,97 @@
+"""
+Testes do cache de validação das chaves API: TTL das chaves válidas e inválidas, limite de entradas e invalidação.
+"""
+import asyncio
+import pytest
+import cache_autenticacao
+from cache_autenticacao import CacheAutenticacao
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio_ = Relogio()
+    monkeypatch.setattr(cache_autenticacao, 'monotonic', relogio_)
+    return relogio_
+
+class Banco:
+    def __init__(self, *chaves):
+        self.chaves = set(chaves)
+        self.consultas = []
+
+    def __call__(self, chave):
+        self.consultas.append(chave)
+        return chave in self.chaves
+
+def test_chave_valida_fica_em_cache_ate_o_ttl(relogio):
+    cache = CacheAutenticacao(ttl=300, ttl_negativo=30)
+    banco = Banco('chave')
+
+    assert cache.validar('chave', banco)
+    relogio.agora += 299
+    assert cache.validar('chave', banco)
+    assert banco.consultas == ['chave']
+
+    relogio.agora += 2
+    assert cache.validar('chave', banco)
+    assert banco.consultas == ['chave', 'chave']
+
+def test_chave_invalida_usa_o_ttl_negativo(relogio):
+    cache = CacheAutenticacao(ttl=300, ttl_negativo=30)
+    banco = Banco()
+
+    assert not cache.validar('inexistente', banco)
+    relogio.agora += 29
+    assert not cache.validar('inexistente', banco)
+    assert len(banco.consultas) == 1
+
+    banco.chaves.add('inexistente')
+    relogio.agora += 2
+    assert cache.validar('inexistente', banco)
+    assert len(banco.consultas) == 2
+    assert cache.estatisticas() == {'acertos': 1, 'falhas': 2, 'taxa_acerto': 1 / 3, 'entradas': 1}
+
+def test_capacidade_descarta_a_chave_menos_usada(relogio):
+    cache = CacheAutenticacao(capacidade=2)
+    banco = Banco('a', 'b', 'c')
+    cache.validar('a', banco)
+    cache.validar('b', banco)
+    cache.validar('a', banco)
+
+    cache.validar('c', banco)
+    assert cache.estatisticas()['entradas'] == 2
+    cache.validar('a', banco)
+    cache.validar('b', banco)
+    assert banco.consultas == ['a', 'b', 'c', 'b']
+
+def test_invalidar_remove_a_chave_revogada(relogio):
+    cache = CacheAutenticacao()
+    banco = Banco('a', 'b')
+    cache.validar('a', banco)
+    cache.validar('b', banco)
+
+    banco.chaves.discard('a')
+    cache.invalidar('a')
+    assert not cache.validar('a', banco)
+    assert cache.validar('b', banco)
+
+    cache.invalidar()
+    assert cache.estatisticas()['entradas'] == 0
+
+def test_validar_async(relogio):
+    cache = CacheAutenticacao()
+    banco = Banco('chave')
+
+    async def consultar(chave):
+        return banco(chave)
+
+    async def validar_duas_vezes():
+        return [await cache.validar_async('chave', consultar), await cache.validar_async('chave', consultar)]
+
+    assert asyncio.run(validar_duas_vezes()) == [True, True]
+    assert banco.consultas == ['chave']
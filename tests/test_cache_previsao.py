@@ -0,0 +1,136 @@
+"""
+Testes do cache de previsões: invalidação pela geração da coleta, limite do LRU e cache negativo.
+"""
+import asyncio
+import pytest
+import cache_previsao
+from cache_previsao import CachePrevisao
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio_ = Relogio()
+    monkeypatch.setattr(cache_previsao, 'monotonic', relogio_)
+    return relogio_
+
+class Geracao:
+    def __init__(self):
+        self.valor = 1
+        self.leituras = 0
+
+    def __call__(self):
+        self.leituras += 1
+        return self.valor
+
+def carregador(valores, carregadas):
+    def carregar(chave):
+        carregadas.append(chave)
+        return valores.get(chave)
+    return carregar
+
+def test_nova_geracao_invalida_o_cache(relogio):
+    geracao = Geracao()
+    cache = CachePrevisao(geracao, intervalo_verificacao=30)
+    carregadas = []
+    carregar = carregador({'Florianópolis': {'temperatura': '20°C'}}, carregadas)
+
+    assert cache.obter('Florianópolis', lambda: carregar('Florianópolis')) == {'temperatura': '20°C'}
+    geracao.valor = 2
+    relogio.agora += 10
+    cache.obter('Florianópolis', lambda: carregar('Florianópolis'))
+    assert carregadas == ['Florianópolis']
+    assert geracao.leituras == 1
+
+    relogio.agora += 30
+    cache.obter('Florianópolis', lambda: carregar('Florianópolis'))
+    assert carregadas == ['Florianópolis', 'Florianópolis']
+    assert cache.estatisticas()['geracao'] == 2
+
+def test_carregamento_durante_troca_de_geracao_nao_e_armazenado(relogio):
+    geracao = Geracao()
+    cache = CachePrevisao(geracao, intervalo_verificacao=0)
+
+    def carregar_e_publicar():
+        geracao.valor = 2
+        cache.geracao_atual()
+        return 'coleta antiga'
+
+    assert cache.obter('Florianópolis', carregar_e_publicar) == 'coleta antiga'
+    assert cache.estatisticas()['entradas'] == 0
+
+def test_capacidade_descarta_a_menos_usada(relogio):
+    cache = CachePrevisao(Geracao(), capacidade=2)
+    cache.obter('a', lambda: 'A')
+    cache.obter('b', lambda: 'B')
+    cache.obter('a', lambda: 'A')
+    cache.obter('c', lambda: 'C')
+
+    assert cache.obter('a', lambda: 'novo') == 'A'
+    assert cache.obter('b', lambda: 'novo') == 'novo'
+
+def test_cidades_inexistentes_nao_descartam_as_reais(relogio):
+    cache = CachePrevisao(Geracao(), capacidade=2, capacidade_negativa=3, ttl_negativo=60)
+    cache.obter('Florianópolis', lambda: 'previsão')
+    cache.obter('Joinville', lambda: 'previsão')
+
+    for indice in range(100):
+        assert cache.obter(f'cidade aleatória {indice}', lambda: None) is None
+    cache.obter(('historico', 'inexistente'), lambda: [])
+
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['entradas'], estatisticas['entradas_negativas']) == (2, 3)
+    assert cache.obter('Florianópolis', lambda: 'recarregada') == 'previsão'
+    assert cache.obter('Joinville', lambda: 'recarregada') == 'previsão'
+
+def test_resultado_vazio_expira_pelo_ttl_negativo(relogio):
+    cache = CachePrevisao(Geracao(), ttl_negativo=60)
+    carregadas = []
+    carregar = carregador({}, carregadas)
+
+    cache.obter('Nova Cidade', lambda: carregar('Nova Cidade'))
+    relogio.agora += 59
+    cache.obter('Nova Cidade', lambda: carregar('Nova Cidade'))
+    assert carregadas == ['Nova Cidade']
+
+    relogio.agora += 2
+    cache.obter('Nova Cidade', lambda: carregar('Nova Cidade'))
+    assert carregadas == ['Nova Cidade', 'Nova Cidade']
+
+def test_obter_varios_carrega_apenas_as_faltantes(relogio):
+    cache = CachePrevisao(Geracao())
+    lotes = []
+
+    def carregar_varios(chaves):
+        lotes.append(chaves)
+        return {chave: chave.upper() for chave in chaves if chave != 'inexistente'}
+
+    assert cache.obter_varios(['a', 'b', 'a'], carregar_varios) == {'a': 'A', 'b': 'B'}
+    assert cache.obter_varios(['a', 'c', 'inexistente'], carregar_varios) == {'a': 'A', 'c': 'C', 'inexistente': None}
+    assert cache.obter_varios(['c', 'inexistente'], carregar_varios) == {'c': 'C', 'inexistente': None}
+    assert lotes == [['a', 'b'], ['c', 'inexistente']]
+    assert cache.estatisticas()['entradas_negativas'] == 1
+
+def test_versoes_assincronas(relogio):
+    async def ler_geracao():
+        return 7
+
+    cache = CachePrevisao(ler_geracao)
+
+    async def consultar():
+        async def carregar():
+            return 'previsão'
+
+        async def carregar_varios(chaves):
+            return {'b': 'B'}
+
+        return (await cache.obter_async('a', carregar), await cache.obter_async('a', carregar),
+                await cache.obter_varios_async(['a', 'b', 'c'], carregar_varios), await cache.geracao_atual_async())
+
+    assert asyncio.run(consultar()) == ('previsão', 'previsão', {'a': 'previsão', 'b': 'B', 'c': None}, 7)
+    assert cache.estatisticas()['acertos'] == 2
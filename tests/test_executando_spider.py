@@ -0,0 +1,53 @@
+"""
+Testes da trava do agendador, que impede coletas sobrepostas.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+import executando_spider
+
+@pytest.fixture
+def arquivo_trava(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / 'spider.lock')
+    monkeypatch.setattr(executando_spider, 'ARQUIVO_TRAVA', arquivo)
+    yield arquivo
+    executando_spider.liberar_trava()
+
+def adquirir_em_outro_processo(arquivo):
+    codigo = textwrap.dedent(f'''
+        import executando_spider
+        executando_spider.ARQUIVO_TRAVA = {arquivo!r}
+        print(executando_spider.adquirir_trava())
+    ''')
+    resultado = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(executando_spider.__file__))
+    return resultado.stdout.strip() == 'True'
+
+def test_trava_impede_outra_execucao(arquivo_trava):
+    assert executando_spider.adquirir_trava()
+    assert not adquirir_em_outro_processo(arquivo_trava)
+
+    executando_spider.liberar_trava()
+    assert adquirir_em_outro_processo(arquivo_trava)
+
+def test_trava_de_processo_encerrado_nao_bloqueia(arquivo_trava):
+    with open(arquivo_trava, 'w') as arquivo:
+        arquivo.write('1')
+
+    assert adquirir_em_outro_processo(arquivo_trava)
+    assert executando_spider.adquirir_trava()
+    with open(arquivo_trava) as arquivo:
+        assert arquivo.read() == str(os.getpid())
+
+def test_processo_da_spider_mantem_a_trava(arquivo_trava):
+    assert executando_spider.adquirir_trava()
+    spider = subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE,
+                              pass_fds=executando_spider.descritores_herdados())
+    try:
+        executando_spider.liberar_trava()
+        assert not adquirir_em_outro_processo(arquivo_trava)
+    finally:
+        spider.communicate(b'')
+    assert adquirir_em_outro_processo(arquivo_trava)
@@ -0,0 +1,38 @@
+"""
+Testes do índice de nomes das cidades usado pela API.
+"""
+from indice_cidades import IndiceCidades, normalizar
+
+def indice(*cidades):
+    indice_ = IndiceCidades()
+    indice_.reconstruir(cidades, geracao=1)
+    return indice_
+
+def test_normalizar():
+    assert normalizar(' FLORIANÓPOLIS ') == 'florianopolis'
+    assert normalizar("Santa Bárbara d'Oeste") == 'santa barbara d oeste'
+
+def test_cidade_de_um_unico_estado_resolve_com_a_uf():
+    indice_ = indice(('Florianópolis', 'SC'), ('São Paulo', 'SP'))
+
+    assert indice_.resolver('florianopolis') == ('Florianópolis', 'SC')
+    assert indice_.resolver('Sao Paulo-SP') == ('São Paulo', 'SP')
+    assert indice_.resolver('Cidade Inexistente') is None
+
+def test_nome_ambiguo_sem_uf_nao_resolve_o_estado():
+    indice_ = indice(('Bom Jesus', 'PI'), ('Bom Jesus', 'RS'), ('Bom Jesus', 'SC'))
+
+    assert indice_.resolver('bom jesus') == ('Bom Jesus', None)
+    assert indice_.resolver('Bom Jesus-RS') == ('Bom Jesus', 'RS')
+    assert indice_.resolver('bom jesus/pi') == ('Bom Jesus', 'PI')
+    assert indice_.resolver('Bom Jesus-SP') is None
+
+def test_documentos_sem_uf():
+    assert indice(('Florianópolis', None)).resolver('Florianópolis') == ('Florianópolis', None)
+
+def test_sugerir():
+    indice_ = indice(('Bom Jesus', 'PI'), ('Bom Jesus', 'RS'), ('Bombinhas', 'SC'), ('Florianópolis', 'SC'))
+
+    assert indice_.sugerir('bom', 10) == [
+        {'cidade': 'Bom Jesus', 'uf': 'PI'}, {'cidade': 'Bom Jesus', 'uf': 'RS'}, {'cidade': 'Bombinhas', 'uf': 'SC'}]
+    assert indice_.sugerir('xyz') == []
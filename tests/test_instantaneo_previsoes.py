@@ -0,0 +1,111 @@
+"""
+Testes do instantâneo colunar das previsões: ranking com desempate pelo nome da cidade, filtros por condição, vento
+e faixas, agregação por estado, UF desconhecida e instantâneo vazio.
+"""
+from datetime import date, datetime
+import pytest
+from instantaneo_previsoes import InstantaneoPrevisoes, data_da_consulta, faixas_da_consulta
+
+def previsao(cidade, uf, tmax, dia=17, cm='Chuva', v='Fraco', umed=70.0):
+    return {'c': cidade, 'uf': uf, 'd': datetime(2026, 10, dia), 'cm': cm, 'v': v, 'tmin': tmax - 8, 'tmax': tmax,
+            'tmed': tmax - 4.0, 'umin': 40, 'umax': 95, 'umed': umed}
+
+@pytest.fixture
+def instantaneo():
+    instantaneo_ = InstantaneoPrevisoes()
+    instantaneo_.reconstruir([
+        previsao('Teresina', 'PI', 38, cm='Sol', v='Calmo', umed=35.0),
+        previsao('Bom Jesus', 'PI', 33, cm='Sol', umed=45.0),
+        previsao('Bom Jesus', 'RS', 21, cm='Chuva forte', v='Forte', umed=90.0),
+        previsao('Florianópolis', 'SC', 24, cm='Muitas nuvens com chuva', v='Fracos a moderados', umed=85.0),
+        previsao('Joinville', 'SC', 24, cm='Chuvas isoladas', umed=88.0),
+        previsao('Blumenau', 'SC', 24, cm='Nublado', umed=75.0),
+        previsao('Teresina', 'PI', 40, dia=18, cm='Sol', v='Calmo', umed=30.0),
+        {'cidade': 'Documento antigo', 'data': ' 17/10/2026 - Sábado'}], geracao=3)
+    return instantaneo_
+
+def nomes(linhas):
+    return [(linha['cidade'], linha['uf']) for linha in linhas]
+
+def test_reconstruir_ignora_documentos_antigos(instantaneo):
+    assert len(instantaneo) == 7
+    assert instantaneo.datas() == [date(2026, 10, 17), date(2026, 10, 18)]
+    assert not instantaneo.precisa_atualizar(3)
+    assert instantaneo.precisa_atualizar(4)
+
+def test_ranking_da_primeira_data(instantaneo):
+    linhas = instantaneo.ranking('tmax', quantidade=2)
+
+    assert nomes(linhas) == [('Teresina', 'PI'), ('Bom Jesus', 'PI')]
+    assert linhas[0] == {'cidade': 'Teresina', 'uf': 'PI', 'data': '17/10/2026', 'condicao': 'Sol', 'vento': 'Calmo',
+                         'tmin': 30, 'tmax': 38, 'tmed': 34.0, 'umin': 40, 'umax': 95, 'umed': 35.0}
+    assert nomes(instantaneo.ranking('tmax', quantidade=1, data=date(2026, 10, 18))) == [('Teresina', 'PI')]
+    assert nomes(instantaneo.ranking('umed', quantidade=2, crescente=True, uf='pi')) == [('Teresina', 'PI'), ('Bom Jesus', 'PI')]
+
+def test_ranking_desempata_pelo_nome_da_cidade(instantaneo):
+    assert nomes(instantaneo.ranking('tmax', quantidade=3, uf='SC')) == [
+        ('Blumenau', 'SC'), ('Florianópolis', 'SC'), ('Joinville', 'SC')]
+    for quantidade in (1, 2):
+        assert nomes(instantaneo.ranking('tmax', quantidade=quantidade, uf='SC')) == [
+            ('Blumenau', 'SC'), ('Florianópolis', 'SC')][:quantidade]
+    assert nomes(instantaneo.ranking('tmax', quantidade=4, crescente=True)) == [
+        ('Bom Jesus', 'RS'), ('Blumenau', 'SC'), ('Florianópolis', 'SC'), ('Joinville', 'SC')]
+
+def test_ranking_maior_que_a_selecao(instantaneo):
+    assert len(instantaneo.ranking('tmax', quantidade=50)) == 6
+    assert instantaneo.ranking('tmax', quantidade=0) == []
+
+def test_filtrar_por_condicao_vento_e_faixas(instantaneo):
+    total, linhas = instantaneo.filtrar(condicao='CHUVA')
+    assert total == 3
+    assert nomes(linhas) == [('Bom Jesus', 'RS'), ('Florianópolis', 'SC'), ('Joinville', 'SC')]
+
+    assert nomes(instantaneo.filtrar(condicao='chuva', vento='fraco')[1]) == [('Florianópolis', 'SC'), ('Joinville', 'SC')]
+    assert nomes(instantaneo.filtrar(uf='SC', faixas={'umed': (80, None)})[1]) == [('Florianópolis', 'SC'), ('Joinville', 'SC')]
+    assert instantaneo.filtrar(faixas={'tmax': (30, 35)}) == (1, instantaneo.ranking('tmax', quantidade=1, uf='PI', crescente=True))
+    assert instantaneo.filtrar(condicao='neve') == (0, [])
+
+def test_filtrar_com_limite_retorna_o_total(instantaneo):
+    total, linhas = instantaneo.filtrar(limite=2)
+
+    assert total == 6
+    assert nomes(linhas) == [('Blumenau', 'SC'), ('Bom Jesus', 'PI')]
+
+def test_agregar_por_uf(instantaneo):
+    assert instantaneo.agregar_por_uf('umed') == {
+        'PI': {'media': 40.0, 'minimo': 35.0, 'maximo': 45.0, 'cidades': 2},
+        'RS': {'media': 90.0, 'minimo': 90.0, 'maximo': 90.0, 'cidades': 1},
+        'SC': {'media': 82.7, 'minimo': 75.0, 'maximo': 88.0, 'cidades': 3}}
+    assert instantaneo.agregar_por_uf('tmax', data=date(2026, 10, 18)) == {
+        'PI': {'media': 40.0, 'minimo': 40, 'maximo': 40, 'cidades': 1}}
+    assert instantaneo.agregar_por_uf('tmax', data=date(2026, 10, 25)) == {}
+
+def test_uf_desconhecida(instantaneo):
+    for uf in ('XX', 'AA', 'ZZ'):
+        assert instantaneo.ranking('tmax', uf=uf) == []
+        assert instantaneo.filtrar(uf=uf) == (0, [])
+
+def test_instantaneo_vazio():
+    instantaneo = InstantaneoPrevisoes()
+    assert len(instantaneo) == 0
+    assert instantaneo.datas() == []
+    assert instantaneo.ranking('tmax') == []
+    assert instantaneo.filtrar() == (0, [])
+    assert instantaneo.agregar_por_uf('umed') == {}
+
+    instantaneo.reconstruir([], geracao=1)
+    assert len(instantaneo) == 0
+    assert instantaneo.datas() == []
+    assert instantaneo.ranking('tmax', uf='SC') == []
+    assert instantaneo.filtrar(condicao='chuva') == (0, [])
+    assert instantaneo.agregar_por_uf('umed') == {}
+
+def test_parametros_da_consulta():
+    assert data_da_consulta('17/10/2026') == data_da_consulta('2026-10-17') == date(2026, 10, 17)
+    assert data_da_consulta('') is None
+    with pytest.raises(ValueError):
+        data_da_consulta('31/02/2026')
+    assert faixas_da_consulta({'tmax_min': '30', 'umed_max': '40.5', 'tmin_min': ''}) == {
+        'tmax': (30.0, None), 'umed': (None, 40.5)}
+    with pytest.raises(ValueError):
+        faixas_da_consulta({'tmax_min': 'quente'})